@@ -0,0 +1,109 @@
+# alternates.py
+"""
+Pre-generated alternates for single-slide regeneration.
+
+After a slide is regenerated, a few more versions of it (same user, topic
+and layout) are generated in the background at batch priority, so the next
+"regenerate" click is served from the pool without waiting for the model.
+Pools are per worker process, expire after a while and are capped in
+number, oldest first.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
+import metrics
+
+# Alternates kept ready per (user, topic, layout)
+POOL_SIZE = 2
+
+# Pooled alternates older than this are discarded
+POOL_TTL_SECONDS = 600
+
+# Pools kept per worker; the least recently used is dropped beyond this
+MAX_POOLS = 1000
+
+PREFETCH_WORKERS = 2
+
+def pool_key(user, topic, layout):
+    return (user, ' '.join(topic.lower().split()), layout)
+
+class AlternatesPool:
+    """
+    `generate(layout, topic, user, avoid_titles, **options)` produces one
+    processed slide content dict, or None on failure; `title(content,
+    layout)` gives the text compared against sibling titles.
+    """
+
+    def __init__(self, generate, title, size=POOL_SIZE, ttl=POOL_TTL_SECONDS,
+                 max_pools=MAX_POOLS, workers=PREFETCH_WORKERS):
+        self._generate = generate
+        self._title = title
+        self.size = size
+        self.ttl = ttl
+        self.max_pools = max_pools
+        self._lock = threading.Lock()
+        self._pools = OrderedDict()
+        self._pending = {}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='alternates')
+
+    def take(self, user, topic, layout, avoid_titles=()):
+        """Pop a fresh pooled alternate whose title isn't already on a sibling slide"""
+        avoid = {title.strip().lower() for title in avoid_titles}
+        key = pool_key(user, topic, layout)
+        now = time.time()
+        content = None
+
+        with self._lock:
+            pool = self._pools.get(key, [])
+            while pool:
+                created, candidate = pool.pop(0)
+                if now - created > self.ttl:
+                    continue
+                if self._title(candidate, layout).strip().lower() in avoid:
+                    continue
+                content = candidate
+                break
+            if not pool:
+                self._pools.pop(key, None)
+
+        metrics.record_cache('alternates', content is not None)
+        return content
+
+    def prefetch(self, user, topic, layout, avoid_titles=(), **options):
+        """
+        Top the pool up to `size` in the background; `options` go to
+        generate, which runs in a copy of the caller's context (its app)
+        """
+        key = pool_key(user, topic, layout)
+        with self._lock:
+            have = len(self._pools.get(key, [])) + self._pending.get(key, 0)
+            missing = self.size - have
+            if missing <= 0:
+                return
+            self._pending[key] = self._pending.get(key, 0) + missing
+
+        for _ in range(missing):
+            self._executor.submit(copy_context().run, self._fill, key, user, topic, layout, list(avoid_titles),
+                                  options)
+
+    def _fill(self, key, user, topic, layout, avoid_titles, options):
+        content = None
+        try:
+            content = self._generate(layout, topic, user, avoid_titles, **options)
+        finally:
+            with self._lock:
+                self._pending[key] -= 1
+                if not self._pending[key]:
+                    del self._pending[key]
+                if content is not None:
+                    self._pools.setdefault(key, []).append((time.time(), content))
+                    self._pools.move_to_end(key)
+                    while len(self._pools) > self.max_pools:
+                        self._pools.popitem(last=False)
+
+    def pooled(self, user, topic, layout):
+        with self._lock:
+            return len(self._pools.get(pool_key(user, topic, layout), []))
@@ -1,122 +1,188 @@
 # app.py
-from flask import Flask, request, jsonify, render_template, send_file, session, redirect, url_for
-from ollama_client import generate_content
+"""
+Application factory. `create_app()` builds the Flask app without touching
+the database; tables are created by an explicit migration step:
+
+    flask --app app init-db
+
+Module-level `app` is the default instance for WSGI servers (gunicorn
+app:app) and asgi.py. Heavy dependencies load on first use: python-pptx
+with the first export, httpx with the first async Ollama call and the topic
+cache log with the first lookup.
+"""
+from flask import Flask, Blueprint, current_app, request, jsonify, render_template, send_file, session, redirect, url_for, Response
+from ollama_client import generate_content, generate_outline, DeckSession, topic_cache
+import click
+from flask.cli import with_appcontext
 import random
 import json
+import itertools
 import os
 import tempfile
-from pptx import Presentation
-from pptx.util import Inches, Pt
-from pptx.enum.text import PP_ALIGN, MSO_ANCHOR
-from pptx.dml.color import RGBColor
-import textwrap
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
+from sqlalchemy import text
 
 # Import database models and authentication routes
-from models import db, User, Presentation as PresentationModel, Slide
+from models import db, User, Presentation as PresentationModel, Slide, upgrade_schema
 from auth import auth_bp, login_required
+from search import create_search_index, index_presentation, copy_index_entry, remove_presentation, search_presentations
+from limits import rate_limited, Overloaded
+import metrics
+import profiling
+import tracing
+from layouts import LAYOUTS, LAYOUT_SCHEMAS, truncate_content, slide_title, placeholder_content
+from alternates import AlternatesPool
+from dashboard_cache import DashboardCache, user_version, invalidate
+from bulk import bulk_generate_command
+from pptx_import import import_pptx_command
+from slide_codec import slide_storage_cli
+import thumbnails
+from outline import random_outline
+
+main_bp = Blueprint('main', __name__)
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev_key_change_in_production')
-app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///pptgenerator.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-# Initialize database
-db.init_app(app)
-
-# Register blueprints
-app.register_blueprint(auth_bp, url_prefix='/auth')
-
-# Available layouts
-LAYOUTS = [
-    "titleAndBullets",
-    "quote",
-    "imageAndParagraph",
-    "twoColumn",
-    "titleOnly"
-]
-
-# Template definitions
-TEMPLATES = {
-    'corporate': {
-        'colors': {
-            'primary': RGBColor(15, 76, 129),    # #0f4c81
-            'secondary': RGBColor(110, 156, 196), # #6e9cc4
-            'accent': RGBColor(242, 177, 56),    # #f2b138
-            'background': RGBColor(255, 255, 255), # #ffffff
-            'text': RGBColor(51, 51, 51)         # #333333
-        },
-        'font': 'Arial'
-    },
-    'creative': {
-        'colors': {
-            'primary': RGBColor(255, 107, 107),  # #ff6b6b
-            'secondary': RGBColor(78, 205, 196), # #4ecdc4
-            'accent': RGBColor(255, 209, 102),   # #ffd166
-            'background': RGBColor(249, 241, 230), # #f9f1e6
-            'text': RGBColor(90, 57, 33)         # #5a3921
-        },
-        'font': 'Georgia'
-    },
-    'minimal': {
-        'colors': {
-            'primary': RGBColor(44, 62, 80),     # #2c3e50
-            'secondary': RGBColor(149, 165, 166), # #95a5a6
-            'accent': RGBColor(231, 76, 60),     # #e74c3c
-            'background': RGBColor(248, 248, 248), # #f8f8f8
-            'text': RGBColor(34, 34, 34)         # #222222
-        },
-        'font': 'Helvetica'
-    },
-    'dark': {
-        'colors': {
-            'primary': RGBColor(187, 134, 252),  # #bb86fc
-            'secondary': RGBColor(3, 218, 198),  # #03dac6
-            'accent': RGBColor(207, 102, 121),   # #cf6679
-            'background': RGBColor(26, 26, 26),  # #1a1a1a
-            'text': RGBColor(245, 245, 245)      # #f5f5f5
-        },
-        'font': 'Roboto'
-    }
-}
-
-@app.route('/')
+def create_app(config=None):
+    """Build the app; `config` overrides the environment-derived settings"""
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev_key_change_in_production')
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///pptgenerator.db')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    
+    # Model routing tier per username, e.g. USER_TIERS="alice=premium,bob=premium"
+    app.config['USER_TIERS'] = dict(
+        entry.split('=', 1) for entry in os.environ.get('USER_TIERS', '').split(',') if '=' in entry
+    )
+    
+    # /api/generate answers within this many seconds; slides still generating get placeholders
+    app.config['DECK_DEADLINE_SECONDS'] = float(os.environ.get('DECK_DEADLINE_SECONDS', 120))
+    
+    # .pptx imports: uploads past the spool size go to a temp file, past the max they're refused
+    app.config['IMPORT_SPOOL_BYTES'] = int(os.environ.get('IMPORT_SPOOL_BYTES', 1024 * 1024))
+    app.config['IMPORT_MAX_BYTES'] = int(os.environ.get('IMPORT_MAX_BYTES', 200 * 1024 * 1024))
+    
+    # How new slide content is stored: 'json', 'compressed' or 'packed' (see slide_codec)
+    app.config['SLIDE_STORAGE'] = os.environ.get('SLIDE_STORAGE', 'json')
+    
+    # Cached dashboard thumbnails (default: instance/thumbnails)
+    app.config['THUMBNAIL_DIR'] = os.environ.get('THUMBNAIL_DIR')
+    
+    # Per-worker metrics snapshots merged by /metrics (default: instance/metrics)
+    app.config['METRICS_DIR'] = os.environ.get('METRICS_DIR')
+    
+    if config:
+        app.config.update(config)
+    
+    # Initialize database
+    db.init_app(app)
+    
+    # Register blueprints
+    app.register_blueprint(auth_bp, url_prefix='/auth')
+    app.register_blueprint(main_bp)
+    
+    # Request latency and per-request query counts, merged across workers
+    metrics.init_app(app, db)
+    
+    # Opt-in per-request profiler (?profile=1 or X-Profile: 1, allowlisted users only)
+    profiling.init_app(app, db)
+    
+    # Sampled request traces in Chrome trace format (TRACE_SAMPLE_RATE, off by default)
+    tracing.init_app(app, db)
+    
+    # Semantic topic cache, shared by workers through a log in the instance folder
+    if topic_cache is not None:
+        topic_cache.configure(os.environ.get('TOPIC_CACHE_PATH', os.path.join(app.instance_path, 'topic_cache.jsonl')))
+    
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(bulk_generate_command)
+    app.cli.add_command(import_pptx_command)
+    app.cli.add_command(slide_storage_cli)
+    app.cli.add_command(thumbnails.thumbnails_cli)
+    return app
+
+def init_db():
+    """Create missing tables and the search index (needs an app context)"""
+    db.create_all()
+    upgrade_schema()
+    create_search_index()
+
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Create missing tables and the search index; run once per deploy"""
+    init_db()
+    click.echo('Initialized the database.')
+
+@main_bp.route('/')
 def index():
     if 'user_id' in session:
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('main.dashboard'))
     return render_template('index.html')
 
-@app.route('/dashboard')
+@main_bp.route('/dashboard')
 @login_required
 def dashboard():
+    return render_dashboard()
+
+# Rendered dashboards per user, dropped when the user saves or deletes a deck
+dashboard_cache = DashboardCache()
+
+def render_dashboard():
+    """The signed-in user's dashboard, from the page cache while their decks are unchanged"""
     user_id = session.get('user_id')
-    username = session.get('username')
+    # Read before the query, so a write that commits meanwhile leaves the page stale
+    version = user_version(user_id)
+    html = dashboard_cache.get(user_id, version)
+    if html is not None:
+        return html
     
     # Get all presentations for the user
     presentations = PresentationModel.query.filter_by(user_id=user_id).order_by(PresentationModel.updated_at.desc()).all()
     
-    return render_template('dashboard.html', 
-                          username=username,
-                          presentations=presentations)
+    html = render_template('dashboard.html', 
+                           username=session.get('username'),
+                           presentations=presentations)
+    dashboard_cache.put(user_id, version, html)
+    return html
 
-@app.route('/editor')
+@main_bp.route('/editor')
 @login_required
 def editor():
     return render_template('editor.html')
 
-@app.route('/editor/<int:presentation_id>')
+@main_bp.route('/editor/<int:presentation_id>')
 @login_required
 def edit_presentation(presentation_id):
     user_id = session.get('user_id')
     presentation = PresentationModel.query.filter_by(id=presentation_id, user_id=user_id).first()
     
     if not presentation:
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('main.dashboard'))
     
     return render_template('editor.html', presentation=presentation.to_dict())
 
-@app.route('/api/generate', methods=['POST'])
+@main_bp.app_errorhandler(Overloaded)
+def handle_overloaded(error):
+    response = jsonify({'error': str(error)})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+@main_bp.route('/api/generate', methods=['POST'])
+@login_required
+@rate_limited('generate')
 def generate():
+    topic, template, slide_count, priority = deck_request()
+    
+    # Each Ollama call takes a global LLM slot (see ollama_client.post_prompt);
+    # a call turned away by a full queue answers 503 through handle_overloaded
+    slides, timings = generate_deck(topic, slide_count, priority, session.get('user_id'), user_tier())
+    
+    return deck_response(slides, timings, template)
+
+def deck_request():
+    """(topic, template, slide count, priority) from an /api/generate body"""
     data = request.json
     template = data.get('template')
     topic = data.get('topic')
@@ -125,99 +191,157 @@ def generate():
     # Limit slide count to reasonable number
     slide_count = min(max(1, slide_count), 10)
     
-    # Generate slides
-    slides = []
-    for _ in range(slide_count):
-        # Select a random layout for each slide
-        layout = random.choice(LAYOUTS)
-        
-        # Generate content using Ollama based on the layout and topic
-        content = generate_content(layout, topic)
+    # Single-slide requests are interactive edits; full decks queue behind them
+    priority = 'interactive' if slide_count == 1 else 'deck'
+    return topic, template, slide_count, priority
+
+def deck_response(slides, timings, template):
+    response = jsonify({
+        'slides': slides,
+        'template': template
+    })
+    response.headers['Server-Timing'] = ', '.join(
+        f'{stage};dur={seconds * 1000:.1f}' for stage, seconds in timings.items()
+    )
+    return response
+
+# Threads expanding one deck's slides; the scheduler still caps calls in flight
+DECK_EXPAND_WORKERS = 10
+
+# Share of the deck deadline the outline call may use before slides start without it
+OUTLINE_DEADLINE_SHARE = 0.5
+
+def placeholder_slide(entry, topic):
+    """Stand-in for a slide that missed the deck deadline, built from its outline entry"""
+    metrics.inc('deck_placeholder_slides_total')
+    content = placeholder_content(entry['layout'], entry['title'] or f"About {topic}", entry['point'])
+    return {'layout': entry['layout'], 'content': process_content_for_layout(content, entry['layout']),
+            'placeholder': True}
+
+def generate_deck(topic, slide_count, priority, user, tier=None):
+    """
+    Outline-first generation: one short call plans the deck (layout, title
+    and key point per slide), then all slides are expanded in parallel with
+    the outline as shared context. Single slides skip the outline. Returns
+    the slides and the seconds spent in each stage.
+    
+    Slides not ready by DECK_DEADLINE_SECONDS are returned as placeholders
+    (marked 'placeholder') built from their outline entry; their calls are
+    abandoned rather than awaited.
+    """
+    timings = {}
+    started = time.perf_counter()
+    budget = current_app.config['DECK_DEADLINE_SECONDS']
+    deadline = time.monotonic() + budget
+    
+    # Topic and outline are sent in a form Ollama can reuse across the deck
+    deck_session = DeckSession(topic, tier=tier)
+    # One worker more than slides, so an abandoned outline call can't hold up a slide
+    pool = ThreadPoolExecutor(max_workers=min(slide_count, DECK_EXPAND_WORKERS) + 1)
+    try:
+        outline = None
+        if slide_count > 1:
+            with profiling.span('outline', slides=slide_count):
+                planned = pool.submit(profiling.wrap(generate_outline), topic, slide_count, priority, user,
+                                      deck_session, deadline)
+                if wait([planned], timeout=budget * OUTLINE_DEADLINE_SHARE).done:
+                    outline = planned.result()
+                else:
+                    # A late outline must not land on the session the slides use
+                    deck_session = DeckSession(topic, tier=tier)
+        if outline is None:
+            outline = random_outline(slide_count)
+        timings['outline'] = time.perf_counter() - started
         
-        # Process content to prevent overflow
-        processed_content = process_content_for_layout(content, layout)
+        def expand(index):
+            layout = outline[index]['layout']
+            content = generate_content(layout, topic, priority, user, session=deck_session, index=index,
+                                       deadline=deadline)
+            if 'error' in content and time.monotonic() >= deadline:
+                # Gave up waiting for a model slot
+                return placeholder_slide(outline[index], topic)
+            return {'layout': layout, 'content': process_content_for_layout(content, layout)}
         
-        slides.append({
-            'layout': layout,
-            'content': processed_content
-        })
+        expand_started = time.perf_counter()
+        with profiling.span('expand', slides=slide_count):
+            futures = [pool.submit(profiling.wrap(expand), index) for index in range(slide_count)]
+            done, _ = wait(futures, timeout=max(0.0, deadline - time.monotonic()))
+            slides = [future.result() if future in done else placeholder_slide(outline[index], topic)
+                      for index, future in enumerate(futures)]
+        timings['expand'] = time.perf_counter() - expand_started
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    timings['total'] = time.perf_counter() - started
+    
+    for stage, seconds in timings.items():
+        metrics.observe('deck_stage_duration_seconds', seconds, stage=stage)
+    return slides, timings
+
+def user_tier():
+    """The signed-in user's model routing tier (see ollama_client.route_models)"""
+    return current_app.config['USER_TIERS'].get(session.get('username'), 'default')
+
+def generate_slide(layout, topic, user, avoid_titles, priority='interactive', tier=None):
+    """Generate and post-process one slide; None if the model call failed"""
+    content = generate_content(layout, topic, priority, user, avoid_titles, tier=tier)
+    if not isinstance(content, dict) or 'error' in content:
+        return None
+    return process_content_for_layout(content, layout)
+
+# Background alternates for /api/generate/slide, generated at batch priority
+alternates = AlternatesPool(
+    lambda layout, topic, user, avoid_titles, tier=None: generate_slide(layout, topic, user, avoid_titles, 'batch', tier),
+    slide_title
+)
+
+@main_bp.route('/api/generate/slide', methods=['POST'])
+@login_required
+@rate_limited('generate_slide')
+def generate_single_slide():
+    """Regenerate one slide, served from the prefetched alternates when possible"""
+    parsed = slide_request()
+    if parsed is None:
+        return jsonify({'error': 'Missing topic or unknown layout'}), 400
+    topic, layout, sibling_titles = parsed
+    user_id = session.get('user_id')
+    
+    content = alternates.take(user_id, topic, layout, sibling_titles)
+    pooled = content is not None
+    if content is None:
+        content = generate_slide(layout, topic, user_id, sibling_titles, tier=user_tier())
+        if content is None:
+            return jsonify({'error': 'Could not generate slide content'}), 502
+    
+    return slide_response(topic, layout, sibling_titles, content, pooled)
+
+def slide_request():
+    """(topic, layout, sibling titles) from an /api/generate/slide body; None if invalid"""
+    data = request.json
+    topic = data.get('topic')
+    layout = data.get('layout') or random.choice(LAYOUTS)
+    sibling_titles = [str(title) for title in data.get('siblingTitles', []) if title]
+    if not topic or layout not in LAYOUT_SCHEMAS:
+        return None
+    return topic, layout, sibling_titles
+
+def slide_response(topic, layout, sibling_titles, content, pooled):
+    # Keep alternates ready for the next click
+    alternates.prefetch(session.get('user_id'), topic, layout, sibling_titles, tier=user_tier())
     
     return jsonify({
-        'slides': slides,
-        'template': template
+        'slide': {'layout': layout, 'content': content},
+        'pooled': pooled
     })
 
 def process_content_for_layout(content, layout):
     """Process and truncate content based on layout to prevent overflow"""
-    processed = dict(content)
-    
-    if layout == 'titleAndBullets':
-        # Limit title length
-        if 'title' in processed and len(processed['title']) > 80:
-            processed['title'] = processed['title'][:77] + '...'
-        
-        # Limit number of bullets and length of each
-        if 'bullets' in processed:
-            # Keep maximum 5 bullets
-            processed['bullets'] = processed['bullets'][:5]
-            
-            # Limit length of each bullet
-            processed['bullets'] = [
-                (bullet[:97] + '...') if len(bullet) > 100 else bullet 
-                for bullet in processed['bullets']
-            ]
-    
-    elif layout == 'quote':
-        # Limit quote length
-        if 'quote' in processed and len(processed['quote']) > 150:
-            processed['quote'] = processed['quote'][:147] + '...'
-            
-        # Limit author length
-        if 'author' in processed and len(processed['author']) > 50:
-            processed['author'] = processed['author'][:47] + '...'
-    
-    elif layout == 'imageAndParagraph':
-        # Limit title length
-        if 'title' in processed and len(processed['title']) > 80:
-            processed['title'] = processed['title'][:77] + '...'
-            
-        # Limit paragraph length
-        if 'paragraph' in processed and len(processed['paragraph']) > 300:
-            processed['paragraph'] = processed['paragraph'][:297] + '...'
-            
-        # Limit image description length
-        if 'imageDescription' in processed and len(processed['imageDescription']) > 100:
-            processed['imageDescription'] = processed['imageDescription'][:97] + '...'
-    
-    elif layout == 'twoColumn':
-        # Limit title length
-        if 'title' in processed and len(processed['title']) > 80:
-            processed['title'] = processed['title'][:77] + '...'
-            
-        # Limit column titles length
-        if 'column1Title' in processed and len(processed['column1Title']) > 50:
-            processed['column1Title'] = processed['column1Title'][:47] + '...'
-        if 'column2Title' in processed and len(processed['column2Title']) > 50:
-            processed['column2Title'] = processed['column2Title'][:47] + '...'
-            
-        # Limit column content length
-        if 'column1Content' in processed and len(processed['column1Content']) > 200:
-            processed['column1Content'] = processed['column1Content'][:197] + '...'
-        if 'column2Content' in processed and len(processed['column2Content']) > 200:
-            processed['column2Content'] = processed['column2Content'][:197] + '...'
-    
-    elif layout == 'titleOnly':
-        # Limit title length
-        if 'title' in processed and len(processed['title']) > 80:
-            processed['title'] = processed['title'][:77] + '...'
-            
-        # Limit subtitle length
-        if 'subtitle' in processed and len(processed['subtitle']) > 120:
-            processed['subtitle'] = processed['subtitle'][:117] + '...'
-    
-    return processed
-
-@app.route('/api/save', methods=['POST'])
+    # Called per slide and cheaper than a span, so only wrapped when one is kept
+    if not profiling.recording():
+        return truncate_content(content, layout)
+    with profiling.span('process_content', layout=layout):
+        return truncate_content(content, layout)
+
+@main_bp.route('/api/save', methods=['POST'])
 @login_required
 def save_presentation():
     user_id = session.get('user_id')
@@ -269,6 +393,11 @@ def save_presentation():
         )
         db.session.add(slide)
     
+    # Keep the search index and dashboard thumbnail in sync
+    index_presentation(presentation.id, topic, slides)
+    thumbnails.refresh(presentation, slides[0])
+    
+    invalidate(user_id)
     db.session.commit()
     
     return jsonify({
@@ -276,7 +405,7 @@ def save_presentation():
         'presentation': presentation.to_dict()
     })
 
-@app.route('/api/presentations', methods=['GET'])
+@main_bp.route('/api/presentations', methods=['GET'])
 @login_required
 def list_presentations():
     user_id = session.get('user_id')
@@ -288,7 +417,7 @@ def list_presentations():
         'presentations': [p.to_dict() for p in presentations]
     })
 
-@app.route('/api/presentations/<int:presentation_id>', methods=['GET'])
+@main_bp.route('/api/presentations/<int:presentation_id>', methods=['GET'])
 @login_required
 def get_presentation(presentation_id):
     user_id = session.get('user_id')
@@ -303,7 +432,7 @@ def get_presentation(presentation_id):
         'presentation': presentation.to_dict()
     })
 
-@app.route('/api/presentations/<int:presentation_id>', methods=['DELETE'])
+@main_bp.route('/api/presentations/<int:presentation_id>', methods=['DELETE'])
 @login_required
 def delete_presentation(presentation_id):
     user_id = session.get('user_id')
@@ -315,14 +444,158 @@ def delete_presentation(presentation_id):
         return jsonify({'error': 'Presentation not found'}), 404
     
     # Delete the presentation
+    remove_presentation(presentation.id)
     db.session.delete(presentation)
+    invalidate(user_id)
     db.session.commit()
     
     return jsonify({
         'message': 'Presentation deleted successfully'
     })
 
-@app.route('/api/export', methods=['POST'])
+@main_bp.route('/api/presentations/<int:presentation_id>/clone', methods=['POST'])
+@login_required
+def clone_presentation(presentation_id):
+    """Copy a presentation, optionally with another template or topic, without loading its slides"""
+    user_id = session.get('user_id')
+    data = request.get_json(silent=True) or {}
+    
+    source = PresentationModel.query.filter_by(id=presentation_id, user_id=user_id).first()
+    
+    if not source:
+        return jsonify({'error': 'Presentation not found'}), 404
+    
+    topic = data.get('topic') or source.topic
+    presentation = PresentationModel(
+        user_id=user_id,
+        topic=topic,
+        template_id=data.get('template') or source.template_id,
+        slide_count=source.slide_count
+    )
+    db.session.add(presentation)
+    db.session.flush()  # To get the presentation ID
+    
+    # Slides and their search text are copied set-based, inside the database
+    db.session.execute(text(
+        "INSERT INTO slides (presentation_id, slide_order, layout, content_json, content_format, content_blob) "
+        "SELECT :id, slide_order, layout, content_json, content_format, content_blob "
+        "FROM slides WHERE presentation_id = :source_id"
+    ), {'id': presentation.id, 'source_id': source.id})
+    copy_index_entry(source.id, presentation.id, topic)
+    thumbnails.clone(source, presentation)
+    
+    invalidate(user_id)
+    db.session.commit()
+    
+    return jsonify({
+        'message': 'Presentation cloned successfully',
+        'presentation': presentation.to_dict(slides=False)
+    }), 201
+
+@main_bp.route('/api/import', methods=['POST'])
+@login_required
+@rate_limited('import')
+def import_presentation():
+    """Save an uploaded .pptx as a presentation, reading it a slide at a time"""
+    from pptx_import import iter_slides, store_import, deck_topic, ImportFailed
+    user_id = session.get('user_id')
+    
+    if request.content_length and request.content_length > current_app.config['IMPORT_MAX_BYTES']:
+        return jsonify({'error': 'File too large'}), 413
+    
+    # A multipart upload is spooled to disk by the form parser; a raw body is spooled here
+    upload = request.files.get('file')
+    if upload is not None:
+        filename, stream = upload.filename, upload.stream
+    else:
+        filename = request.args.get('filename')
+        stream = tempfile.SpooledTemporaryFile(max_size=current_app.config['IMPORT_SPOOL_BYTES'])
+        size = 0
+        while chunk := request.stream.read(64 * 1024):
+            size += len(chunk)
+            if size > current_app.config['IMPORT_MAX_BYTES']:
+                return jsonify({'error': 'File too large'}), 413
+            stream.write(chunk)
+        stream.seek(0)
+    
+    try:
+        slides = iter_slides(stream)
+        first = next(slides, None)
+        if first is None:
+            return jsonify({'error': 'The presentation has no slides'}), 400
+        topic = request.form.get('topic') or request.args.get('topic') or deck_topic(first, filename)
+        template_id = request.form.get('template') or request.args.get('template') or 'corporate'
+        presentation = store_import(user_id, topic, template_id, itertools.chain([first], slides))
+    except ImportFailed as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    finally:
+        stream.close()
+    
+    return jsonify({
+        'message': 'Presentation imported successfully',
+        'presentation': presentation.to_dict(slides=False)
+    }), 201
+
+# Thumbnail URLs change with their content, so browsers may keep them for a year
+THUMBNAIL_MAX_AGE = 365 * 24 * 3600
+
+@main_bp.route('/thumbnails/<key>.png')
+@login_required
+def thumbnail(key):
+    """A deck's first-slide thumbnail; immutable, since the URL is a hash of the slide"""
+    user_id = session.get('user_id')
+    if not thumbnails.KEY_PATTERN.fullmatch(key):
+        return jsonify({'error': 'Thumbnail not found'}), 404
+    
+    presentation = PresentationModel.query.filter_by(user_id=user_id, thumbnail_hash=key).first()
+    if not presentation:
+        return jsonify({'error': 'Thumbnail not found'}), 404
+    
+    directory = thumbnails.cache_dir()
+    path = thumbnails.cache_path(directory, key)
+    if not os.path.exists(path):
+        # The background render hasn't finished (or the file was pruned)
+        first_slide = Slide.query.filter_by(presentation_id=presentation.id, slide_order=0).first()
+        if not first_slide:
+            return jsonify({'error': 'Thumbnail not found'}), 404
+        path = thumbnails.store(directory, key, first_slide.layout, first_slide.content, presentation.template_id)
+    
+    response = send_file(path, mimetype='image/png', max_age=THUMBNAIL_MAX_AGE)
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.immutable = True
+    return response
+
+@main_bp.route('/api/search', methods=['GET'])
+@login_required
+def search():
+    user_id = session.get('user_id')
+    query = request.args.get('q', '').strip()
+    page = max(1, request.args.get('page', 1, type=int))
+    per_page = min(max(1, request.args.get('per_page', 20, type=int)), 100)
+    
+    if not query:
+        return jsonify({'error': 'Missing search query'}), 400
+    
+    total, results = search_presentations(user_id, query, page, per_page)
+    
+    return jsonify({
+        'query': query,
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'results': results
+    })
+
+@main_bp.route('/metrics')
+def metrics_endpoint():
+    if not metrics.allowed(current_app, request.remote_addr):
+        return jsonify({'error': 'Not allowed'}), 403
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@main_bp.route('/api/export', methods=['POST'])
+@rate_limited('export')
 def export_pptx():
     data = request.json
     slides = data.get('slides', [])
@@ -332,8 +605,10 @@ def export_pptx():
     with tempfile.NamedTemporaryFile(suffix='.pptx', delete=False) as temp_file:
         temp_filename = temp_file.name
     
-    # Generate the PPTX file
-    create_presentation(temp_filename, slides, template_id)
+    # Generate the PPTX file; python-pptx is only loaded by workers that export
+    from export import create_presentation
+    with metrics.timer('export_render_duration_seconds'):
+        create_presentation(temp_filename, slides, template_id)
     
     # Send the file
     return send_file(
@@ -343,518 +618,16 @@ def export_pptx():
         mimetype='application/vnd.openxmlformats-officedocument.presentationml.presentation'
     )
 
-def hex_to_rgb(hex_color):
-    """Convert hex color to RGB tuple"""
-    hex_color = hex_color.lstrip('#')
-    return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-
-def apply_template_to_slide(slide, template_id):
-    """Apply template styling to a slide"""
-    template = TEMPLATES.get(template_id, TEMPLATES['corporate'])
-    
-    # Set background color
-    slide.background.fill.solid()
-    slide.background.fill.fore_color.rgb = template['colors']['background']
-    
-    return template
-
-def apply_text_formatting(paragraph, font_size, color, font_name, bold=False, italic=False, alignment=PP_ALIGN.LEFT):
-    """Apply consistent text formatting to a paragraph"""
-    paragraph.font.size = Pt(font_size)
-    paragraph.font.color.rgb = color
-    paragraph.font.name = font_name
-    paragraph.font.bold = bold
-    paragraph.font.italic = italic
-    paragraph.alignment = alignment
-
-
-def create_title_only_slide(presentation, content, template):
-    """Create a title-only slide"""
-    slide_layout = presentation.slide_layouts[0]  # Title Slide layout
-    slide = presentation.slides.add_slide(slide_layout)
-    
-    # Apply template
-    template = apply_template_to_slide(slide, template)
-    
-    # Set title - ensure it's a string
-    title = slide.shapes.title
-    title_text = content.get('title', 'Title')
-    # Check if it's a dictionary (handle special formatting from frontend)
-    if isinstance(title_text, dict) and 'text' in title_text:
-        title_text = title_text['text']
-    # Ensure it's a string
-    title_text = str(title_text)
-    title.text = title_text
-    
-    apply_text_formatting(
-        title.text_frame.paragraphs[0], 
-        font_size=54,
-        color=template['colors']['primary'],
-        font_name=template['font'],
-        bold=True,
-        alignment=PP_ALIGN.CENTER
-    )
-    
-    # Set subtitle - ensure it's a string
-    subtitle = slide.placeholders[1]
-    subtitle_text = content.get('subtitle', 'Subtitle')
-    # Check if it's a dictionary
-    if isinstance(subtitle_text, dict) and 'text' in subtitle_text:
-        subtitle_text = subtitle_text['text']
-    # Ensure it's a string
-    subtitle_text = str(subtitle_text)
-    subtitle.text = subtitle_text
-    
-    apply_text_formatting(
-        subtitle.text_frame.paragraphs[0], 
-        font_size=32,
-        color=template['colors']['secondary'],
-        font_name=template['font'],
-        alignment=PP_ALIGN.CENTER
-    )
-    
-    return slide
-
-def create_two_column_slide(presentation, content, template):
-    """Create a slide with two columns"""
-    slide_layout = presentation.slide_layouts[6]  # Blank layout
-    slide = presentation.slides.add_slide(slide_layout)
-    
-    # Apply template
-    template = apply_template_to_slide(slide, template)
-    
-    # Add title - ensure it's a string
-    left = Inches(0.5)
-    top = Inches(0.5)
-    width = Inches(9)
-    height = Inches(1)
-    
-    title_box = slide.shapes.add_textbox(left, top, width, height)
-    text_frame = title_box.text_frame
-    
-    title_text = content.get('title', 'Title')
-    # Check if it's a dictionary
-    if isinstance(title_text, dict) and 'text' in title_text:
-        title_text = title_text['text']
-    # Ensure it's a string
-    title_text = str(title_text)
-    
-    p = text_frame.add_paragraph()
-    p.text = title_text
-    apply_text_formatting(
-        p, 
-        font_size=40,
-        color=template['colors']['primary'],
-        font_name=template['font'],
-        bold=True,
-        alignment=PP_ALIGN.LEFT
-    )
-    
-    # Column 1 title
-    left = Inches(0.5)
-    top = Inches(1.5)
-    width = Inches(4.5)
-    height = Inches(0.75)
-    
-    col1_title_box = slide.shapes.add_textbox(left, top, width, height)
-    text_frame = col1_title_box.text_frame
-    
-    col1_title_text = content.get('column1Title', 'Column 1')
-    # Check if it's a dictionary
-    if isinstance(col1_title_text, dict) and 'text' in col1_title_text:
-        col1_title_text = col1_title_text['text']
-    # Ensure it's a string
-    col1_title_text = str(col1_title_text)
-    
-    p = text_frame.add_paragraph()
-    p.text = col1_title_text
-    apply_text_formatting(
-        p, 
-        font_size=28,
-        color=template['colors']['secondary'],
-        font_name=template['font'],
-        bold=True,
-        alignment=PP_ALIGN.LEFT
-    )
-    
-    # Column 1 content
-    left = Inches(0.5)
-    top = Inches(2.25)
-    width = Inches(4.5)
-    height = Inches(3)
-    
-    col1_content_box = slide.shapes.add_textbox(left, top, width, height)
-    text_frame = col1_content_box.text_frame
-    text_frame.word_wrap = True
-    
-    column1_text = content.get('column1Content', 'Column 1 content')
-    # Handle if it's an array, dictionary, or string
-    if isinstance(column1_text, list):
-        column1_text = "\n".join([str(item) for item in column1_text])
-    elif isinstance(column1_text, dict) and 'text' in column1_text:
-        column1_text = column1_text['text']
-    # Ensure it's a string
-    column1_text = str(column1_text)
-    
-    wrapped_column1 = textwrap.fill(column1_text, width=50)
-    
-    p = text_frame.add_paragraph()
-    p.text = wrapped_column1
-    apply_text_formatting(
-        p, 
-        font_size=20,
-        color=template['colors']['text'],
-        font_name=template['font'],
-        alignment=PP_ALIGN.LEFT
-    )
-    
-    # Column 2 title
-    left = Inches(5.5)
-    top = Inches(1.5)
-    width = Inches(4.5)
-    height = Inches(0.75)
-    
-    col2_title_box = slide.shapes.add_textbox(left, top, width, height)
-    text_frame = col2_title_box.text_frame
-    
-    col2_title_text = content.get('column2Title', 'Column 2')
-    # Check if it's a dictionary
-    if isinstance(col2_title_text, dict) and 'text' in col2_title_text:
-        col2_title_text = col2_title_text['text']
-    # Ensure it's a string
-    col2_title_text = str(col2_title_text)
-    
-    p = text_frame.add_paragraph()
-    p.text = col2_title_text
-    apply_text_formatting(
-        p, 
-        font_size=28,
-        color=template['colors']['secondary'],
-        font_name=template['font'],
-        bold=True,
-        alignment=PP_ALIGN.LEFT
-    )
-    
-    # Column 2 content
-    left = Inches(5.5)
-    top = Inches(2.25)
-    width = Inches(4.5)
-    height = Inches(3)
-    
-    col2_content_box = slide.shapes.add_textbox(left, top, width, height)
-    text_frame = col2_content_box.text_frame
-    text_frame.word_wrap = True
-    
-    column2_text = content.get('column2Content', 'Column 2 content')
-    # Handle if it's an array, dictionary, or string
-    if isinstance(column2_text, list):
-        column2_text = "\n".join([str(item) for item in column2_text])
-    elif isinstance(column2_text, dict) and 'text' in column2_text:
-        column2_text = column2_text['text']
-    # Ensure it's a string
-    column2_text = str(column2_text)
-    
-    wrapped_column2 = textwrap.fill(column2_text, width=50)
-    
-    p = text_frame.add_paragraph()
-    p.text = wrapped_column2
-    apply_text_formatting(
-        p, 
-        font_size=20,
-        color=template['colors']['text'],
-        font_name=template['font'],
-        alignment=PP_ALIGN.LEFT
-    )
-    
-    return slide
-
-def create_image_and_paragraph_slide(presentation, content, template):
-    """Create a slide with an image placeholder and paragraph"""
-    slide_layout = presentation.slide_layouts[6]  # Blank layout
-    slide = presentation.slides.add_slide(slide_layout)
-    
-    # Apply template
-    template = apply_template_to_slide(slide, template)
-    
-    # Add title - ensure it's a string
-    left = Inches(0.5)
-    top = Inches(0.5)
-    width = Inches(9)
-    height = Inches(1)
-    
-    title_box = slide.shapes.add_textbox(left, top, width, height)
-    text_frame = title_box.text_frame
-    
-    title_text = content.get('title', 'Title')
-    # Check if it's a dictionary
-    if isinstance(title_text, dict) and 'text' in title_text:
-        title_text = title_text['text']
-    # Ensure it's a string
-    title_text = str(title_text)
-    
-    p = text_frame.add_paragraph()
-    p.text = title_text
-    apply_text_formatting(
-        p, 
-        font_size=40,
-        color=template['colors']['primary'],
-        font_name=template['font'],
-        bold=True,
-        alignment=PP_ALIGN.LEFT
-    )
-    
-    # Add paragraph
-    left = Inches(0.5)
-    top = Inches(1.5)
-    width = Inches(4.5)
-    height = Inches(3.5)
-    
-    text_box = slide.shapes.add_textbox(left, top, width, height)
-    text_frame = text_box.text_frame
-    text_frame.word_wrap = True
-    
-    paragraph_text = content.get('paragraph', 'Paragraph text')
-    # Check if it's a dictionary or list
-    if isinstance(paragraph_text, dict) and 'text' in paragraph_text:
-        paragraph_text = paragraph_text['text']
-    elif isinstance(paragraph_text, list):
-        paragraph_text = "\n".join([str(item) for item in paragraph_text])
-    # Ensure it's a string
-    paragraph_text = str(paragraph_text)
-    
-    wrapped_text = textwrap.fill(paragraph_text, width=60)
-    
-    p = text_frame.add_paragraph()
-    p.text = wrapped_text
-    apply_text_formatting(
-        p, 
-        font_size=20,
-        color=template['colors']['text'],
-        font_name=template['font'],
-        alignment=PP_ALIGN.LEFT
-    )
-    
-    # Add image placeholder
-    left = Inches(5.5)
-    top = Inches(1.5)
-    width = Inches(4)
-    height = Inches(3.5)
-    
-    img_placeholder = slide.shapes.add_shape(
-        1,  # Rectangle
-        left, top, width, height
-    )
-    img_placeholder.fill.solid()
-    img_placeholder.fill.fore_color.rgb = template['colors']['secondary']
-    img_placeholder.line.color.rgb = template['colors']['primary']
-    
-    # Add image description
-    left = Inches(5.5)
-    top = Inches(3)
-    width = Inches(4)
-    height = Inches(0.75)
-    
-    desc_box = slide.shapes.add_textbox(left, top, width, height)
-    text_frame = desc_box.text_frame
-    text_frame.word_wrap = True
-    
-    img_desc = content.get('imageDescription', 'Image description')
-    # Check if it's a dictionary
-    if isinstance(img_desc, dict) and 'text' in img_desc:
-        img_desc = img_desc['text']
-    # Ensure it's a string
-    img_desc = str(img_desc)
-    
-    p = text_frame.add_paragraph()
-    p.text = img_desc
-    apply_text_formatting(
-        p, 
-        font_size=16,
-        color=template['colors']['background'],
-        font_name=template['font'],
-        alignment=PP_ALIGN.CENTER
-    )
-    
-    return slide
-
-def create_quote_slide(presentation, content, template):
-    """Create a slide with a quote"""
-    slide_layout = presentation.slide_layouts[6]  # Blank layout
-    slide = presentation.slides.add_slide(slide_layout)
-    
-    # Apply template
-    template = apply_template_to_slide(slide, template)
-    
-    # Add quote text
-    left = Inches(1)
-    top = Inches(2)
-    width = Inches(8)
-    height = Inches(2)
-    
-    quote_box = slide.shapes.add_textbox(left, top, width, height)
-    text_frame = quote_box.text_frame
-    text_frame.word_wrap = True
-    
-    # Split the quote into shorter lines if needed
-    quote_text = content.get("quote", "Quote goes here")
-    # Check if it's a dictionary
-    if isinstance(quote_text, dict) and 'text' in quote_text:
-        quote_text = quote_text['text']
-    # Ensure it's a string
-    quote_text = str(quote_text)
-    
-    wrapped_quote = textwrap.fill(quote_text, width=70)
-    
-    p = text_frame.add_paragraph()
-    p.text = f'"{wrapped_quote}"'
-    apply_text_formatting(
-        p, 
-        font_size=32,
-        color=template['colors']['primary'],
-        font_name=template['font'],
-        italic=True,
-        alignment=PP_ALIGN.CENTER
-    )
-    
-    # Add author
-    left = Inches(5)
-    top = Inches(4.5)
-    width = Inches(4)
-    height = Inches(1)
-    
-    author_box = slide.shapes.add_textbox(left, top, width, height)
-    text_frame = author_box.text_frame
-    
-    author_text = content.get("author", "Author")
-    # Check if it's a dictionary
-    if isinstance(author_text, dict) and 'text' in author_text:
-        author_text = author_text['text']
-    # Ensure it's a string
-    author_text = str(author_text)
-    
-    p = text_frame.add_paragraph()
-    p.text = f'— {author_text}'
-    apply_text_formatting(
-        p, 
-        font_size=24,
-        color=template['colors']['secondary'],
-        font_name=template['font'],
-        alignment=PP_ALIGN.RIGHT
-    )
-    
-    return slide
-
-def create_title_and_bullets_slide(presentation, content, template):
-    """Create a slide with title and bullet points"""
-    slide_layout = presentation.slide_layouts[1]  # Title and Content layout
-    slide = presentation.slides.add_slide(slide_layout)
-    
-    # Apply template
-    template = apply_template_to_slide(slide, template)
-    
-    # Set title - ensure it's a string
-    title = slide.shapes.title
-    title_text = content.get('title', 'Title')
-    # Check if it's a dictionary
-    if isinstance(title_text, dict) and 'text' in title_text:
-        title_text = title_text['text']
-    # Ensure it's a string
-    title_text = str(title_text)
-    title.text = title_text
-    
-    apply_text_formatting(
-        title.text_frame.paragraphs[0], 
-        font_size=40,
-        color=template['colors']['primary'],
-        font_name=template['font'],
-        bold=True,
-        alignment=PP_ALIGN.LEFT
-    )
-    
-    # Set bullet points
-    content_shape = slide.placeholders[1]
-    text_frame = content_shape.text_frame
-    text_frame.clear()
-    text_frame.word_wrap = True
-    
-    # Ensure proper vertical alignment
-    text_frame.vertical_anchor = MSO_ANCHOR.TOP
-    
-    bullets = content.get('bullets', [])
-    # Process bullets to ensure they are strings
-    processed_bullets = []
-    
-    if isinstance(bullets, list):
-        for bullet in bullets:
-            if isinstance(bullet, dict) and 'text' in bullet:
-                processed_bullets.append(bullet['text'])
-            else:
-                processed_bullets.append(str(bullet))
-    elif isinstance(bullets, str):
-        processed_bullets = [bullets]
-    else:
-        processed_bullets = ["No bullet points available"]
-    
-    for bullet in processed_bullets:
-        p = text_frame.add_paragraph()
-        p.text = bullet
-        apply_text_formatting(
-            p, 
-            font_size=24,
-            color=template['colors']['text'],
-            font_name=template['font'],
-            alignment=PP_ALIGN.LEFT
-        )
-        p.level = 0
-    
-    return slide
-
-def create_presentation(filename, slides, template_id):
-    """Create a PowerPoint presentation with multiple slides"""
-    prs = Presentation()
-    
-    # Set the slide size to 16:9 aspect ratio
-    prs.slide_width = Inches(10)
-    prs.slide_height = Inches(5.625)
-    
-    # Create slides based on their layout type
-    for slide_data in slides:
-        layout = slide_data.get('layout')
-        content = slide_data.get('content', {})
-        
-        if layout == 'titleAndBullets':
-            create_title_and_bullets_slide(prs, content, template_id)
-        elif layout == 'quote':
-            create_quote_slide(prs, content, template_id)
-        elif layout == 'imageAndParagraph':
-            create_image_and_paragraph_slide(prs, content, template_id)
-        elif layout == 'twoColumn':
-            create_two_column_slide(prs, content, template_id)
-        elif layout == 'titleOnly':
-            create_title_only_slide(prs, content, template_id)
-    
-    # Save the presentation
-    prs.save(filename)
-    
-    return filename
-
 # Create presentation routes for handling specific endpoints
-@app.route('/presentations')
+@main_bp.route('/presentations')
 @login_required
 def presentations_list():
-    user_id = session.get('user_id')
-    username = session.get('username')
-    
-    # Get all presentations for the user
-    presentations = PresentationModel.query.filter_by(user_id=user_id).order_by(PresentationModel.updated_at.desc()).all()
-    
-    return render_template('dashboard.html', 
-                          username=username,
-                          presentations=presentations)
+    return render_dashboard()
 
-# Initialize database tables
-with app.app_context():
-    db.create_all()
+app = create_app()
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    # The development server creates the tables itself
+    with app.app_context():
+        init_db()
+    app.run(debug=True)
@@ -0,0 +1,285 @@
+# asgi.py
+"""
+ASGI serving mode: uvicorn asgi:application
+
+Generation routes (/api/generate and /api/generate/slide) run as coroutines
+that await Ollama through the pooled async client, so an in-flight
+generation costs a task on the event loop instead of an OS thread and a
+deck's slides are tasks rather than pool threads. Export rendering is
+CPU-bound and is dispatched to its own small thread pool. Every other route
+is the unchanged Flask app, run in a worker thread through a WSGI bridge.
+Request bodies are spooled (to disk past IMPORT_SPOOL_BYTES) and refused
+with a 413 once they pass MAX_CONTENT_LENGTH, or IMPORT_MAX_BYTES if that
+is unset; WSGI responses are sent a chunk at a time as the app yields them.
+
+The coroutine routes run inside a Flask request context built from the
+ASGI scope, with the same before/after-request hooks, error handlers and
+login and rate-limit decorators as the WSGI routes, so sessions and auth
+behave identically in both modes.
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, session, jsonify
+
+import metrics
+import profiling
+from app import app, deck_request, deck_response, slide_request, slide_response, user_tier
+from app import alternates, placeholder_slide, process_content_for_layout, OUTLINE_DEADLINE_SHARE
+from auth import login_required
+from limits import rate_limited
+from ollama_client import agenerate_content, agenerate_outline, DeckSession
+from outline import random_outline
+
+# Concurrent .pptx renders per worker; more threads only contend for the GIL
+EXPORT_WORKERS = int(os.environ.get('EXPORT_WORKERS', os.cpu_count() or 2))
+export_executor = ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix='export')
+
+def checks(limit):
+    """The WSGI route's login and rate-limit checks: None to proceed, else the response to send"""
+    return login_required(rate_limited(limit)(lambda: None))
+
+async def agenerate_deck(topic, slide_count, priority, user, tier=None):
+    """
+    generate_deck on the event loop: the outline and every slide are tasks,
+    and tasks still running at the deck deadline are cancelled and replaced
+    by placeholders.
+    """
+    timings = {}
+    started = time.perf_counter()
+    budget = current_app.config['DECK_DEADLINE_SECONDS']
+    deadline = time.monotonic() + budget
+
+    deck_session = DeckSession(topic, tier=tier)
+    outline = None
+    if slide_count > 1:
+        with profiling.span('outline', slides=slide_count):
+            try:
+                outline = await asyncio.wait_for(
+                    agenerate_outline(topic, slide_count, priority, user, deck_session, deadline),
+                    budget * OUTLINE_DEADLINE_SHARE
+                )
+            except asyncio.TimeoutError:
+                outline = None
+    if outline is None:
+        outline = random_outline(slide_count)
+    timings['outline'] = time.perf_counter() - started
+
+    async def expand(index):
+        layout = outline[index]['layout']
+        content = await agenerate_content(layout, topic, priority, user, session=deck_session, index=index,
+                                          deadline=deadline)
+        if 'error' in content and time.monotonic() >= deadline:
+            return placeholder_slide(outline[index], topic)
+        return {'layout': layout, 'content': process_content_for_layout(content, layout)}
+
+    expand_started = time.perf_counter()
+    with profiling.span('expand', slides=slide_count):
+        tasks = [asyncio.ensure_future(expand(index)) for index in range(slide_count)]
+        done, late = await asyncio.wait(tasks, timeout=max(0.0, deadline - time.monotonic()))
+        for task in late:
+            task.cancel()
+        slides = [task.result() if task in done else placeholder_slide(outline[index], topic)
+                  for index, task in enumerate(tasks)]
+    timings['expand'] = time.perf_counter() - expand_started
+    timings['total'] = time.perf_counter() - started
+
+    for stage, seconds in timings.items():
+        metrics.observe('deck_stage_duration_seconds', seconds, stage=stage)
+    return slides, timings
+
+async def agenerate_slide(layout, topic, user, avoid_titles, priority='interactive', tier=None):
+    """generate_slide for coroutines"""
+    content = await agenerate_content(layout, topic, priority, user, avoid_titles, tier=tier)
+    if not isinstance(content, dict) or 'error' in content:
+        return None
+    return process_content_for_layout(content, layout)
+
+async def generate():
+    denied = await asyncio.to_thread(checks('generate'))
+    if denied is not None:
+        return denied
+    topic, template, slide_count, priority = deck_request()
+
+    slides, timings = await agenerate_deck(topic, slide_count, priority, session.get('user_id'), user_tier())
+
+    return deck_response(slides, timings, template)
+
+async def generate_single_slide():
+    denied = await asyncio.to_thread(checks('generate_slide'))
+    if denied is not None:
+        return denied
+    parsed = slide_request()
+    if parsed is None:
+        return jsonify({'error': 'Missing topic or unknown layout'}), 400
+    topic, layout, sibling_titles = parsed
+    user_id = session.get('user_id')
+
+    content = alternates.take(user_id, topic, layout, sibling_titles)
+    pooled = content is not None
+    if content is None:
+        content = await agenerate_slide(layout, topic, user_id, sibling_titles, tier=user_tier())
+        if content is None:
+            return jsonify({'error': 'Could not generate slide content'}), 502
+
+    return slide_response(topic, layout, sibling_titles, content, pooled)
+
+# (method, path) -> coroutine view
+ASYNC_ROUTES = {
+    ('POST', '/api/generate'): generate,
+    ('POST', '/api/generate/slide'): generate_single_slide
+}
+
+# (method, path) -> thread pool for WSGI routes that shouldn't share the default one
+THREAD_ROUTES = {
+    ('POST', '/api/export'): export_executor
+}
+
+def wsgi_environ(scope, body, length):
+    """A WSGI environ for an ASGI HTTP scope and its spooled request body of `length` bytes"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client')
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf8').decode('latin1'),
+        'PATH_INFO': scope['path'].encode('utf8').decode('latin1'),
+        'QUERY_STRING': scope['query_string'].decode('latin1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0] if client else '',
+        'CONTENT_LENGTH': str(length),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    for name, value in scope['headers']:
+        key = name.decode('latin1').upper().replace('-', '_')
+        value = value.decode('latin1')
+        if key == 'CONTENT_LENGTH':
+            continue
+        if key == 'CONTENT_TYPE':
+            environ[key] = value
+            continue
+        key = 'HTTP_' + key
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+def run_wsgi(environ, send, loop):
+    """Run the Flask app on one request in a worker thread, sending each chunk as it's produced"""
+    def send_message(message):
+        asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+    def write(chunk):
+        send_message({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+
+    def start_response(status, headers, exc_info=None):
+        send_message({
+            'type': 'http.response.start',
+            'status': int(status.split(' ', 1)[0]),
+            'headers': [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in headers]
+        })
+        return write
+
+    result = app(environ, start_response)
+    try:
+        for chunk in result:
+            if chunk:
+                write(chunk)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    send_message({'type': 'http.response.body', 'body': b''})
+
+async def run_async_view(view, environ):
+    """Dispatch a coroutine view the way Flask dispatches a WSGI one"""
+    ctx = app.request_context(environ)
+    error = None
+    ctx.push()
+    try:
+        try:
+            rv = app.preprocess_request()
+            if rv is None:
+                rv = await view()
+        except Exception as e:
+            rv = app.handle_user_exception(e)
+        response = app.finalize_request(rv)
+    except Exception as e:
+        error = e
+        response = app.handle_exception(e)
+    try:
+        return response.status_code, list(response.headers.items()), response.get_data()
+    finally:
+        ctx.pop(error)
+
+async def read_body(receive, limit):
+    """The request body spooled to a file and its length, or None once it passes `limit` bytes"""
+    body = tempfile.SpooledTemporaryFile(max_size=app.config['IMPORT_SPOOL_BYTES'])
+    length = 0
+    while True:
+        message = await receive()
+        chunk = message.get('body', b'')
+        length += len(chunk)
+        if length > limit:
+            body.close()
+            return None, length
+        body.write(chunk)
+        if not message.get('more_body'):
+            body.seek(0)
+            return body, length
+
+async def send_json(send, status, payload):
+    body = json.dumps(payload).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    if scope['type'] != 'http':
+        return
+
+    limit = app.config.get('MAX_CONTENT_LENGTH') or app.config['IMPORT_MAX_BYTES']
+    declared = dict(scope['headers']).get(b'content-length', b'')
+    if declared.isdigit() and int(declared) > limit:
+        return await send_json(send, 413, {'error': 'Request body too large'})
+    body, length = await read_body(receive, limit)
+    if body is None:
+        return await send_json(send, 413, {'error': 'Request body too large'})
+
+    try:
+        environ = wsgi_environ(scope, body, length)
+        route = (scope['method'], scope['path'])
+        view = ASYNC_ROUTES.get(route)
+        if view is None:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(THREAD_ROUTES.get(route), run_wsgi, environ, send, loop)
+            return
+        status, headers, content = await run_async_view(view, environ)
+    finally:
+        body.close()
+
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in headers]
+    })
+    await send({'type': 'http.response.body', 'body': content})
@@ -71,7 +71,7 @@ def register():
             session['user_id'] = new_user.id
             session['username'] = new_user.username
             
-            return redirect(url_for('index'))
+            return redirect(url_for('main.index'))
     
     # GET request - show registration form
     return render_template('auth/register.html')
@@ -123,7 +123,7 @@ def login():
             session['user_id'] = user.id
             session['username'] = user.username
             
-            return redirect(url_for('dashboard'))
+            return redirect(url_for('main.dashboard'))
     
     # GET request - show login form
     return render_template('auth/login.html')
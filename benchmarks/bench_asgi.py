@@ -0,0 +1,182 @@
+# benchmarks/bench_asgi.py
+"""
+Concurrent generations per process: threaded WSGI vs the ASGI app.
+
+A fake Ollama with a fixed per-call delay stands in for the model, with no
+concurrency limit of its own, so the app process is the only bottleneck.
+Each mode runs the app in its own process: 'wsgi' serves the Flask app
+from a fixed pool of request threads (like gunicorn --threads), 'asgi'
+runs asgi:application under uvicorn. --clients closed-loop clients then
+generate decks for --duration seconds. The report gives completed decks
+per second, latency, the average number of generations in flight (Little's
+law) and the peak OS thread count of the server process.
+
+Usage: python benchmarks/bench_asgi.py [--clients 64] [--threads 16] [--latency-ms 500] [--slides 4]
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import percentile
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def serve(mode, port, threads):
+    """Run the app in this process (the server side of a measurement)"""
+    from app import app, init_db
+    app.config.update(RATE_LIMITS={}, LLM_MAX_CONCURRENCY=100000, LLM_MAX_QUEUE=100000,
+                      LIMITS_DB=os.path.join(os.environ['BENCH_DIR'], 'limits.db'))
+    with app.app_context():
+        init_db()
+    if mode == 'asgi':
+        import uvicorn
+        import asgi
+        uvicorn.run(asgi.application, host='127.0.0.1', port=port, log_level='warning')
+        return
+
+    from socketserver import ThreadingMixIn
+    from wsgiref.simple_server import WSGIServer, WSGIRequestHandler, make_server
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    class PooledServer(ThreadingMixIn, WSGIServer):
+        """Handles requests on a fixed pool of threads; the rest wait in the accept queue"""
+        pool = ThreadPoolExecutor(max_workers=threads)
+        request_queue_size = 1024
+
+        def process_request(self, request, client_address):
+            self.pool.submit(self.process_request_thread, request, client_address)
+
+    make_server('127.0.0.1', port, app, server_class=PooledServer, handler_class=QuietHandler).serve_forever()
+
+def peak_threads(pid, stop, peak):
+    while not stop.wait(0.1):
+        try:
+            with open(f'/proc/{pid}/status') as f:
+                for line in f:
+                    if line.startswith('Threads:'):
+                        peak[0] = max(peak[0], int(line.split()[1]))
+        except OSError:
+            return
+
+def measure(mode, args, env):
+    port = free_port()
+    server = subprocess.Popen([sys.executable, __file__, '--serve', mode, '--port', str(port),
+                               '--threads', str(args.threads)], env=env, cwd=ROOT)
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        for _ in range(100):
+            try:
+                requests.get(base_url + '/auth/login', timeout=1)
+                break
+            except requests.RequestException:
+                time.sleep(0.1)
+
+        sessions = []
+        for i in range(args.clients):
+            http = requests.Session()
+            name = f'{mode}user{i}'
+            http.post(base_url + '/auth/register', json={'username': name, 'password': 'bench'}, timeout=30)
+            sessions.append(http)
+
+        latencies, errors = [], [0]
+        lock = threading.Lock()
+        stop_at = time.perf_counter() + args.duration
+
+        def client(i):
+            http = sessions[i]
+            n = 0
+            while time.perf_counter() < stop_at:
+                n += 1
+                start = time.perf_counter()
+                try:
+                    response = http.post(base_url + '/api/generate', timeout=300, json={
+                        'topic': f'Benchmark topic {i}-{n}', 'template': 'corporate', 'slideCount': args.slides
+                    })
+                    ok = response.status_code == 200
+                except requests.RequestException:
+                    ok = False
+                with lock:
+                    if ok:
+                        latencies.append(time.perf_counter() - start)
+                    else:
+                        errors[0] += 1
+
+        stop, peak = threading.Event(), [0]
+        threading.Thread(target=peak_threads, args=(server.pid, stop, peak), daemon=True).start()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.clients) as pool:
+            list(pool.map(client, range(args.clients)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+
+        latencies.sort()
+        return {
+            'decks_per_second': len(latencies) / elapsed,
+            'in_flight': sum(latencies) / elapsed,
+            'p50_ms': percentile(latencies, 0.5) * 1000,
+            'p95_ms': percentile(latencies, 0.95) * 1000,
+            'errors': errors[0],
+            'peak_threads': peak[0]
+        }
+    finally:
+        server.terminate()
+        server.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=64, help='concurrent closed-loop clients')
+    parser.add_argument('--threads', type=int, default=16, help='request threads of the WSGI server')
+    parser.add_argument('--latency-ms', type=float, default=500, help='fake Ollama delay per call')
+    parser.add_argument('--slides', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--modes', nargs='+', default=['wsgi', 'asgi'])
+    parser.add_argument('--serve', choices=['wsgi', 'asgi'], help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port, args.threads)
+        return
+
+    from fake_ollama import start_server
+    _, ollama_url = start_server(latency=args.latency_ms / 1000.0, seed=1)
+    work_dir = tempfile.mkdtemp(prefix='bench-asgi-')
+    env = dict(os.environ,
+               BENCH_DIR=work_dir,
+               OLLAMA_API_URL=ollama_url,
+               OLLAMA_NUM_PARALLEL='100000',
+               OLLAMA_HEDGING='0',
+               TOPIC_CACHE='off',
+               DATABASE_URL='sqlite:///' + os.path.join(work_dir, 'bench.db'),
+               METRICS_DIR=os.path.join(work_dir, 'metrics'),
+               TOPIC_CACHE_PATH=os.path.join(work_dir, 'topic_cache.jsonl'))
+
+    print(f"{args.clients} clients, {args.slides}-slide decks, {args.latency_ms:.0f} ms per Ollama call, "
+          f"{args.duration:.0f}s per mode")
+    print(f"{'mode':<8}{'decks/s':>9}{'in flight':>11}{'p50 ms':>9}{'p95 ms':>9}{'errors':>8}{'threads':>9}")
+    for mode in args.modes:
+        row = measure(mode, args, env)
+        label = f'{mode}/{args.threads}' if mode == 'wsgi' else mode
+        print(f"{label:<8}{row['decks_per_second']:>9.2f}{row['in_flight']:>11.1f}{row['p50_ms']:>9.0f}"
+              f"{row['p95_ms']:>9.0f}{row['errors']:>8}{row['peak_threads']:>9}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+# benchmarks/bench_clone.py
+"""
+Duplicating a deck with another template: client round trip vs server-side clone.
+
+The round trip is what the editor had to do before the clone endpoint:
+GET /api/presentations/<id> and POST the whole deck back to /api/save with
+the new template. The clone is one POST /api/presentations/<id>/clone that
+copies the rows inside the database. Both run in-process through the test
+client, so the times leave out the network; the bytes column shows what
+would cross it per duplicate.
+
+Usage: python benchmarks/bench_clone.py [--sizes 10 100 1000] [--repeat 7]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from seed_data import slide_content, LAYOUTS
+
+def median_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000], help='slides per deck')
+    parser.add_argument('--repeat', type=int, default=7)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='bench-clone-')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(work_dir, 'clone.db')
+    os.environ['METRICS_DIR'] = os.path.join(work_dir, 'metrics')
+
+    from app import app, init_db
+    app.config.update(LIMITS_DB=os.path.join(work_dir, 'limits.db'), RATE_LIMITS={})
+    with app.app_context():
+        init_db()
+
+    client = app.test_client()
+    client.post('/auth/register', json={'username': 'bench', 'password': 'bench'})
+    rng = random.Random(7)
+
+    print(f"{'slides':>7}{'round trip ms':>15}{'clone ms':>10}{'speedup':>9}{'round trip bytes':>18}{'clone bytes':>13}")
+    for size in args.sizes:
+        slides = [{'layout': layout, 'content': slide_content(rng, layout)}
+                  for layout in (rng.choice(LAYOUTS) for _ in range(size))]
+        saved = client.post('/api/save', json={'topic': f'Deck of {size}', 'template': 'corporate', 'slides': slides})
+        deck_id = saved.get_json()['presentation']['id']
+        traffic = {}
+
+        def round_trip():
+            fetched = client.get(f'/api/presentations/{deck_id}')
+            deck = fetched.get_json()['presentation']
+            body = json.dumps({'topic': deck['topic'], 'template': 'creative', 'slides': deck['slides']})
+            response = client.post('/api/save', data=body, content_type='application/json')
+            traffic['round_trip'] = len(fetched.data) + len(body) + len(response.data)
+
+        def clone():
+            body = json.dumps({'template': 'creative'})
+            response = client.post(f'/api/presentations/{deck_id}/clone', data=body, content_type='application/json')
+            assert response.status_code == 201
+            traffic['clone'] = len(body) + len(response.data)
+
+        round_trip_ms = median_ms(round_trip, args.repeat)
+        clone_ms = median_ms(clone, args.repeat)
+        print(f"{size:>7}{round_trip_ms:>15.1f}{clone_ms:>10.1f}{round_trip_ms / clone_ms:>8.1f}x"
+              f"{traffic['round_trip']:>18}{traffic['clone']:>13}")
+
+if __name__ == '__main__':
+    main()
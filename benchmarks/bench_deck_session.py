@@ -0,0 +1,69 @@
+# benchmarks/bench_deck_session.py
+"""
+Prefill cost per slide for each deck session mode (off, prefix, context).
+
+Decks are generated outline-first against the fake Ollama with a simulated
+prompt cache and a per-prompt-token delay, and the prompt_eval_count and
+prompt_eval_duration reported for every slide call are averaged per mode.
+
+Usage: python benchmarks/bench_deck_session.py [--decks 5] [--slides 8] [--prompt-token-ms 2]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_ollama import start_server, PromptCache
+
+MODES = ['off', 'prefix', 'context']
+
+def run_deck(ollama_client, topic, slides, mode, parallel):
+    session = ollama_client.DeckSession(topic, mode)
+    outline = ollama_client.generate_outline(topic, slides, 'deck', None, session)
+
+    def expand(index):
+        ollama_client.generate_content(outline[index]['layout'], topic, 'deck', None, session=session, index=index)
+
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        list(pool.map(expand, range(slides)))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--decks', type=int, default=5)
+    parser.add_argument('--slides', type=int, default=8)
+    parser.add_argument('--parallel', type=int, default=4)
+    parser.add_argument('--prompt-token-ms', type=float, default=2.0, help='prefill delay per uncached prompt token')
+    args = parser.parse_args()
+
+    server, url = start_server(prompt_token_latency=args.prompt_token_ms / 1000.0, cache_slots=args.parallel)
+    handler = server.RequestHandlerClass
+    os.environ['OLLAMA_API_URL'] = url
+    os.environ['OLLAMA_NUM_PARALLEL'] = str(args.parallel)
+    # Topics repeat across modes; cache hits would never reach the fake server
+    os.environ['TOPIC_CACHE'] = 'off'
+    import ollama_client
+
+    print(f"{args.decks} decks x {args.slides} slides, {args.parallel} parallel")
+    print(f"{'mode':<10}{'prompt tokens/slide':>22}{'prefill ms/slide':>18}{'deck s':>10}")
+    for mode in MODES:
+        handler.cache = PromptCache(args.parallel)
+        tokens, prefill_ms, wall = [], [], []
+        for i in range(args.decks):
+            del handler.calls[:]
+            start = time.perf_counter()
+            run_deck(ollama_client, f'Topic number {i} for the deck session benchmark', args.slides, mode, args.parallel)
+            wall.append(time.perf_counter() - start)
+            # The first call is the outline; the rest are slides
+            for count, duration_ns in handler.calls[1:]:
+                tokens.append(count)
+                prefill_ms.append(duration_ns / 1e6)
+        print(f"{mode:<10}{statistics.mean(tokens):>22.1f}{statistics.mean(prefill_ms):>18.1f}"
+              f"{statistics.mean(wall):>10.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+# benchmarks/bench_hedging.py
+"""
+Tail latency of Ollama calls with and without hedging, and circuit breaking.
+
+Two fake Ollama backends answer most calls quickly but delay a share of
+them by --slow-ms. The same sequence of slide calls runs with hedging off
+and on, reporting p50/p95/p99 latency and how many calls were hedged,
+and once more with a single scheduler slot, which the call itself holds,
+so no hedge may be sent; the run fails if a hedge's slot isn't given back.
+Then one backend is stopped and the run shows its circuit breaker opening
+so calls stop paying for connection errors.
+
+Usage: python benchmarks/bench_hedging.py [--calls 300] [--slow-rate 0.03] [--slow-ms 1500]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_ollama import start_server
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+def run(ollama_client, calls):
+    latencies, failures = [], 0
+    for i in range(calls):
+        start = time.perf_counter()
+        try:
+            response, _ = ollama_client.post_prompt(f'Slide {i} about the hedging benchmark', 'titleAndBullets',
+                                                    'batch', 'bench')
+            failures += response.status_code != 200
+        except Exception:
+            failures += 1
+        latencies.append(time.perf_counter() - start)
+    return latencies, failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=300)
+    parser.add_argument('--latency-ms', type=float, default=20)
+    parser.add_argument('--slow-rate', type=float, default=0.03)
+    parser.add_argument('--slow-ms', type=float, default=1500)
+    args = parser.parse_args()
+
+    servers = [start_server(latency=args.latency_ms / 1000.0, seed=seed, slow_rate=args.slow_rate,
+                            slow_latency=args.slow_ms / 1000.0) for seed in (1, 2)]
+    os.environ['OLLAMA_API_URLS'] = ','.join(url for _, url in servers)
+    os.environ['OLLAMA_NUM_PARALLEL'] = '4'
+    os.environ['TOPIC_CACHE'] = 'off'
+    import hedging
+    import ollama_client
+    # Hedge from the first few samples so short runs show the effect
+    hedging.HEDGE_MIN_SAMPLES = 10
+    hedging.HEDGE_MIN_DELAY = args.latency_ms * 2 / 1000.0
+
+    print(f"{args.calls} calls, {args.slow_rate:.0%} delayed by {args.slow_ms:.0f} ms, 2 backends")
+    print(f"{'hedging':<12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'hedged':>8}")
+    scheduler = ollama_client.scheduler
+    for label, enabled, slots in (('off', False, 4), ('on', True, 4), ('on, 1 slot', True, 1)):
+        scheduler.max_concurrency = slots
+        ollama_client.client = hedging.HedgedClient(ollama_client.OLLAMA_API_URLS, hedging=enabled,
+                                                    scheduler=scheduler)
+        latencies, _ = run(ollama_client, args.calls)
+        hedged = ollama_client.client.hedges
+        print(f"{label:<12}" + ''.join(
+            f"{percentile(latencies, p) * 1000:>10.0f}" for p in (0.5, 0.95, 0.99)
+        ) + f"{max(latencies) * 1000:>10.0f}{hedged:>8}")
+        # Losing copies finish within one slow reply and must free their slots
+        time.sleep(args.slow_ms / 1000.0 + 0.5)
+        if scheduler.stats()['active']:
+            sys.exit(f"{scheduler.stats()['active']} scheduler slots still held after the run")
+        if slots == 1 and hedged:
+            sys.exit('hedged a call with no free scheduler slot')
+    scheduler.max_concurrency = 4
+
+    # Stop the second backend: its breaker should open and stay open
+    dead_server, dead_url = servers[1]
+    dead_server.shutdown()
+    dead_server.server_close()
+    ollama_client.client = hedging.HedgedClient(ollama_client.OLLAMA_API_URLS, scheduler=scheduler)
+    latencies, failures = run(ollama_client, 50)
+    print(f"\nbackend down: {failures}/50 calls failed, p50 {statistics.median(latencies) * 1000:.0f} ms, "
+          f"breaker {ollama_client.client.breakers[dead_url].state}")
+
+if __name__ == '__main__':
+    main()
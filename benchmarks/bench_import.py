@@ -0,0 +1,155 @@
+# benchmarks/bench_import.py
+"""
+.pptx import: peak memory against file size, and layout recovery.
+
+Builds decks of the same 30 text slides padded with incompressible images
+up to each size, then reads every deck in a fresh process two ways: the
+streaming importer (pptx_import.iter_slides) and python-pptx loading the
+whole package and walking its text frames. Peak RSS is reported for each,
+so a flat column is the goal. The decks come from export.create_presentation,
+so the layout each slide was exported with is known and the importer's
+guesses can be scored against it. Finally, damaged copies of the first
+deck (truncated, corrupt deflate, bad CRC, encrypted member) must each be
+rejected with ImportFailed rather than crash the importer.
+
+Usage: python benchmarks/bench_import.py [--sizes 1 20 100] [--slides 30]
+"""
+import argparse
+import io
+import os
+import random
+import resource
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+def peak_rss_mb():
+    # VmHWM rather than ru_maxrss, which a child inherits from its parent across exec
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def child(mode, path):
+    """Read one deck in this process; prints seconds and peak RSS"""
+    start = time.perf_counter()
+    if mode == 'stream':
+        from pptx_import import iter_slides, ImportFailed
+        count = sum(1 for _ in iter_slides(path))
+    else:
+        from pptx import Presentation
+        deck = Presentation(path)
+        count = sum(1 for slide in deck.slides for shape in slide.shapes if shape.has_text_frame)
+    print(f"{time.perf_counter() - start:.3f} {peak_rss_mb():.1f} {count}")
+
+def build_deck(path, slides, megabytes, rng):
+    """Export the slides, then pad the deck with random-pixel pictures to about `megabytes`"""
+    from pptx import Presentation
+    from pptx.util import Inches
+    from PIL import Image
+    from export import create_presentation
+
+    create_presentation(path, slides, 'corporate')
+    deck = Presentation(path)
+    ballast = megabytes * 1024 * 1024 - os.path.getsize(path)
+    while ballast > 0:
+        side = 1024
+        image = Image.frombytes('RGB', (side, side), rng.randbytes(side * side * 3))
+        png = io.BytesIO()
+        image.save(png, 'PNG', compress_level=0)
+        # On a slide of its own, so the text slides keep their shapes
+        slide = deck.slides.add_slide(deck.slide_layouts[6])
+        slide.shapes.add_picture(io.BytesIO(png.getvalue()), Inches(0), Inches(0))
+        ballast -= len(png.getvalue())
+    deck.save(path)
+
+def damaged_copies(path, member):
+    """{case: bytes} of the deck with one member (or the whole archive) damaged"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    with zipfile.ZipFile(path) as zf:
+        info, start_dir = zf.getinfo(member), zf.start_dir
+    # The member's central directory record, which zipfile trusts over the local header
+    central = data.index(b'PK\x01\x02', data.index(member.encode(), start_dir) - 46)
+    name_length, extra_length = struct.unpack_from('<HH', data, info.header_offset + 26)
+    body = info.header_offset + 30 + name_length + extra_length
+
+    def edit(offset, fmt, value):
+        copy = bytearray(data)
+        struct.pack_into(fmt, copy, offset, value)
+        return bytes(copy)
+
+    return {
+        'truncated archive': data[:len(data) // 2],
+        'corrupt deflate': data[:body] + b'\xff' * 16 + data[body + 16:],
+        'bad CRC': edit(central + 16, '<I', info.CRC ^ 1),
+        'truncated member': edit(central + 20, '<I', info.compress_size // 2),
+        'encrypted member': edit(central + 8, '<H', info.flag_bits | 0x1),
+    }
+
+def run_child(mode, path):
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', mode, path],
+                         capture_output=True, text=True, check=True, cwd=ROOT).stdout.split()
+    return float(out[0]), float(out[1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 20, 100], help='deck sizes in MB')
+    parser.add_argument('--slides', type=int, default=30, help='text slides per deck')
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    from seed_data import slide_content, LAYOUTS
+    from pptx_import import iter_slides, ImportFailed
+
+    rng = random.Random(11)
+    slides = [{'layout': layout, 'content': slide_content(rng, layout)}
+              for layout in (LAYOUTS[i % len(LAYOUTS)] for i in range(args.slides))]
+    work_dir = tempfile.mkdtemp(prefix='bench-import-')
+
+    print(f"{'MB':>5}{'stream s':>10}{'stream MB RSS':>15}{'python-pptx s':>15}{'python-pptx MB RSS':>20}")
+    for size in args.sizes:
+        path = os.path.join(work_dir, f'deck-{size}.pptx')
+        build_deck(path, slides, size, rng)
+        stream_s, stream_rss = run_child('stream', path)
+        full_s, full_rss = run_child('python-pptx', path)
+        print(f"{os.path.getsize(path) / 1024 / 1024:>5.0f}{stream_s:>10.2f}{stream_rss:>15.1f}"
+              f"{full_s:>15.2f}{full_rss:>20.1f}")
+
+    imported = list(iter_slides(os.path.join(work_dir, f'deck-{args.sizes[0]}.pptx')))[:len(slides)]
+    hits = {layout: [0, 0] for layout in LAYOUTS}
+    for original, slide in zip(slides, imported):
+        hits[original['layout']][0] += original['layout'] == slide['layout']
+        hits[original['layout']][1] += 1
+    print()
+    print('Layout recovered from exported decks:')
+    for layout, (hit, total) in hits.items():
+        print(f"  {layout:<18}{hit}/{total}")
+
+    print()
+    print('Damaged archives:')
+    for case, data in damaged_copies(os.path.join(work_dir, f'deck-{args.sizes[0]}.pptx'),
+                                     'ppt/slides/slide1.xml').items():
+        try:
+            list(iter_slides(io.BytesIO(data)))
+            outcome = 'read without error'
+        except ImportFailed as e:
+            outcome = f'rejected: {e}'
+        except Exception as e:
+            outcome = f'CRASHED: {type(e).__name__}: {e}'
+        print(f"  {case:<18}{outcome}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+# benchmarks/bench_layouts.py
+"""
+Registry-driven post-processing against the hand-written code it replaced.
+
+Times the per-layout truncation (process_content_for_layout) and the field
+normalization done before rendering, on generated content with a share of
+over-long fields and dict/list values. The legacy versions are copied here
+verbatim in behaviour; both passes are checked to agree before timing.
+
+Usage: python benchmarks/bench_layouts.py [--slides 20000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from layouts import LAYOUTS, truncate_content, normalize_content
+from seed_data import slide_content
+
+DEFAULTS = {
+    'titleAndBullets': {'title': 'Title'},
+    'quote': {'quote': 'Quote goes here', 'author': 'Author'},
+    'imageAndParagraph': {'title': 'Title', 'paragraph': 'Paragraph text', 'imageDescription': 'Image description'},
+    'twoColumn': {'title': 'Title', 'column1Title': 'Column 1', 'column1Content': 'Column 1 content',
+                  'column2Title': 'Column 2', 'column2Content': 'Column 2 content'},
+    'titleOnly': {'title': 'Title', 'subtitle': 'Subtitle'}
+}
+
+def legacy_truncate(content, layout):
+    """The old process_content_for_layout, copied verbatim"""
+    processed = dict(content)
+    
+    if layout == 'titleAndBullets':
+        # Limit title length
+        if 'title' in processed and len(processed['title']) > 80:
+            processed['title'] = processed['title'][:77] + '...'
+        
+        # Limit number of bullets and length of each
+        if 'bullets' in processed:
+            # Keep maximum 5 bullets
+            processed['bullets'] = processed['bullets'][:5]
+            
+            # Limit length of each bullet
+            processed['bullets'] = [
+                (bullet[:97] + '...') if len(bullet) > 100 else bullet 
+                for bullet in processed['bullets']
+            ]
+    
+    elif layout == 'quote':
+        # Limit quote length
+        if 'quote' in processed and len(processed['quote']) > 150:
+            processed['quote'] = processed['quote'][:147] + '...'
+            
+        # Limit author length
+        if 'author' in processed and len(processed['author']) > 50:
+            processed['author'] = processed['author'][:47] + '...'
+    
+    elif layout == 'imageAndParagraph':
+        # Limit title length
+        if 'title' in processed and len(processed['title']) > 80:
+            processed['title'] = processed['title'][:77] + '...'
+            
+        # Limit paragraph length
+        if 'paragraph' in processed and len(processed['paragraph']) > 300:
+            processed['paragraph'] = processed['paragraph'][:297] + '...'
+            
+        # Limit image description length
+        if 'imageDescription' in processed and len(processed['imageDescription']) > 100:
+            processed['imageDescription'] = processed['imageDescription'][:97] + '...'
+    
+    elif layout == 'twoColumn':
+        # Limit title length
+        if 'title' in processed and len(processed['title']) > 80:
+            processed['title'] = processed['title'][:77] + '...'
+            
+        # Limit column titles length
+        if 'column1Title' in processed and len(processed['column1Title']) > 50:
+            processed['column1Title'] = processed['column1Title'][:47] + '...'
+        if 'column2Title' in processed and len(processed['column2Title']) > 50:
+            processed['column2Title'] = processed['column2Title'][:47] + '...'
+            
+        # Limit column content length
+        if 'column1Content' in processed and len(processed['column1Content']) > 200:
+            processed['column1Content'] = processed['column1Content'][:197] + '...'
+        if 'column2Content' in processed and len(processed['column2Content']) > 200:
+            processed['column2Content'] = processed['column2Content'][:197] + '...'
+    
+    elif layout == 'titleOnly':
+        # Limit title length
+        if 'title' in processed and len(processed['title']) > 80:
+            processed['title'] = processed['title'][:77] + '...'
+            
+        # Limit subtitle length
+        if 'subtitle' in processed and len(processed['subtitle']) > 120:
+            processed['subtitle'] = processed['subtitle'][:117] + '...'
+    
+    return processed
+
+def legacy_normalize(content, layout):
+    """The old create_*_slide field handling: isinstance checks then str()"""
+    normalized = {}
+    for name, default in DEFAULTS[layout].items():
+        value = content.get(name, default)
+        if isinstance(value, list):
+            value = "\n".join([str(item) for item in value])
+        elif isinstance(value, dict) and 'text' in value:
+            value = value['text']
+        normalized[name] = str(value)
+    if layout == 'titleAndBullets':
+        bullets = content.get('bullets', [])
+        if isinstance(bullets, list):
+            bullets = [b['text'] if isinstance(b, dict) and 'text' in b else str(b) for b in bullets]
+        elif isinstance(bullets, str):
+            bullets = [bullets]
+        else:
+            bullets = ["No bullet points available"]
+        normalized['bullets'] = bullets
+    return normalized
+
+def make_slides(count, rng):
+    slides = []
+    for _ in range(count):
+        layout = rng.choice(LAYOUTS)
+        content = slide_content(rng, layout)
+        # Roughly a third of text fields overflow their limit
+        for name, value in list(content.items()):
+            if isinstance(value, str) and rng.random() < 0.3:
+                content[name] = value * 8
+        slides.append((layout, content))
+    return slides
+
+def median_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--slides', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    slides = make_slides(args.slides, random.Random(5))
+    truncated = [legacy_truncate(c, layout) for layout, c in slides]
+    assert truncated == [truncate_content(c, layout) for layout, c in slides]
+    assert [legacy_normalize(c, layout) for (layout, _), c in zip(slides, truncated)] == \
+        [normalize_content(c, layout) for (layout, _), c in zip(slides, truncated)]
+
+    cases = [
+        ('truncate', lambda: [legacy_truncate(c, layout) for layout, c in slides],
+         lambda: [truncate_content(c, layout) for layout, c in slides]),
+        ('normalize', lambda: [legacy_normalize(c, layout) for (layout, _), c in zip(slides, truncated)],
+         lambda: [normalize_content(c, layout) for (layout, _), c in zip(slides, truncated)])
+    ]
+
+    print(f"{args.slides} slides")
+    print(f"{'pass':<12}{'legacy':>12}{'registry':>12}{'speedup':>10}")
+    for name, legacy, registry in cases:
+        legacy_ms = median_ms(legacy, args.repeat)
+        registry_ms = median_ms(registry, args.repeat)
+        print(f"{name:<12}{legacy_ms:>10.1f}ms{registry_ms:>10.1f}ms{legacy_ms / registry_ms:>9.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+# benchmarks/bench_overload.py
+"""
+Admission control under overload: the global LLM slots and the rate limits.
+
+A slow fake Ollama holds every call for --latency-ms, and the app allows
+--slots Ollama calls at once across workers with a --queue of waiters. The
+script checks, and exits non-zero if any check fails, that:
+
+  * a burst of concurrent single-slide requests from different users is
+    answered with 200s for the calls that got or waited for a slot and 503s
+    with a Retry-After header for the rest, and never more than --slots
+    calls reach Ollama at once;
+  * while a deck keeps the deck share of the slots busy, an interactive
+    slide still gets the slot reserved for it and answers in about one call;
+  * a user past their /api/generate/slide token bucket gets 429s with a
+    Retry-After header.
+
+Usage: python benchmarks/bench_overload.py [--slots 2] [--queue 2] [--latency-ms 1000] [--burst 8]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_ollama import start_server
+
+class SlotMonitor:
+    """Samples the number of running calls in the limiter database"""
+
+    def __init__(self, path, interval=0.01):
+        self.path = path
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def running(self):
+        with sqlite3.connect(self.path, timeout=10) as conn:
+            return conn.execute("SELECT COUNT(*) FROM llm_calls WHERE state = 'running'").fetchone()[0]
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.running())
+
+def wait_idle(path, timeout=60):
+    """Wait for background calls (alternates prefetches) to leave the LLM queue"""
+    deadline = time.time() + timeout
+    with sqlite3.connect(path, timeout=10) as conn:
+        while conn.execute("SELECT COUNT(*) FROM llm_calls").fetchone()[0]:
+            if time.time() > deadline:
+                sys.exit('LLM queue never drained')
+            time.sleep(0.05)
+
+def signed_in(app, name):
+    client = app.test_client()
+    client.post('/auth/register', json={'username': name, 'password': 'bench'})
+    return client
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--slots', type=int, default=2, help='LLM_MAX_CONCURRENCY')
+    parser.add_argument('--queue', type=int, default=2, help='LLM_MAX_QUEUE')
+    parser.add_argument('--latency-ms', type=float, default=1000, help='fake Ollama delay per call')
+    parser.add_argument('--burst', type=int, default=8, help='concurrent single-slide requests')
+    args = parser.parse_args()
+    latency = args.latency_ms / 1000.0
+
+    server, url = start_server(latency=latency)
+    work_dir = tempfile.mkdtemp(prefix='bench-overload-')
+    os.environ['OLLAMA_API_URL'] = url
+    # The worker's own scheduler must not hold calls back before the global queue sees them
+    os.environ['OLLAMA_WORKER_PARALLEL'] = str(args.burst * 2)
+    os.environ['OLLAMA_HEDGING'] = '0'
+    os.environ['TOPIC_CACHE'] = 'off'
+    os.environ['TOPIC_CACHE_PATH'] = os.path.join(work_dir, 'topic_cache.jsonl')
+
+    from app import create_app, init_db
+    limits_db = os.path.join(work_dir, 'limits.db')
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(work_dir, 'app.db'),
+        'LIMITS_DB': limits_db, 'RATE_LIMITS': {},
+        'THUMBNAIL_DIR': os.path.join(work_dir, 'thumbnails'), 'METRICS_DIR': os.path.join(work_dir, 'metrics'),
+        'LLM_MAX_CONCURRENCY': args.slots, 'LLM_MAX_QUEUE': args.queue, 'LLM_QUEUE_TIMEOUT': 30
+    })
+    with app.app_context():
+        init_db()
+    clients = [signed_in(app, f'user{i}') for i in range(args.burst)]
+    failures = []
+
+    # A burst of interactive calls: slots plus queue are served, the rest turned away
+    def slide(client):
+        response = client.post('/api/generate/slide', json={'topic': 'Overload', 'layout': 'quote'})
+        return response.status_code, response.headers.get('Retry-After')
+
+    with SlotMonitor(limits_db) as monitor, ThreadPoolExecutor(max_workers=args.burst) as pool:
+        results = list(pool.map(slide, clients))
+        wait_idle(limits_db)
+    ok = sum(status == 200 for status, _ in results)
+    rejected = [retry for status, retry in results if status == 503]
+    print(f"burst of {args.burst}: {ok} ok, {len(rejected)} x 503 "
+          f"(Retry-After {sorted(set(rejected))}), peak {monitor.peak} calls running")
+    if ok + len(rejected) != args.burst or not rejected or not all(rejected):
+        failures.append('burst: expected only 200s and 503s with Retry-After')
+    if ok < args.slots or monitor.peak > args.slots:
+        failures.append(f'burst: expected at least {args.slots} served and at most {args.slots} running')
+
+    # A deck whose slides fill the queue holds the deck share; an interactive
+    # edit still finds the slot reserved for it
+    slide_count = max(2, args.queue + 1)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        deck = pool.submit(clients[0].post, '/api/generate', json={'topic': 'Busy', 'slideCount': slide_count})
+        # Into the slides, past the outline call
+        time.sleep(latency * 1.5)
+        started = time.perf_counter()
+        status, _ = slide(clients[-1])
+        edit_seconds = time.perf_counter() - started
+        deck_status = deck.result().status_code
+    wait_idle(limits_db)
+    print(f"interactive edit during a {slide_count}-slide deck: {status} in {edit_seconds * 1000:.0f} ms "
+          f"(one call is {args.latency_ms:.0f} ms), deck {deck_status}")
+    if args.slots > 1 and (status != 200 or edit_seconds > latency * 1.25):
+        failures.append('reservation: the interactive edit waited behind deck calls')
+
+    # Per-user token bucket
+    app.config['RATE_LIMITS'] = {'generate_slide': {'user': (1, 60)}}
+    limited = [slide(clients[0]) for _ in range(3)]
+    wait_idle(limits_db)
+    print(f"rate limit of 1/min: {[status for status, _ in limited]}, "
+          f"Retry-After {[retry for _, retry in limited if retry]}")
+    if [status for status, _ in limited] != [200, 429, 429] or not all(retry for _, retry in limited[1:]):
+        failures.append('rate limit: expected 200, 429, 429 with Retry-After')
+
+    server.shutdown()
+    if failures:
+        sys.exit('; '.join(failures))
+
+if __name__ == '__main__':
+    main()
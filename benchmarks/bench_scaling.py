@@ -0,0 +1,144 @@
+# benchmarks/bench_scaling.py
+"""
+How the dashboard, list, get, save and delete paths degrade as data grows.
+
+Two probe users with fixed data (a typical user with 10 decks and a heavy
+user with 1000) are timed while the rest of the database is grown with
+seed_data.py to 10x, 100x and 1000x a base population. Because the probes
+never change, any slowdown comes from the size of the shared tables.
+
+Usage: python benchmarks/bench_scaling.py [--levels 10 100 1000] [--base-users 10]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from seed_data import seed, slide_content, LAYOUTS
+
+PROBES = {'typical': 10, 'heavy': 1000}
+
+def median_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--levels', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--base-users', type=int, default=10)
+    parser.add_argument('--mean-decks', type=float, default=20)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='write results JSON to this path')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='bench-scaling-')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(work_dir, 'scaling.db')
+    os.environ['METRICS_DIR'] = os.path.join(work_dir, 'metrics')
+
+    from sqlalchemy import text
+    from app import app, init_db
+    from models import db, Presentation
+
+    app.config.update(LIMITS_DB=os.path.join(work_dir, 'limits.db'), RATE_LIMITS={})
+    with app.app_context():
+        init_db()
+    rng = random.Random(99)
+
+    # Probe users with fixed data, created through the normal save path
+    clients = {}
+    for name, decks in PROBES.items():
+        client = app.test_client()
+        client.post('/auth/register', json={'username': f'probe_{name}', 'password': 'probe'})
+        for i in range(decks):
+            layouts = [rng.choice(LAYOUTS) for _ in range(6)]
+            client.post('/api/save', json={
+                'topic': f'{name} deck {i}',
+                'template': 'corporate',
+                'slides': [{'layout': layout, 'content': slide_content(rng, layout)} for layout in layouts]
+            })
+        clients[name] = client
+
+    with app.app_context():
+        deck_ids = {
+            name: db.session.execute(
+                text("SELECT p.id FROM presentations p JOIN users u ON u.id = p.user_id "
+                     "WHERE u.username = :username ORDER BY p.id LIMIT 1"),
+                {'username': f'probe_{name}'}
+            ).scalar()
+            for name in PROBES
+        }
+
+    save_body = {
+        'topic': 'Scaling save',
+        'template': 'dark',
+        'slides': [{'layout': layout, 'content': slide_content(rng, layout)} for layout in LAYOUTS]
+    }
+
+    results = {}
+    seeded_users = 0
+    for level in sorted(args.levels):
+        with app.app_context():
+            target = args.base_users * level
+            first_user_id = (db.session.execute(text("SELECT MAX(id) FROM users")).scalar() or 0) + 1
+            seed(db, target - seeded_users, args.mean_decks, random.Random(level), first_user_id)
+            seeded_users = target
+            totals = db.session.execute(
+                text("SELECT (SELECT COUNT(*) FROM presentations), (SELECT COUNT(*) FROM slides)")
+            ).one()
+
+        print(f"\n{level}x: {totals[0]} decks, {totals[1]} slides")
+        print(f"{'path':<34}" + ''.join(f'{name:>12}' for name in PROBES))
+        row = {}
+        for name, client in clients.items():
+            deck_id = deck_ids[name]
+
+            def save_then_delete():
+                response = client.post('/api/save', json=save_body)
+                new_id = response.get_json()['presentation']['id']
+                start = time.perf_counter()
+                client.delete(f'/api/presentations/{new_id}')
+                return (time.perf_counter() - start) * 1000
+
+            row[name] = {
+                'GET /dashboard': median_ms(lambda: client.get('/dashboard'), args.repeat),
+                'GET /api/presentations': median_ms(lambda: client.get('/api/presentations'), args.repeat),
+                'GET /api/presentations/<id>': median_ms(
+                    lambda: client.get(f'/api/presentations/{deck_id}'), args.repeat),
+                'POST /api/save': median_ms(lambda: client.post('/api/save', json=save_body), args.repeat),
+                'DELETE /api/presentations/<id>': statistics.median(
+                    save_then_delete() for _ in range(args.repeat))
+            }
+
+        for path in row['typical']:
+            print(f"{path:<34}" + ''.join(f"{row[name][path]:>10.2f}ms" for name in PROBES))
+        results[level] = {'decks': totals[0], 'slides': totals[1], 'probes': row}
+
+    # Growth factor from the smallest to the largest level, worst first
+    levels = sorted(results)
+    if len(levels) > 1:
+        first, last = results[levels[0]]['probes'], results[levels[-1]]['probes']
+        growth = sorted(
+            ((last[name][path] / first[name][path], name, path) for name in PROBES for path in first[name]),
+            reverse=True
+        )
+        print(f"\nslowdown {levels[0]}x -> {levels[-1]}x")
+        for factor, name, path in growth:
+            print(f"  {factor:6.1f}x  {name:<8} {path}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
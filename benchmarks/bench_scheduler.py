@@ -0,0 +1,76 @@
+# benchmarks/bench_scheduler.py
+"""
+Queue-wait per priority class under mixed load against a fake slow model.
+
+Several users generate 10-slide decks back to back while others make
+single-slide interactive edits and a batch job trickles through. The run is
+repeated with equal class weights for comparison: calls are still shared
+fairly between users, but interactive edits no longer get a larger share.
+
+Usage: python benchmarks/bench_scheduler.py [--parallel 2] [--call-ms 100]
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scheduler import OllamaScheduler, CLASS_WEIGHTS
+
+def fake_call(scheduler, priority, user, call_seconds):
+    with scheduler.slot(priority, user):
+        time.sleep(call_seconds)
+
+def deck_user(scheduler, user, decks, call_seconds):
+    for _ in range(decks):
+        for _ in range(10):
+            fake_call(scheduler, 'deck', user, call_seconds)
+
+def batch_user(scheduler, calls, call_seconds):
+    for _ in range(calls):
+        fake_call(scheduler, 'batch', 'batch', call_seconds)
+
+def interactive_user(scheduler, user, edits, call_seconds, rng):
+    for _ in range(edits):
+        time.sleep(rng.uniform(0.5, 1.5) * call_seconds * 5)
+        fake_call(scheduler, 'interactive', user, call_seconds)
+
+def run(weights, args):
+    scheduler = OllamaScheduler(args.parallel, weights)
+    rng = random.Random(7)
+    call_seconds = args.call_ms / 1000.0
+
+    threads = [threading.Thread(target=deck_user, args=(scheduler, f'deck{i}', 2, call_seconds))
+               for i in range(args.deck_users)]
+    threads += [threading.Thread(target=interactive_user,
+                                 args=(scheduler, f'edit{i}', 10, call_seconds, random.Random(rng.random())))
+                for i in range(args.interactive_users)]
+    threads.append(threading.Thread(target=batch_user, args=(scheduler, 40, call_seconds)))
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, scheduler.stats()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--parallel', type=int, default=2)
+    parser.add_argument('--call-ms', type=float, default=100)
+    parser.add_argument('--deck-users', type=int, default=4)
+    parser.add_argument('--interactive-users', type=int, default=3)
+    args = parser.parse_args()
+
+    for label, weights in (('class weights', CLASS_WEIGHTS), ('equal weights', {name: 1 for name in CLASS_WEIGHTS})):
+        elapsed, stats = run(weights, args)
+        print(f"{label}: {elapsed:.1f}s total")
+        for name, wait in stats['classes'].items():
+            print(f"  {name:<12} n={wait['count']:<4} p50={wait['p50_ms']:8.1f}ms "
+                  f"p95={wait['p95_ms']:8.1f}ms max={wait['max_ms']:8.1f}ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+# benchmarks/bench_search.py
+"""
+Full-text search vs. LIKE scan over a synthetic corpus.
+
+Usage: python benchmarks/bench_search.py [--slides 100000] [--slides-per-deck 10]
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = (
+    "market growth strategy cloud data learning model customer revenue team product "
+    "design security network energy climate health finance education research quality "
+    "innovation leadership analytics platform mobile supply chain risk budget roadmap"
+).split()
+
+QUERIES = ["learning", "climate risk", "supply chain", "roadmap quality", "quantum"]
+
+# Pad the vocabulary with filler words and pick with a Zipf-like skew so that
+# common words are everywhere and rarer ones are selective, like real decks
+VOCABULARY = WORDS + [f"term{i}" for i in range(20000)]
+CUM_WEIGHTS = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(VOCABULARY))))
+
+def sentence(rng, n):
+    return ' '.join(rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=n)).capitalize()
+
+def synthetic_content(rng, layout):
+    if layout == 'titleAndBullets':
+        return {'title': sentence(rng, 5), 'bullets': [sentence(rng, 10) for _ in range(4)]}
+    if layout == 'quote':
+        return {'quote': sentence(rng, 18), 'author': sentence(rng, 2)}
+    if layout == 'imageAndParagraph':
+        return {'title': sentence(rng, 5), 'imageDescription': sentence(rng, 8), 'paragraph': sentence(rng, 45)}
+    if layout == 'twoColumn':
+        return {'title': sentence(rng, 5), 'column1Title': sentence(rng, 2), 'column1Content': sentence(rng, 30),
+                'column2Title': sentence(rng, 2), 'column2Content': sentence(rng, 30)}
+    return {'title': sentence(rng, 5), 'subtitle': sentence(rng, 10)}
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+def like_search(db, text, query):
+    """The naive alternative: count and page over a LIKE scan of every slide"""
+    where = (
+        "FROM presentations p WHERE p.user_id = 1 AND (p.topic LIKE :q OR p.id IN ("
+        "SELECT presentation_id FROM slides WHERE content_json LIKE :q))"
+    )
+    params = {'q': f'%{query}%'}
+    db.session.execute(text(f"SELECT COUNT(*) {where}"), params).scalar()
+    return db.session.execute(text(f"SELECT p.id {where} ORDER BY p.updated_at DESC LIMIT 20"), params).all()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--slides', type=int, default=100000)
+    parser.add_argument('--slides-per-deck', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench_search.db')
+
+    from sqlalchemy import text
+    from app import app, init_db, LAYOUTS
+    from models import db
+    from search import rebuild_search_index, search_presentations
+
+    rng = random.Random(42)
+    deck_count = args.slides // args.slides_per_deck
+
+    with app.app_context():
+        init_db()
+        db.session.execute(text(
+            "INSERT INTO users (id, username, password_hash) VALUES (1, 'bench', 'x')"
+        ))
+        db.session.execute(
+            text("INSERT INTO presentations (id, user_id, topic, template_id, slide_count, created_at, updated_at) "
+                 "VALUES (:id, 1, :topic, 'corporate', :count, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"),
+            [{'id': i + 1, 'topic': sentence(rng, 4), 'count': args.slides_per_deck} for i in range(deck_count)]
+        )
+        db.session.execute(
+            text("INSERT INTO slides (presentation_id, slide_order, layout, content_json) "
+                 "VALUES (:pid, :order, :layout, :content)"),
+            [{'pid': i // args.slides_per_deck + 1, 'order': i % args.slides_per_deck, 'layout': layout,
+              'content': json.dumps(synthetic_content(rng, layout))}
+             for i, layout in ((i, rng.choice(LAYOUTS)) for i in range(deck_count * args.slides_per_deck))]
+        )
+        db.session.commit()
+
+        start = time.perf_counter()
+        rebuild_search_index()
+        print(f"indexed {deck_count} decks / {deck_count * args.slides_per_deck} slides "
+              f"in {time.perf_counter() - start:.2f}s")
+
+        print(f"{'query':<18}{'fts ms':>10}{'like ms':>10}{'hits':>8}")
+        for query in QUERIES:
+            fts_ms = timed(lambda: search_presentations(1, query, 1, 20), args.repeat)
+            like_ms = timed(lambda: like_search(db, text, query), args.repeat)
+            total, _ = search_presentations(1, query, 1, 20)
+            print(f"{query:<18}{fts_ms:>10.2f}{like_ms:>10.2f}{total:>8}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+# benchmarks/bench_slide_storage.py
+"""
+Slide content storage: JSON text vs compressed JSON vs packed fields, with and without a trained dictionary.
+
+Each format gets a fresh SQLite database holding the same decks, written
+through the ORM the way /api/save does. Reported per format: database
+file size after VACUUM, stored content bytes per slide, write time per
+slide (encode, insert, commit) and read time per deck (load its slides and
+decode them, as GET /api/presentations/<id> does). The dictionary is
+trained on a separate sample of generated slides, so it is not tuned to
+the rows it compresses.
+
+Usage: python benchmarks/bench_slide_storage.py [--decks 2000] [--slides 10] [--reads 500]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from seed_data import slide_content, LAYOUTS
+
+FORMATS = [
+    ('json', 'json', False),
+    ('compressed', 'compressed', False),
+    ('compressed+dict', 'compressed', True),
+    ('packed', 'packed', False),
+    ('packed+dict', 'packed', True),
+]
+
+def generate_decks(rng, decks, slides):
+    return [[{'layout': layout, 'content': slide_content(rng, layout)}
+             for layout in (rng.choice(LAYOUTS) for _ in range(slides))] for _ in range(decks)]
+
+def run_format(work_dir, name, storage, trained, decks, reads, training):
+    import slide_codec
+    from app import create_app, init_db
+    from models import db, User, Presentation, Slide, SlideDictionary
+
+    path = os.path.join(work_dir, f'{name}.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + path, 'SLIDE_STORAGE': storage})
+    # Dictionary ids restart in every database, so forget the last one's
+    slide_codec._latest = None
+    slide_codec._dictionaries = {slide_codec.NO_DICTIONARY: b''}
+
+    with app.app_context():
+        init_db()
+        if trained:
+            samples = [slide_codec.compact_json(slide['content']) for deck in training for slide in deck]
+            db.session.add(SlideDictionary(data=slide_codec.train_dictionary(samples), sample_size=len(samples)))
+            db.session.commit()
+
+        user = User(username='bench')
+        user.set_password('bench')
+        db.session.add(user)
+        db.session.commit()
+
+        slide_count = sum(len(deck) for deck in decks)
+        start = time.perf_counter()
+        for deck in decks:
+            presentation = Presentation(user_id=user.id, topic='Bench', template_id='corporate', slide_count=len(deck))
+            db.session.add(presentation)
+            db.session.flush()
+            for i, slide in enumerate(deck):
+                db.session.add(Slide(presentation_id=presentation.id, slide_order=i,
+                                     layout=slide['layout'], content=slide['content']))
+            db.session.commit()
+        write_us = (time.perf_counter() - start) / slide_count * 1e6
+
+        stored = db.session.execute(db.text(
+            "SELECT SUM(LENGTH(content_json)) + SUM(COALESCE(LENGTH(content_blob), 0)) FROM slides"
+        )).scalar()
+
+        ids = [p.id for p in Presentation.query.all()]
+        rng = random.Random(5)
+        samples = []
+        for presentation_id in (rng.choice(ids) for _ in range(reads)):
+            db.session.expire_all()
+            start = time.perf_counter()
+            db.session.get(Presentation, presentation_id).to_dict()
+            samples.append((time.perf_counter() - start) * 1000)
+        read_ms = statistics.median(samples)
+
+        with db.engine.connect() as conn:
+            conn.exec_driver_sql('VACUUM')
+        db.engine.dispose()
+
+    return os.path.getsize(path), stored / slide_count, write_us, read_ms
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--decks', type=int, default=2000)
+    parser.add_argument('--slides', type=int, default=10, help='slides per deck')
+    parser.add_argument('--reads', type=int, default=500, help='decks read per format')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='bench-storage-')
+    # Keep the module-level app off the real database
+    os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(work_dir, 'default.db'))
+
+    decks = generate_decks(random.Random(1), args.decks, args.slides)
+    training = generate_decks(random.Random(2), 200, args.slides)
+
+    print(f"{args.decks} decks x {args.slides} slides")
+    print(f"{'format':<17}{'db MB':>8}{'bytes/slide':>13}{'write us/slide':>16}{'read ms/deck':>14}")
+    for name, storage, trained in FORMATS:
+        size, per_slide, write_us, read_ms = run_format(work_dir, name, storage, trained,
+                                                        decks, args.reads, training)
+        print(f"{name:<17}{size / 1024 / 1024:>8.1f}{per_slide:>13.0f}{write_us:>16.0f}{read_ms:>14.2f}")
+
+if __name__ == '__main__':
+    main()
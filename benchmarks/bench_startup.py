@@ -0,0 +1,113 @@
+# benchmarks/bench_startup.py
+"""
+Worker cold start: time to import the app and to serve its first requests.
+
+Each run is a fresh Python process (like a newly booted or autoscaled
+worker) against a database that was migrated beforehand. It reports the
+time to import app.py, to answer a first login and dashboard request, and
+to answer the first export (which loads python-pptx), plus the wall time
+from spawning the process to the first response. Heavy modules already
+loaded right after the import are listed, so a regression that pulls one
+back onto the startup path shows up.
+
+Usage: python benchmarks/bench_startup.py [--repeat 7]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Modules that shouldn't load until a request needs them
+HEAVY_MODULES = ['pptx', 'lxml', 'httpx', 'PIL']
+
+DECK = [
+    {'layout': 'titleAndBullets', 'content': {'title': 'Cold start', 'bullets': ['Import', 'First request']}},
+    {'layout': 'quote', 'content': {'quote': 'Lazy is fast', 'author': 'Bench'}}
+]
+
+def setup():
+    """Migrate the database and create the benchmark user"""
+    from app import app, init_db
+    with app.app_context():
+        init_db()
+    app.config.update(LIMITS_DB=os.path.join(os.environ['BENCH_DIR'], 'limits.db'), RATE_LIMITS={})
+    app.test_client().post('/auth/register', json={'username': 'bench', 'password': 'bench'})
+
+def child():
+    """One cold worker; prints a JSON line after the first response and one at the end"""
+    started = time.perf_counter()
+    from app import app
+    imported = time.perf_counter()
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+
+    app.config.update(LIMITS_DB=os.path.join(os.environ['BENCH_DIR'], 'limits.db'), RATE_LIMITS={})
+    client = app.test_client()
+    request_started = time.perf_counter()
+    assert client.post('/auth/login', json={'username': 'bench', 'password': 'bench'}).status_code == 200
+    first_request = time.perf_counter()
+    print(json.dumps({'ready': True}), flush=True)
+
+    assert client.get('/dashboard').status_code == 200
+    dashboard = time.perf_counter()
+    response = client.post('/api/export', json={'slides': DECK, 'template': 'corporate', 'topic': 'bench'})
+    assert response.status_code == 200
+    export = time.perf_counter()
+
+    print(json.dumps({
+        'import': imported - started,
+        'first_request': first_request - request_started,
+        'dashboard': dashboard - first_request,
+        'first_export': export - dashboard,
+        'heavy_at_import': loaded
+    }), flush=True)
+
+def measure(env):
+    spawned = time.perf_counter()
+    process = subprocess.Popen([sys.executable, __file__, '--child'], env=env, cwd=ROOT,
+                               stdout=subprocess.PIPE, text=True)
+    json.loads(process.stdout.readline())
+    to_first_response = time.perf_counter() - spawned
+    row = json.loads(process.stdout.readline())
+    process.wait()
+    row['spawn_to_first_response'] = to_first_response
+    return row
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=7, help='cold processes to start')
+    parser.add_argument('--setup', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.setup:
+        setup()
+        return
+    if args.child:
+        child()
+        return
+
+    work_dir = tempfile.mkdtemp(prefix='bench-startup-')
+    env = dict(os.environ,
+               BENCH_DIR=work_dir,
+               DATABASE_URL='sqlite:///' + os.path.join(work_dir, 'startup.db'),
+               METRICS_DIR=os.path.join(work_dir, 'metrics'),
+               TOPIC_CACHE_PATH=os.path.join(work_dir, 'topic_cache.jsonl'))
+    subprocess.run([sys.executable, __file__, '--setup'], env=env, cwd=ROOT, check=True)
+
+    rows = [measure(env) for _ in range(args.repeat)]
+    print(f"{args.repeat} cold starts, median (min) in ms")
+    for stage in ('import', 'first_request', 'dashboard', 'first_export', 'spawn_to_first_response'):
+        values = [row[stage] * 1000 for row in rows]
+        print(f"{stage:<26}{statistics.median(values):>9.0f} ({min(values):.0f})")
+    heavy = sorted({name for row in rows for name in row['heavy_at_import']})
+    print(f"heavy modules loaded at import: {', '.join(heavy) or 'none'}")
+
+if __name__ == '__main__':
+    main()
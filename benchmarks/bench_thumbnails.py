@@ -0,0 +1,84 @@
+# benchmarks/bench_thumbnails.py
+"""
+Dashboard previews: fetching every deck's JSON vs one cached thumbnail per deck.
+
+Client-side previews need each deck's full JSON (GET /api/presentations/<id>)
+before layouts.js can draw it. Server thumbnails need one small PNG per
+deck, rendered once after save and then served from the content-hash cache
+(and, being immutable, from the browser cache after the first visit). Both
+run in-process through the test client, so times leave out the network;
+the bytes columns show what would cross it per dashboard load.
+
+Usage: python benchmarks/bench_thumbnails.py [--decks 50] [--slides 10]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from seed_data import slide_content, LAYOUTS
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--decks', type=int, default=50, help='decks on the dashboard')
+    parser.add_argument('--slides', type=int, default=10, help='slides per deck')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='bench-thumbnails-')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(work_dir, 'thumbnails.db')
+    os.environ['METRICS_DIR'] = os.path.join(work_dir, 'metrics')
+
+    from app import app, init_db
+    import thumbnails
+    app.config.update(LIMITS_DB=os.path.join(work_dir, 'limits.db'), RATE_LIMITS={},
+                      THUMBNAIL_DIR=os.path.join(work_dir, 'thumbnails'))
+    with app.app_context():
+        init_db()
+
+    client = app.test_client()
+    client.post('/auth/register', json={'username': 'bench', 'password': 'bench'})
+    rng = random.Random(3)
+    templates = ['corporate', 'creative', 'minimal', 'dark']
+
+    started = time.perf_counter()
+    deck_ids = []
+    for i in range(args.decks):
+        slides = [{'layout': layout, 'content': slide_content(rng, layout)}
+                  for layout in (rng.choice(LAYOUTS) for _ in range(args.slides))]
+        saved = client.post('/api/save', json={'topic': f'Deck {i}', 'template': templates[i % 4], 'slides': slides})
+        deck_ids.append(saved.get_json()['presentation']['id'])
+    save_ms = (time.perf_counter() - started) / args.decks * 1000
+    # Let the background renders finish so the warm pass below reads the cache
+    thumbnails._executor.submit(lambda: None).result()
+    render_started = time.perf_counter()
+    thumbnails.render_thumbnail('titleAndBullets', slide_content(rng, 'titleAndBullets'), 'corporate')
+    render_ms = (time.perf_counter() - render_started) * 1000
+
+    # Client previews: the dashboard page, then every deck's JSON
+    started = time.perf_counter()
+    page = client.get('/dashboard')
+    json_bytes = sum(len(client.get(f'/api/presentations/{deck_id}').data) for deck_id in deck_ids)
+    json_ms = (time.perf_counter() - started) * 1000
+
+    # Thumbnails: the dashboard page, then every image it links
+    started = time.perf_counter()
+    page = client.get('/dashboard')
+    urls = re.findall(r'src="(/thumbnails/[0-9a-f]+\.png)"', page.get_data(as_text=True))
+    png_bytes = sum(len(client.get(url).data) for url in urls)
+    png_ms = (time.perf_counter() - started) * 1000
+
+    print(f"{args.decks} decks x {args.slides} slides; save {save_ms:.1f} ms/deck, "
+          f"one thumbnail renders in {render_ms:.1f} ms (in the background)")
+    print(f"{'previews':<22}{'requests':>9}{'KB':>9}{'ms':>9}")
+    print(f"{'deck JSON':<22}{len(deck_ids) + 1:>9}{(len(page.data) + json_bytes) / 1024:>9.0f}{json_ms:>9.1f}")
+    print(f"{'thumbnails':<22}{len(urls) + 1:>9}{(len(page.data) + png_bytes) / 1024:>9.0f}{png_ms:>9.1f}")
+    print(f"{'thumbnails, revisit':<22}{1:>9}{len(page.data) / 1024:>9.0f}{'':>9}  (images from browser cache)")
+
+if __name__ == '__main__':
+    main()
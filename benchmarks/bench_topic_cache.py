@@ -0,0 +1,92 @@
+# benchmarks/bench_topic_cache.py
+"""
+Tune the topic cache similarity threshold and measure lookup cost.
+
+For pairs of topics that should share content (paraphrases) and pairs that
+shouldn't (related but different topics), reports per threshold the share
+of paraphrases served from the cache (hit rate) and the share of different
+topics wrongly served (false hits). Then times lookups against a cache
+filled with --topics synthetic topics.
+
+Usage:
+    python benchmarks/bench_topic_cache.py
+    python benchmarks/bench_topic_cache.py --ollama http://localhost:11434/api/embed --model nomic-embed-text
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from topic_cache import TopicCache, LocalVectorizer, OllamaEmbedder, similarity
+
+SAME = [
+    ('Intro to Machine Learning', 'introduction to ML'),
+    ('Renewable energy adoption', 'Adoption of renewable energy'),
+    ('Onboarding new engineers', 'onboarding a new engineer'),
+    ('Cybersecurity basics for small businesses', 'cybersecurity basics for a small business'),
+    ('The history of the printing press', 'History of the printing press'),
+    ('Quarterly sales review Q3', 'Q3 quarterly sales review'),
+    ('AI in healthcare', 'Artificial intelligence in healthcare'),
+    ('Remote work best practices', 'Best practices for remote work'),
+    ('Introduction to Kubernetes', 'intro to k8s'),
+    ('UX design principles', 'user experience design principles'),
+    ('Climate change impacts', 'climate-change impact'),
+    ('Time management tips', 'Tips for time management')
+]
+
+DIFFERENT = [
+    ('Intro to Python', 'Intro to Java'),
+    ('Quarterly sales review Q3', 'Quarterly sales review Q4'),
+    ('Cybersecurity basics for small businesses', 'Cybersecurity basics for large enterprises'),
+    ('History of Rome', 'History of Greece'),
+    ('Machine learning in finance', 'Machine learning in healthcare'),
+    ('Renewable energy adoption', 'Nuclear energy adoption'),
+    ('Onboarding new engineers', 'Offboarding engineers'),
+    ('Remote work best practices', 'Office work best practices'),
+    ('Deep learning for images', 'Deep learning for text'),
+    ('Marketing strategy 2024', 'Marketing strategy 2025')
+]
+
+THRESHOLDS = [0.7, 0.75, 0.8, 0.85, 0.9, 0.95]
+
+WORDS = ('energy market design health data cloud team growth policy water city school finance travel '
+         'security software customer product history science music food sport climate law media').split()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ollama', help='Ollama /api/embed URL; default: the local vectorizer')
+    parser.add_argument('--model', default='nomic-embed-text')
+    parser.add_argument('--topics', type=int, default=5000, help='cached topics for the lookup timing')
+    args = parser.parse_args()
+
+    embedder = OllamaEmbedder(args.ollama, args.model) if args.ollama else LocalVectorizer()
+    same = [similarity(embedder.embed(a), embedder.embed(b)) for a, b in SAME]
+    different = [similarity(embedder.embed(a), embedder.embed(b)) for a, b in DIFFERENT]
+
+    print(f"embedder {embedder.name}: {len(SAME)} paraphrase pairs, {len(DIFFERENT)} different pairs")
+    print(f"{'threshold':<12}{'hit rate':>10}{'false hits':>12}")
+    for threshold in THRESHOLDS:
+        hits = sum(score >= threshold for score in same) / len(same)
+        false_hits = sum(score >= threshold for score in different) / len(different)
+        print(f"{threshold:<12}{hits:>10.0%}{false_hits:>12.0%}")
+    print(f"lowest paraphrase similarity {min(same):.3f}, highest different-topic similarity {max(different):.3f}")
+
+    rng = random.Random(1)
+    cache = TopicCache(embedder, max_topics=args.topics)
+    for i in range(args.topics):
+        cache.put(' '.join(rng.sample(WORDS, 3)) + f' {i}', 'model|titleAndBullets', {'title': str(i)})
+    queries = [' '.join(rng.sample(WORDS, 3)) for _ in range(200)]
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        cache.get(query, 'model|titleAndBullets')
+        timings.append(time.perf_counter() - start)
+    print(f"\nlookup with {args.topics} cached topics: p50 {statistics.median(timings) * 1000:.2f} ms, "
+          f"max {max(timings) * 1000:.2f} ms")
+
+if __name__ == '__main__':
+    main()
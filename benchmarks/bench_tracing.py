@@ -0,0 +1,128 @@
+# benchmarks/bench_tracing.py
+"""
+Cost of request tracing at different sample rates.
+
+Runs the same requests through apps built with TRACE_SAMPLE_RATE off, at
+1% and at 100%: GET /api/presentations/<id> (a few SQL statements) and
+POST /api/export (a span per slide), median over many runs, plus the
+trace bytes written per request and the cost of one span() call with
+tracing off and on. Finally checks that a profiled /api/generate against
+the fake Ollama attributes every model call: one per slide plus the outline,
+including those made from the deck's pool threads.
+
+Usage: python benchmarks/bench_tracing.py [--requests 300] [--exports 40]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_ollama import start_server
+from seed_data import slide_content, LAYOUTS
+
+RATES = [('off', 0.0), ('1%', 0.01), ('100%', 1.0)]
+
+def median_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def trace_bytes(directory):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(directory) for name in names)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=300, help='deck fetches per rate')
+    parser.add_argument('--exports', type=int, default=40, help='exports per rate')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='bench-tracing-')
+    os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(work_dir, 'default.db'))
+    os.environ['TOPIC_CACHE'] = 'off'
+    os.environ['TOPIC_CACHE_PATH'] = os.path.join(work_dir, 'topic_cache.jsonl')
+    server, url = start_server()
+    os.environ['OLLAMA_API_URL'] = url
+
+    from app import create_app, init_db
+    import tracing
+
+    rng = random.Random(9)
+    slides = [{'layout': layout, 'content': slide_content(rng, layout)} for layout in LAYOUTS * 2]
+
+    print(f"{'sampling':<10}{'GET deck ms':>13}{'export ms':>11}{'trace KB/request':>18}")
+    for name, rate in RATES:
+        directory = os.path.join(work_dir, name)
+        os.makedirs(directory)
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(directory, 'app.db'),
+            'TRACE_SAMPLE_RATE': rate, 'TRACE_DIR': os.path.join(directory, 'traces'),
+            'LIMITS_DB': os.path.join(directory, 'limits.db'), 'RATE_LIMITS': {},
+            'THUMBNAIL_DIR': os.path.join(directory, 'thumbnails'),
+            'METRICS_DIR': os.path.join(directory, 'metrics')
+        })
+        with app.app_context():
+            init_db()
+        client = app.test_client()
+        client.post('/auth/register', json={'username': 'bench', 'password': 'bench'})
+        deck_id = client.post('/api/save', json={'topic': 'Bench', 'template': 'corporate', 'slides': slides}
+                              ).get_json()['presentation']['id']
+
+        # Warm up imports and caches so the first rate measured isn't penalised
+        median_ms(lambda: client.post('/api/export', json={'topic': 'Bench', 'template': 'corporate',
+                                                            'slides': slides}), 5)
+        written = trace_bytes(directory)
+
+        get_ms = median_ms(lambda: client.get(f'/api/presentations/{deck_id}'), args.requests)
+        export_ms = median_ms(lambda: client.post('/api/export', json={'topic': 'Bench', 'template': 'corporate',
+                                                                        'slides': slides}), args.exports)
+        per_request = (trace_bytes(directory) - written) / (args.requests + args.exports) / 1024
+        print(f"{name:<10}{get_ms:>13.2f}{export_ms:>11.1f}{per_request:>18.2f}")
+
+    def one_span():
+        with tracing.span('bench'):
+            pass
+
+    off_ns = min(timeit.repeat(one_span, number=100000, repeat=5)) / 100000 * 1e9
+    token = tracing._current.set(('0' * 32, '0' * 16))
+    on_ns = min(timeit.repeat(one_span, number=20000, repeat=5)) / 20000 * 1e9
+    tracing._current.reset(token)
+    print(f"span(): {off_ns:.0f} ns with tracing off, {on_ns / 1000:.1f} us recorded")
+
+    directory = os.path.join(work_dir, 'profiled')
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(directory, 'app.db'),
+        'LIMITS_DB': os.path.join(directory, 'limits.db'), 'RATE_LIMITS': {},
+        'THUMBNAIL_DIR': os.path.join(directory, 'thumbnails'), 'METRICS_DIR': os.path.join(directory, 'metrics'),
+        'PROFILE_DIR': os.path.join(directory, 'profiles'), 'PROFILE_ALLOWED_IPS': ['127.0.0.1']
+    })
+    os.makedirs(directory)
+    with app.app_context():
+        init_db()
+    client = app.test_client()
+    client.post('/auth/register', json={'username': 'bench', 'password': 'bench'})
+    slide_count = 6
+    response = client.post('/api/generate?profile=1', json={'topic': 'Profiled deck', 'slideCount': slide_count})
+    with open(os.path.join(directory, 'profiles', response.headers['X-Profile-Id'] + '.json')) as f:
+        summary = json.load(f)
+    calls = summary['ollama']['count']
+    spans = {name: entry['count'] for name, entry in summary['spans_by_name'].items()}
+    print(f"profiled deck: {calls} Ollama calls for {slide_count} slides + outline, "
+          f"{spans.get('generate_content', 0)} generate_content spans")
+    server.shutdown()
+    if calls != slide_count + 1 or spans.get('generate_content') != slide_count:
+        sys.exit('profiled deck is missing calls made from pool threads')
+
+if __name__ == '__main__':
+    main()
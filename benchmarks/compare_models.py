@@ -0,0 +1,112 @@
+# benchmarks/compare_models.py
+"""
+Compare Ollama models per layout to choose model routes.
+
+Every model generates each layout for a set of topics. The report gives
+median latency, tokens/second and the share of replies that parse as JSON
+with every field the layout declares. The suggested routes pick, per
+layout, the fastest model whose pass rate meets --min-pass, with the
+remaining passing models as its fallback chain. The routes are printed as
+JSON ready for OLLAMA_MODEL_ROUTES.
+
+Usage:
+    python benchmarks/compare_models.py --models llama3.2:3b llama3.1:8b
+    python benchmarks/compare_models.py --models a b --runs 5 --output report.json
+    python benchmarks/compare_models.py --fake   # smoke run against fake_ollama
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+TOPICS = [
+    'Renewable energy adoption',
+    'Onboarding new engineers',
+    'Quarterly sales review',
+    'The history of the printing press',
+    'Cybersecurity basics for small businesses'
+]
+
+def measure(ollama_client, layouts, model, layout, topic):
+    """One call: (seconds, tokens per second or None, passed)"""
+    prompt = layouts.build_prompt(layout, topic)
+    start = time.perf_counter()
+    response, _ = ollama_client.post_prompt(prompt, layout, 'batch', 'compare_models', model=model)
+    elapsed = time.perf_counter() - start
+    if response.status_code != 200:
+        return elapsed, None, False
+
+    result = response.json()
+    tokens_per_second = None
+    if result.get('eval_count') and result.get('eval_duration'):
+        tokens_per_second = result['eval_count'] / (result['eval_duration'] / 1e9)
+    content = ollama_client.parse_json_object(result.get('response', ''))
+    return elapsed, tokens_per_second, layouts.is_complete(content, layout)
+
+def suggest_routes(report, models, min_pass):
+    routes = {}
+    for layout, by_model in report.items():
+        passing = [m for m in models if by_model[m]['pass_rate'] >= min_pass]
+        passing.sort(key=lambda m: by_model[m]['p50_ms'])
+        # Keep a fallback even when nothing passes: the most reliable model
+        routes[layout] = passing or [max(models, key=lambda m: by_model[m]['pass_rate'])]
+    return {'default': routes}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--models', nargs='+', default=['llama3.1:8b'])
+    parser.add_argument('--layouts', nargs='+', help='default: every layout in the registry')
+    parser.add_argument('--runs', type=int, default=2, help='calls per model, layout and topic')
+    parser.add_argument('--min-pass', type=float, default=0.95, help='pass rate a model needs to be routed to')
+    parser.add_argument('--url', help='Ollama /api/generate URL (default: OLLAMA_API_URL)')
+    parser.add_argument('--fake', action='store_true', help='run against an in-process fake Ollama')
+    parser.add_argument('--output', help='write the report as JSON to this path')
+    args = parser.parse_args()
+
+    if args.fake:
+        from fake_ollama import start_server
+        _, args.url = start_server(latency=0.01, seed=1)
+    if args.url:
+        os.environ['OLLAMA_API_URL'] = args.url
+    # Every run must reach the model, not a cached reply to the same topic
+    os.environ['TOPIC_CACHE'] = 'off'
+
+    import layouts
+    import ollama_client
+
+    report = {}
+    print(f"{'layout':<20}{'model':<24}{'p50 ms':>10}{'tok/s':>10}{'pass':>8}")
+    for layout in args.layouts or layouts.LAYOUTS:
+        report[layout] = {}
+        for model in args.models:
+            latencies, speeds, passed = [], [], 0
+            for topic in TOPICS:
+                for _ in range(args.runs):
+                    elapsed, tokens_per_second, ok = measure(ollama_client, layouts, model, layout, topic)
+                    latencies.append(elapsed)
+                    if tokens_per_second:
+                        speeds.append(tokens_per_second)
+                    passed += ok
+            row = report[layout][model] = {
+                'p50_ms': statistics.median(latencies) * 1000,
+                'tokens_per_second': statistics.median(speeds) if speeds else 0.0,
+                'pass_rate': passed / len(latencies)
+            }
+            print(f"{layout:<20}{model:<24}{row['p50_ms']:>10.0f}{row['tokens_per_second']:>10.1f}"
+                  f"{row['pass_rate']:>8.0%}")
+
+    routes = suggest_routes(report, args.models, args.min_pass)
+    print("\nSuggested OLLAMA_MODEL_ROUTES:")
+    print(json.dumps(routes))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'report': report, 'routes': routes}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,306 @@
+# benchmarks/fake_ollama.py
+"""
+Local stand-in for Ollama's /api/generate.
+
+Replies with canned per-layout JSON (or a deck outline for outline prompts)
+so the app can be exercised end to end without a model, either as one JSON
+body or streamed as NDJSON chunks when the request asks for "stream": true.
+Latency is modelled per generated token and per prompt token that misses a
+simulated prompt (KV) cache, and `system` and `context` are honoured the
+way Ollama does. A configurable share of replies can be HTTP errors,
+malformed (non-JSON) text or stragglers that take extra time. Point the app at it with
+OLLAMA_API_URL=http://127.0.0.1:<port>/api/generate.
+
+Usage:
+    python benchmarks/fake_ollama.py [--port 11435] [--latency-ms 0]
+        [--token-latency-ms 0] [--prompt-token-latency-ms 0]
+        [--error-rate 0] [--malformed-rate 0] [--slow-rate 0 --slow-ms 2000]
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CANNED = {
+    'titleAndBullets': {
+        'title': 'Key Drivers of Growth',
+        'bullets': [
+            'Expanding into adjacent markets',
+            'Investing in product quality',
+            'Building long-term customer relationships',
+            'Streamlining operations with automation'
+        ]
+    },
+    'quote': {
+        'quote': 'The best way to predict the future is to create it.',
+        'author': 'Peter Drucker'
+    },
+    'imageAndParagraph': {
+        'title': 'A Closer Look',
+        'imageDescription': 'A team collaborating around a whiteboard',
+        'paragraph': 'Successful initiatives combine a clear vision with disciplined execution. '
+                     'Teams that measure outcomes, iterate quickly and share context broadly '
+                     'consistently outperform those that plan in isolation.'
+    },
+    'twoColumn': {
+        'title': 'Before and After',
+        'column1Title': 'Challenges',
+        'column1Content': 'Manual processes, fragmented data and slow feedback loops.',
+        'column2Title': 'Outcomes',
+        'column2Content': 'Automated workflows, a single source of truth and faster decisions.'
+    },
+    'titleOnly': {
+        'title': 'Charting the Path Forward',
+        'subtitle': 'Strategy, execution and the road ahead'
+    }
+}
+
+# Phrases from ollama_client's prompts that identify the requested layout
+LAYOUT_MARKERS = [
+    ('bullet points', 'titleAndBullets'),
+    ('quote', 'quote'),
+    ('image description', 'imageAndParagraph'),
+    ('two columns', 'twoColumn'),
+    ('title slide', 'titleOnly')
+]
+
+MALFORMED = (
+    "Sure! Here is a slide for you:\n"
+    "Key Points\n"
+    "- First, understand the fundamentals\n"
+    "- Then apply them step by step\n"
+    "- Finally, review the results"
+)
+
+# Layout sequence used when asked for a deck outline
+OUTLINE_LAYOUTS = ['titleOnly', 'titleAndBullets', 'imageAndParagraph', 'twoColumn', 'quote']
+
+def detect_layout(prompt):
+    # Only the instruction line names the layout; outline context follows it
+    prompt = prompt.split('\n', 1)[0].lower()
+    for marker, layout in LAYOUT_MARKERS:
+        if marker in prompt:
+            return layout
+    return 'titleOnly'
+
+def outline_reply(prompt):
+    """A deck outline for prompts from outline.build_outline_prompt, else None"""
+    match = re.match(r"Plan a (\d+)-slide presentation", prompt)
+    if not match:
+        return None
+    layouts = [OUTLINE_LAYOUTS[i % len(OUTLINE_LAYOUTS)] for i in range(int(match.group(1)))]
+    return json.dumps([
+        {'layout': layout, 'title': f"{CANNED[layout].get('title', 'Words to remember')} ({i + 1})",
+         'point': f'Key point number {i + 1}'}
+        for i, layout in enumerate(layouts)
+    ])
+
+def tokenize(text):
+    """Rough stand-in for model tokens: words with their trailing whitespace"""
+    return re.findall(r'\S+\s*', text)
+
+class PromptCache:
+    """
+    Ollama-style KV reuse: each slot remembers the last token sequence it
+    processed, and a new call only prefills the tokens after the longest
+    prefix it shares with a slot.
+    """
+
+    def __init__(self, slots=4):
+        self.slots = slots
+        self._lock = threading.Lock()
+        self._sequences = []
+        self._vocab = {}
+
+    def encode(self, tokens):
+        with self._lock:
+            return [self._vocab.setdefault(token, len(self._vocab)) for token in tokens]
+
+    def prefill(self, sequence):
+        """Tokens of `sequence` not covered by a cached prefix"""
+        with self._lock:
+            best = 0
+            for cached in self._sequences:
+                shared = 0
+                for a, b in zip(cached, sequence):
+                    if a != b:
+                        break
+                    shared += 1
+                best = max(best, shared)
+            return max(1, len(sequence) - best)
+
+    def store(self, sequence):
+        with self._lock:
+            self._sequences.append(sequence)
+            del self._sequences[:-self.slots]
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    token_latency = 0.0
+    prompt_token_latency = 0.0
+    error_rate = 0.0
+    malformed_rate = 0.0
+    # Share of calls delayed by an extra slow_latency, for tail-latency tests
+    slow_rate = 0.0
+    slow_latency = 0.0
+    # Installed models; requests for others get Ollama's 404 (None accepts any)
+    models = None
+    rng = random.Random()
+    cache = PromptCache()
+    # (prompt_eval_count, prompt_eval_duration) of every answered call
+    calls = []
+
+    def do_POST(self):
+        if self.path != '/api/generate':
+            self.send_error(404)
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        prompt = payload.get('prompt', '')
+
+        if self.models is not None and payload.get('model') not in self.models:
+            self.send_error(404, f"model '{payload.get('model')}' not found")
+            return
+
+        # Full input as the model sees it: earlier context, or the system
+        # preamble, then the prompt
+        if payload.get('context'):
+            sequence = list(payload['context']) + self.cache.encode(tokenize(prompt))
+        else:
+            sequence = self.cache.encode(tokenize(payload.get('system', '')) + tokenize(prompt))
+        prompt_eval_count = self.cache.prefill(sequence)
+
+        roll = self.rng.random()
+        if roll < self.error_rate:
+            time.sleep(self.latency)
+            self.send_error(500, 'simulated model failure')
+            return
+
+        if roll < self.error_rate + self.malformed_rate:
+            text = MALFORMED
+        else:
+            text = outline_reply(prompt) or json.dumps(CANNED[detect_layout(prompt)])
+        tokens = tokenize(text)
+        context = sequence + self.cache.encode(tokens)
+        self.cache.store(context)
+
+        prefill = self.latency + self.prompt_token_latency * prompt_eval_count
+        if self.rng.random() < self.slow_rate:
+            prefill += self.slow_latency
+        self.calls.append((prompt_eval_count, int(prefill * 1e9)))
+        time.sleep(prefill)
+
+        if payload.get('stream', True):
+            self.stream(payload, prompt_eval_count, prefill, tokens, context)
+        else:
+            self.reply(payload, prompt_eval_count, prefill, tokens, context)
+
+    def stats(self, prompt_eval_count, prefill, tokens, elapsed_ns, context):
+        return {
+            'prompt_eval_count': prompt_eval_count,
+            'prompt_eval_duration': int(prefill * 1e9),
+            'eval_count': len(tokens),
+            'eval_duration': elapsed_ns,
+            'context': context
+        }
+
+    def reply(self, payload, prompt_eval_count, prefill, tokens, context):
+        start = time.perf_counter()
+        time.sleep(self.token_latency * len(tokens))
+        elapsed_ns = int((time.perf_counter() - start) * 1e9)
+
+        body = json.dumps({
+            'model': payload.get('model'),
+            'response': ''.join(tokens),
+            'done': True,
+            **self.stats(prompt_eval_count, prefill, tokens, elapsed_ns, context)
+        }).encode()
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream(self, payload, prompt_eval_count, prefill, tokens, context):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+
+        start = time.perf_counter()
+        for token in tokens:
+            time.sleep(self.token_latency)
+            self.wfile.write(json.dumps({'model': payload.get('model'), 'response': token, 'done': False}).encode() + b'\n')
+            self.wfile.flush()
+
+        elapsed_ns = int((time.perf_counter() - start) * 1e9)
+        self.wfile.write(json.dumps({
+            'model': payload.get('model'),
+            'response': '',
+            'done': True,
+            **self.stats(prompt_eval_count, prefill, tokens, elapsed_ns, context)
+        }).encode() + b'\n')
+        self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Room for hundreds of concurrent callers in load tests
+    request_queue_size = 1024
+
+def start_server(port=0, latency=0.0, token_latency=0.0, error_rate=0.0, malformed_rate=0.0, seed=None,
+                 prompt_token_latency=0.0, cache_slots=4, models=None, slow_rate=0.0, slow_latency=0.0):
+    """
+    Start the fake server on a background thread; returns (server, url).
+    The handler class, with its call log, is server.RequestHandlerClass.
+    """
+    handler = type('Handler', (FakeOllamaHandler,), {
+        'latency': latency,
+        'token_latency': token_latency,
+        'prompt_token_latency': prompt_token_latency,
+        'error_rate': error_rate,
+        'malformed_rate': malformed_rate,
+        'slow_rate': slow_rate,
+        'slow_latency': slow_latency,
+        'rng': random.Random(seed),
+        'cache': PromptCache(cache_slots),
+        'models': set(models) if models else None,
+        'calls': []
+    })
+    server = FakeOllamaServer(('127.0.0.1', port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}/api/generate'
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=11435)
+    parser.add_argument('--latency-ms', type=float, default=0, help='fixed delay before the first token')
+    parser.add_argument('--token-latency-ms', type=float, default=0, help='delay per generated token')
+    parser.add_argument('--prompt-token-latency-ms', type=float, default=0,
+                        help='delay per prompt token not covered by the prompt cache')
+    parser.add_argument('--error-rate', type=float, default=0, help='share of calls answered with HTTP 500')
+    parser.add_argument('--malformed-rate', type=float, default=0, help='share of calls answered with non-JSON text')
+    parser.add_argument('--slow-rate', type=float, default=0, help='share of calls delayed by --slow-ms')
+    parser.add_argument('--slow-ms', type=float, default=2000)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    server, url = start_server(args.port, args.latency_ms / 1000.0, args.token_latency_ms / 1000.0,
+                               args.error_rate, args.malformed_rate, args.seed,
+                               args.prompt_token_latency_ms / 1000.0,
+                               slow_rate=args.slow_rate, slow_latency=args.slow_ms / 1000.0)
+    print(f"fake Ollama listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+# benchmarks/load_test.py
+"""
+Load-test harness replaying realistic user sessions against the app.
+
+Each session logs in, generates a deck, edits and saves it, re-opens it,
+saves again and exports it. Sessions start at a fixed target rate (open
+loop), so once the app saturates latency and errors grow instead of the
+offered load quietly dropping. The report gives throughput and
+p50/p95/p99 latency per endpoint.
+
+By default the app and a fake Ollama are started in-process on local ports
+(rate limits disabled); use --url to drive an existing deployment instead.
+
+Usage:
+    python benchmarks/load_test.py --rate 2 --duration 30
+    python benchmarks/load_test.py --url http://127.0.0.1:5000 --users 20
+    python benchmarks/load_test.py --token-latency-ms 20 --malformed-rate 0.1
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))
+
+    def record(self, name, seconds, status):
+        with self._lock:
+            if 200 <= status < 400:
+                self.latencies[name].append(seconds)
+            else:
+                self.errors[name][status] += 1
+
+    def report(self, elapsed):
+        rows = {}
+        for name in sorted(set(self.latencies) | set(self.errors)):
+            samples = sorted(self.latencies[name])
+            rows[name] = {
+                'ok': len(samples),
+                'errors': dict(self.errors[name]),
+                'throughput_rps': len(samples) / elapsed if elapsed else 0.0,
+                'p50_ms': percentile(samples, 0.50) * 1000,
+                'p95_ms': percentile(samples, 0.95) * 1000,
+                'p99_ms': percentile(samples, 0.99) * 1000
+            }
+        return rows
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def timed(recorder, name, method, url, **kwargs):
+    start = time.perf_counter()
+    try:
+        response = method(url, timeout=300, **kwargs)
+        status = response.status_code
+    except requests.RequestException:
+        response, status = None, 599
+    recorder.record(name, time.perf_counter() - start, status)
+    return response
+
+def run_session(base_url, username, slide_count, recorder):
+    http = requests.Session()
+    if timed(recorder, 'POST /auth/login', http.post, f'{base_url}/auth/login',
+             json={'username': username, 'password': 'loadtest'}) is None:
+        return
+
+    topic = f'Load test topic for {username}'
+    response = timed(recorder, 'POST /api/generate', http.post, f'{base_url}/api/generate',
+                     json={'topic': topic, 'template': 'corporate', 'slideCount': slide_count})
+    if response is None or response.status_code != 200:
+        return
+    slides = response.json()['slides']
+
+    # Edit a slide and save the new deck
+    if slides:
+        slides[0]['content']['title'] = 'Edited title'
+    response = timed(recorder, 'POST /api/save', http.post, f'{base_url}/api/save',
+                     json={'topic': topic, 'template': 'corporate', 'slides': slides})
+    if response is None or response.status_code != 200:
+        return
+    presentation_id = response.json()['presentation']['id']
+
+    timed(recorder, 'GET /dashboard', http.get, f'{base_url}/dashboard')
+    timed(recorder, 'GET /api/presentations/<id>', http.get, f'{base_url}/api/presentations/{presentation_id}')
+
+    # Save again as an update, then export
+    timed(recorder, 'POST /api/save (update)', http.post, f'{base_url}/api/save',
+          json={'id': presentation_id, 'topic': topic, 'template': 'creative', 'slides': slides})
+    timed(recorder, 'POST /api/export', http.post, f'{base_url}/api/export',
+          json={'topic': topic, 'template': 'creative', 'slides': slides})
+
+def ensure_users(base_url, count):
+    names = [f'loaduser{i}' for i in range(count)]
+    for name in names:
+        requests.post(f'{base_url}/auth/register', json={'username': name, 'password': 'loadtest'}, timeout=30)
+    return names
+
+def start_local_app(args):
+    """Start the fake Ollama and the Flask app on local ports"""
+    from fake_ollama import start_server
+    _, ollama_url = start_server(
+        latency=args.latency_ms / 1000.0,
+        token_latency=args.token_latency_ms / 1000.0,
+        error_rate=args.error_rate,
+        malformed_rate=args.malformed_rate,
+        seed=1
+    )
+
+    work_dir = tempfile.mkdtemp(prefix='load-test-')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(work_dir, 'load.db')
+    os.environ['METRICS_DIR'] = os.path.join(work_dir, 'metrics')
+    os.environ['OLLAMA_API_URL'] = ollama_url
+    # Users repeat their topic every session; cache hits would inflate throughput
+    os.environ['TOPIC_CACHE'] = 'off'
+    os.environ['TOPIC_CACHE_PATH'] = os.path.join(work_dir, 'topic_cache.jsonl')
+
+    from werkzeug.serving import make_server
+    from app import app, init_db
+    app.config.update(LIMITS_DB=os.path.join(work_dir, 'limits.db'), RATE_LIMITS={},
+                      THUMBNAIL_DIR=os.path.join(work_dir, 'thumbnails'))
+    with app.app_context():
+        init_db()
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}'
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='base URL of a running app (default: start one in-process)')
+    parser.add_argument('--rate', type=float, default=1.0, help='sessions started per second')
+    parser.add_argument('--duration', type=float, default=20.0, help='seconds to keep starting sessions')
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--slide-count', type=int, default=6)
+    parser.add_argument('--max-workers', type=int, default=200)
+    parser.add_argument('--latency-ms', type=float, default=50, help='fake Ollama fixed delay per call')
+    parser.add_argument('--token-latency-ms', type=float, default=0, help='fake Ollama delay per token')
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--malformed-rate', type=float, default=0)
+    parser.add_argument('--output', help='write the report as JSON to this path')
+    args = parser.parse_args()
+
+    base_url = args.url.rstrip('/') if args.url else start_local_app(args)
+    users = ensure_users(base_url, args.users)
+    recorder = Recorder()
+
+    interval = 1.0 / args.rate
+    start = time.perf_counter()
+    sessions = 0
+    with ThreadPoolExecutor(max_workers=args.max_workers) as pool:
+        while time.perf_counter() - start < args.duration:
+            pool.submit(run_session, base_url, users[sessions % len(users)], args.slide_count, recorder)
+            sessions += 1
+            next_start = start + sessions * interval
+            time.sleep(max(0.0, next_start - time.perf_counter()))
+    elapsed = time.perf_counter() - start
+
+    report = recorder.report(elapsed)
+    print(f"{sessions} sessions offered at {args.rate}/s over {elapsed:.1f}s")
+    print(f"{'endpoint':<30}{'ok':>6}{'err':>6}{'rps':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, row in report.items():
+        errors = sum(row['errors'].values())
+        print(f"{name:<30}{row['ok']:>6}{errors:>6}{row['throughput_rps']:>8.2f}"
+              f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'sessions': sessions, 'rate': args.rate, 'elapsed': elapsed, 'endpoints': report}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+# benchmarks/run_suite.py
+"""
+Benchmark suite for generation post-processing, export and persistence.
+
+Every case runs on fixed, seeded inputs. Results are written as JSON and
+compared against a stored baseline; a case whose median is slower than the
+baseline by more than the threshold counts as a regression (exit code 1).
+
+Usage:
+    python benchmarks/run_suite.py                          # run and compare
+    python benchmarks/run_suite.py --output results.json
+    python benchmarks/run_suite.py --update-baseline        # record a new baseline
+    python benchmarks/run_suite.py --filter create_presentation
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+DEFAULT_THRESHOLD = 0.25
+
+WORDS = (
+    "strategy growth market customer product quality data cloud platform team revenue "
+    "innovation research design security network leadership roadmap analytics insight"
+).split()
+
+def text_of(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+def make_content(rng, layout, scale=1):
+    """Slide content; scale > 1 produces overlong text that has to be truncated"""
+    if layout == 'titleAndBullets':
+        return {'title': text_of(rng, 8 * scale), 'bullets': [text_of(rng, 14 * scale) for _ in range(4 + scale)]}
+    if layout == 'quote':
+        return {'quote': text_of(rng, 20 * scale), 'author': text_of(rng, 2 * scale)}
+    if layout == 'imageAndParagraph':
+        return {'title': text_of(rng, 8 * scale), 'imageDescription': text_of(rng, 10 * scale),
+                'paragraph': text_of(rng, 40 * scale)}
+    if layout == 'twoColumn':
+        return {'title': text_of(rng, 8 * scale), 'column1Title': text_of(rng, 3 * scale),
+                'column1Content': text_of(rng, 25 * scale), 'column2Title': text_of(rng, 3 * scale),
+                'column2Content': text_of(rng, 25 * scale)}
+    return {'title': text_of(rng, 6 * scale), 'subtitle': text_of(rng, 12 * scale)}
+
+def make_slides(rng, layouts, count):
+    return [{'layout': layouts[i % len(layouts)], 'content': make_content(rng, layouts[i % len(layouts)])}
+            for i in range(count)]
+
+class Suite:
+    def __init__(self, repeat, name_filter=None):
+        self.repeat = repeat
+        self.name_filter = name_filter
+        self.results = {}
+
+    def bench(self, name, fn, repeat=None, warmup=1):
+        if self.name_filter and self.name_filter not in name:
+            return
+        for _ in range(warmup):
+            fn()
+        samples = []
+        for _ in range(repeat or self.repeat):
+            start = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - start) * 1000)
+        samples.sort()
+        self.results[name] = {
+            'median_ms': statistics.median(samples),
+            'mean_ms': statistics.fmean(samples),
+            'min_ms': samples[0],
+            'p95_ms': samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))],
+            'samples': len(samples)
+        }
+        print(f"{name:<48}{self.results[name]['median_ms']:>12.3f} ms")
+
+def run(args):
+    work_dir = tempfile.mkdtemp(prefix='bench-suite-')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(work_dir, 'suite.db')
+    # Every generate call uses the same topic; with the topic cache on it would time cache hits
+    os.environ['TOPIC_CACHE'] = 'off'
+    os.environ['TOPIC_CACHE_PATH'] = os.path.join(work_dir, 'topic_cache.jsonl')
+
+    from fake_ollama import start_server
+    server, url = start_server()
+    os.environ['OLLAMA_API_URL'] = url
+
+    from app import app, init_db, LAYOUTS, process_content_for_layout
+    from export import create_presentation
+    from models import db, Presentation
+    import metrics
+    import thumbnails
+
+    app.config.update(
+        LIMITS_DB=os.path.join(work_dir, 'limits.db'),
+        RATE_LIMITS={},
+        THUMBNAIL_DIR=os.path.join(work_dir, 'thumbnails')
+    )
+    metrics.configure(os.path.join(work_dir, 'metrics'))
+    with app.app_context():
+        init_db()
+
+    suite = Suite(args.repeat, args.filter)
+    rng = random.Random(1234)
+
+    # Post-processing: 200 overlong contents per layout
+    for layout in LAYOUTS:
+        contents = [make_content(rng, layout, scale=3) for _ in range(200)]
+        suite.bench(f'process_content_for_layout[{layout}]',
+                    lambda contents=contents, layout=layout: [process_content_for_layout(c, layout) for c in contents])
+
+    # Export: 10 slides of each layout, then mixed decks of 1/10/100 slides
+    pptx_path = os.path.join(work_dir, 'out.pptx')
+    for layout in LAYOUTS:
+        slides = make_slides(rng, [layout], 10)
+        suite.bench(f'create_presentation[{layout} x10]',
+                    lambda slides=slides: create_presentation(pptx_path, slides, 'corporate'))
+    for count in (1, 10, 100):
+        slides = make_slides(rng, LAYOUTS, count)
+        suite.bench(f'create_presentation[mixed x{count}]',
+                    lambda slides=slides: create_presentation(pptx_path, slides, 'creative'),
+                    repeat=max(3, args.repeat // (1 if count < 100 else 4)))
+
+    # Persistence over a seeded database
+    client = app.test_client()
+    client.post('/auth/register', json={'username': 'bench', 'password': 'bench'})
+    for i in range(args.seed_decks):
+        client.post('/api/save', json={
+            'topic': f'Seeded deck {i}',
+            'template': 'corporate',
+            'slides': make_slides(rng, LAYOUTS, 10)
+        })
+
+    with app.app_context():
+        deck_ids = {}
+        for count in (10, 100):
+            response = client.post('/api/save', json={
+                'topic': f'{count}-slide deck', 'template': 'minimal', 'slides': make_slides(rng, LAYOUTS, count)
+            })
+            deck_ids[count] = response.get_json()['presentation']['id']
+        # Saving queues thumbnail renders; let them finish so they don't compete with the timed cases
+        thumbnails._executor.submit(lambda: None).result()
+
+        for count, deck_id in deck_ids.items():
+            def to_dict(deck_id=deck_id):
+                db.session.expire_all()
+                db.session.get(Presentation, deck_id).to_dict()
+            suite.bench(f'Presentation.to_dict[{count} slides]', to_dict)
+
+    save_body = {'topic': 'Save benchmark', 'template': 'dark', 'slides': make_slides(rng, LAYOUTS, 10)}
+    suite.bench('POST /api/save[10 slides]', lambda: client.post('/api/save', json=save_body))
+    suite.bench(f'GET /api/presentations[{args.seed_decks}+ decks]', lambda: client.get('/api/presentations'))
+    suite.bench('GET /api/presentations/<id>[100 slides]',
+                lambda: client.get(f'/api/presentations/{deck_ids[100]}'))
+
+    # End to end generation against the fake Ollama server
+    def generate():
+        random.seed(42)
+        client.post('/api/generate', json={'topic': 'Benchmarks', 'template': 'corporate', 'slideCount': 6})
+    suite.bench('POST /api/generate[6 slides, fake ollama]', generate)
+
+    server.shutdown()
+    return suite.results
+
+def compare(results, baseline, threshold):
+    regressions = []
+    print(f"\n{'case':<48}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, current in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if previous is None:
+            print(f"{name:<48}{'-':>12}{current['median_ms']:>12.3f}{'new':>10}")
+            continue
+        change = current['median_ms'] / previous['median_ms'] - 1 if previous['median_ms'] else 0.0
+        flag = '  REGRESSION' if change > threshold else ''
+        print(f"{name:<48}{previous['median_ms']:>12.3f}{current['median_ms']:>12.3f}{change:>+10.1%}{flag}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed-decks', type=int, default=50)
+    parser.add_argument('--filter', help='only run cases whose name contains this string')
+    parser.add_argument('--output', help='write results JSON to this path')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='allowed slowdown of the median before a case counts as a regression')
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args()
+
+    results = run(args)
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat
+        },
+        'results': results
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nbaseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nno baseline at {args.baseline}; run with --update-baseline to record one")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
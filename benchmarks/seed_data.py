@@ -0,0 +1,162 @@
+# benchmarks/seed_data.py
+"""
+Fill the users, presentations and slides tables with synthetic data.
+
+Distributions are skewed like real traffic: decks per user follow a Pareto
+law (most users have a handful, a few have thousands), slides per deck
+cluster around the default of 6 with a long tail of large imported decks,
+and text lengths vary log-normally. Rows are written with bulk inserts.
+Every seeded user's password is "seed".
+
+Usage:
+    python benchmarks/seed_data.py --db /tmp/big.db --users 500
+    python benchmarks/seed_data.py --db sqlite:////tmp/big.db --users 50 --mean-decks 40
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LAYOUTS = ["titleAndBullets", "quote", "imageAndParagraph", "twoColumn", "titleOnly"]
+TEMPLATE_IDS = ['corporate', 'creative', 'minimal', 'dark']
+
+WORDS = (
+    "strategy growth market customer product quality data cloud platform team revenue "
+    "innovation research design security network leadership roadmap analytics insight "
+    "energy climate health finance education mobile supply chain risk budget operations"
+).split()
+
+# Slides per deck: mostly the editor's 1-10 range, plus a tail of big imports
+SLIDE_COUNTS = list(range(1, 11)) + [20, 40, 80]
+SLIDE_WEIGHTS = [2, 2, 3, 4, 6, 20, 6, 5, 4, 6, 2, 1, 0.5]
+
+MAX_DECKS_PER_USER = 5000
+BATCH_SIZE = 5000
+
+def words(rng, mean):
+    count = max(1, int(rng.lognormvariate(0, 0.5) * mean))
+    return ' '.join(rng.choice(WORDS) for _ in range(count)).capitalize()
+
+def slide_content(rng, layout):
+    if layout == 'titleAndBullets':
+        return {'title': words(rng, 6), 'bullets': [words(rng, 12) for _ in range(rng.randint(3, 5))]}
+    if layout == 'quote':
+        return {'quote': words(rng, 18), 'author': words(rng, 2)}
+    if layout == 'imageAndParagraph':
+        return {'title': words(rng, 6), 'imageDescription': words(rng, 10), 'paragraph': words(rng, 45)}
+    if layout == 'twoColumn':
+        return {'title': words(rng, 6), 'column1Title': words(rng, 2), 'column1Content': words(rng, 30),
+                'column2Title': words(rng, 2), 'column2Content': words(rng, 30)}
+    return {'title': words(rng, 5), 'subtitle': words(rng, 10)}
+
+def decks_for_user(rng, mean_decks, alpha=1.3):
+    # Pareto with the requested mean: mean = xm * alpha / (alpha - 1)
+    xm = mean_decks * (alpha - 1) / alpha
+    return min(MAX_DECKS_PER_USER, max(1, int(xm * rng.paretovariate(alpha))))
+
+def seed(db, users, mean_decks=20, rng=None, first_user_id=1, log=print):
+    """Bulk-insert synthetic users, decks and slides; returns row counts"""
+    from sqlalchemy import text
+    from werkzeug.security import generate_password_hash
+
+    rng = rng or random.Random(0)
+    password_hash = generate_password_hash('seed')
+    now = datetime.utcnow()
+    start = time.perf_counter()
+
+    user_rows = [{
+        'id': first_user_id + i,
+        'username': f'seed_user_{first_user_id + i}',
+        'password_hash': password_hash,
+        'created_at': now - timedelta(days=rng.randint(30, 1000))
+    } for i in range(users)]
+    db.session.execute(
+        text("INSERT INTO users (id, username, password_hash, created_at) "
+             "VALUES (:id, :username, :password_hash, :created_at)"),
+        user_rows
+    )
+
+    next_presentation_id = (db.session.execute(text("SELECT MAX(id) FROM presentations")).scalar() or 0) + 1
+    presentations = []
+    slides = []
+    counts = {'users': users, 'presentations': 0, 'slides': 0}
+
+    def flush():
+        if presentations:
+            db.session.execute(
+                text("INSERT INTO presentations (id, user_id, topic, template_id, slide_count, created_at, updated_at) "
+                     "VALUES (:id, :user_id, :topic, :template_id, :slide_count, :created_at, :updated_at)"),
+                presentations
+            )
+        if slides:
+            db.session.execute(
+                text("INSERT INTO slides (presentation_id, slide_order, layout, content_json) "
+                     "VALUES (:presentation_id, :slide_order, :layout, :content_json)"),
+                slides
+            )
+        counts['presentations'] += len(presentations)
+        counts['slides'] += len(slides)
+        presentations.clear()
+        slides.clear()
+
+    for user in user_rows:
+        for _ in range(decks_for_user(rng, mean_decks)):
+            slide_count = rng.choices(SLIDE_COUNTS, SLIDE_WEIGHTS)[0]
+            created = now - timedelta(minutes=rng.randint(0, 365 * 24 * 60))
+            presentations.append({
+                'id': next_presentation_id,
+                'user_id': user['id'],
+                'topic': words(rng, 4),
+                'template_id': rng.choice(TEMPLATE_IDS),
+                'slide_count': slide_count,
+                'created_at': created,
+                'updated_at': created + timedelta(minutes=rng.randint(0, 600))
+            })
+            for order in range(slide_count):
+                layout = rng.choice(LAYOUTS)
+                slides.append({
+                    'presentation_id': next_presentation_id,
+                    'slide_order': order,
+                    'layout': layout,
+                    'content_json': json.dumps(slide_content(rng, layout))
+                })
+            next_presentation_id += 1
+            if len(slides) >= BATCH_SIZE:
+                flush()
+
+    flush()
+    db.session.commit()
+
+    log(f"seeded {counts['users']} users, {counts['presentations']} decks, "
+        f"{counts['slides']} slides in {time.perf_counter() - start:.1f}s")
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', required=True, help='SQLite file path or SQLAlchemy URL')
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--mean-decks', type=float, default=20, help='mean decks per user (Pareto-skewed)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    url = args.db if '://' in args.db else 'sqlite:///' + os.path.abspath(args.db)
+    os.environ['DATABASE_URL'] = url
+
+    from sqlalchemy import text
+    from app import app, init_db
+    from models import db
+    from search import rebuild_search_index
+
+    with app.app_context():
+        init_db()
+        first_user_id = (db.session.execute(text("SELECT MAX(id) FROM users")).scalar() or 0) + 1
+        seed(db, args.users, args.mean_decks, random.Random(args.seed), first_user_id)
+        rebuild_search_index()
+
+if __name__ == '__main__':
+    main()
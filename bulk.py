@@ -0,0 +1,213 @@
+# bulk.py
+"""
+Offline bulk deck generation: flask --app app bulk-generate topics.csv --user alice
+
+The CSV needs a `topic` column and may have `slides` and `template`
+columns; the --slides and --template options fill in missing values. A
+row whose slides value isn't a number is reported, logged as failed and
+skipped.
+Decks are generated like /api/generate (outline first, then the slides)
+at batch priority, and saved for the user; with --pptx-dir each is also
+exported to a .pptx file. Each Ollama call takes a global LLM slot, and
+batch calls leave LLM_RESERVED['batch'] slots to web traffic (see limits);
+this process's scheduler is capped to the batch share, so however many
+decks run at once the rest queue here rather than in the shared queue.
+
+Progress goes to a JSON lines checkpoint (default: the CSV path plus
+.progress.jsonl), one line per finished topic. A rerun skips topics already
+done there, so an interrupted run resumes where it stopped. A deck with a
+slide that failed or missed its deadline is logged as failed and retried on
+the next run.
+"""
+import csv
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from limits import llm_class_slots, Overloaded
+
+def read_topics(path, slides, template):
+    """
+    (topic, slide count, template) per CSV row with a topic, first occurrence
+    only, and (line, topic, reason) per row that can't be generated
+    """
+    rows, invalid, seen = [], [], set()
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        if not reader.fieldnames or 'topic' not in reader.fieldnames:
+            raise click.ClickException(f"{path} needs a 'topic' column")
+        for row in reader:
+            topic = (row.get('topic') or '').strip()
+            if not topic or topic in seen:
+                continue
+            seen.add(topic)
+            cell = (row.get('slides') or '').strip()
+            try:
+                count = int(cell) if cell else slides
+            except ValueError:
+                invalid.append((reader.line_num, topic, f"slides is not a number: {cell!r}"))
+                continue
+            rows.append((topic, min(max(1, count), 10), (row.get('template') or '').strip() or template))
+    return rows, invalid
+
+def read_checkpoint(path):
+    """Topics already done in earlier runs"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line cut short by the interruption
+                continue
+            if record.get('status') == 'done':
+                done.add(record['topic'])
+    return done
+
+def pptx_name(presentation_id, topic):
+    slug = re.sub(r'[^a-z0-9]+', '-', topic.lower()).strip('-')[:60] or 'deck'
+    return f'{presentation_id:06d}-{slug}.pptx'
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours}:{minutes:02d}:{seconds:02d}'
+
+def generate_with_retry(topic, slide_count, user_id):
+    """generate_deck at batch priority, waiting out a full LLM queue"""
+    from app import generate_deck
+    while True:
+        try:
+            slides, _ = generate_deck(topic, slide_count, 'batch', user_id)
+            return slides
+        except Overloaded as e:
+            time.sleep(e.retry_after)
+
+def store_deck(user_id, topic, template_id, slides):
+    """Save a generated deck the way /api/save does; returns its id"""
+    from models import db, Presentation, Slide
+    from search import index_presentation
+    from dashboard_cache import invalidate
+    import thumbnails
+
+    presentation = Presentation(user_id=user_id, topic=topic, template_id=template_id, slide_count=len(slides))
+    db.session.add(presentation)
+    db.session.flush()
+    for i, slide in enumerate(slides):
+        db.session.add(Slide(presentation_id=presentation.id, slide_order=i,
+                             layout=slide['layout'], content=slide['content']))
+    index_presentation(presentation.id, topic, slides)
+    thumbnails.refresh(presentation, slides[0] if slides else None)
+    invalidate(user_id)
+    db.session.commit()
+    return presentation.id
+
+def run_topic(app, user_id, topic, slide_count, template_id, pptx_dir):
+    """Generate, save and optionally export one deck: the checkpoint record"""
+    started = time.perf_counter()
+    with app.app_context():
+        slides = generate_with_retry(topic, slide_count, user_id)
+        failed = [i for i, slide in enumerate(slides) if slide.get('placeholder') or 'error' in slide['content']]
+        if failed:
+            return {'topic': topic, 'status': 'failed', 'failed_slides': failed,
+                    'seconds': round(time.perf_counter() - started, 2)}
+
+        record = {'topic': topic, 'status': 'done', 'slides': len(slides)}
+        record['presentation_id'] = store_deck(user_id, topic, template_id, slides)
+        if pptx_dir:
+            from export import create_presentation
+            path = os.path.join(pptx_dir, pptx_name(record['presentation_id'], topic))
+            create_presentation(path, slides, template_id)
+            record['pptx'] = path
+    record['seconds'] = round(time.perf_counter() - started, 2)
+    return record
+
+@click.command('bulk-generate')
+@click.argument('csv_path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--user', 'username', required=True, help='owner of the generated decks')
+@click.option('--concurrency', default=4, show_default=True, help='decks generated at once')
+@click.option('--slides', default=6, show_default=True, help='slides per deck when the CSV has no slides column')
+@click.option('--template', default='corporate', show_default=True, help='template when the CSV has none')
+@click.option('--pptx-dir', type=click.Path(file_okay=False), help='also export each deck to a .pptx here')
+@click.option('--checkpoint', type=click.Path(dir_okay=False), help='progress log (default: CSV_PATH.progress.jsonl)')
+@click.option('--deadline', default=600.0, show_default=True, help='seconds per deck before slides count as failed')
+@with_appcontext
+def bulk_generate_command(csv_path, username, concurrency, slides, template, pptx_dir, checkpoint, deadline):
+    """Generate a deck per topic in a CSV for a user, resumably"""
+    from models import User
+    from ollama_client import scheduler
+
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        raise click.ClickException(f"No user named {username!r}")
+    user_id = user.id
+    app = current_app._get_current_object()
+    app.config['DECK_DEADLINE_SECONDS'] = deadline
+    scheduler.max_concurrency = min(scheduler.max_concurrency, llm_class_slots('batch'))
+    if pptx_dir:
+        os.makedirs(pptx_dir, exist_ok=True)
+
+    checkpoint = checkpoint or csv_path + '.progress.jsonl'
+    topics, invalid = read_topics(csv_path, slides, template)
+    done = read_checkpoint(checkpoint)
+    pending = [row for row in topics if row[0] not in done]
+    invalid = [entry for entry in invalid if entry[1] not in done]
+    click.echo(f"{len(topics)} topics, {len(topics) - len(pending)} already done, {len(pending)} to generate"
+               + (f", {len(invalid)} invalid" if invalid else ''))
+
+    lock = threading.Lock()
+    log = open(checkpoint, 'a', encoding='utf-8')
+    for line, topic, reason in invalid:
+        click.echo(f"skipped line {line}: {topic[:50]}: {reason}")
+        log.write(json.dumps({'topic': topic, 'status': 'failed', 'error': reason, 'line': line}) + '\n')
+    log.flush()
+    if not pending:
+        log.close()
+        return
+
+    def task(topic, count, template_id):
+        try:
+            record = run_topic(app, user_id, topic, count, template_id, pptx_dir)
+        except Exception as e:
+            record = {'topic': topic, 'status': 'failed', 'error': str(e)}
+        # Logged by the worker, so decks finishing after an interruption are recorded too
+        with lock:
+            log.write(json.dumps(record) + '\n')
+            log.flush()
+        return record
+
+    finished = failed = 0
+    started = time.perf_counter()
+    pool = ThreadPoolExecutor(max_workers=max(1, concurrency))
+    try:
+        futures = [pool.submit(task, *row) for row in pending]
+        for future in as_completed(futures):
+            record = future.result()
+            finished += 1
+            failed += record['status'] != 'done'
+
+            elapsed = time.perf_counter() - started
+            rate = finished / elapsed
+            eta = (len(pending) - finished) / rate
+            click.echo(f"[{finished}/{len(pending)}] {record['status']:<6} {record['topic'][:50]:<50} "
+                       f"{rate * 60:.1f} decks/min, ETA {format_duration(eta)}")
+    except KeyboardInterrupt:
+        click.echo("Interrupted; finishing the decks already running, then run the same command again to resume")
+        pool.shutdown(cancel_futures=True)
+        raise click.Abort()
+    finally:
+        pool.shutdown()
+        log.close()
+
+    elapsed = time.perf_counter() - started
+    click.echo(f"Generated {finished - failed} decks, {failed} failed, in {format_duration(elapsed)} "
+               f"({(finished - failed) / elapsed * 60:.1f} decks/min)")
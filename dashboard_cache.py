@@ -0,0 +1,68 @@
+# dashboard_cache.py
+"""
+Rendered dashboard pages, cached per user.
+
+A user's dashboard only changes when they save or delete a deck, so each
+worker keeps the last page it rendered for a user, tagged with that user's
+version. The version is a column on the user's row in the main database,
+bumped in the same transaction as every write to their decks, so a page
+cached by any worker on any host goes stale as soon as the write commits.
+Pages are dropped least recently used first once the cache holds more than
+its byte budget.
+"""
+import threading
+from collections import OrderedDict
+
+import metrics
+from models import db, User
+
+# Bytes of rendered HTML kept per worker
+MAX_BYTES = 32 * 1024 * 1024
+
+# Pages larger than this are rendered every time rather than crowding out others
+MAX_PAGE_BYTES = 1024 * 1024
+
+def user_version(user_id):
+    """Current version of a user's decks; read it before querying them"""
+    return db.session.query(User.dashboard_version).filter(User.id == user_id).scalar() or 0
+
+def invalidate(user_id):
+    """Bump a user's version as part of a write to their decks; call it before that write commits"""
+    users = User.__table__
+    db.session.execute(users.update().where(users.c.id == user_id).values(
+        dashboard_version=users.c.dashboard_version + 1))
+
+class DashboardCache:
+    """Per-user rendered pages, valid while the user's version is unchanged"""
+
+    def __init__(self, max_bytes=MAX_BYTES, max_page_bytes=MAX_PAGE_BYTES):
+        self.max_bytes = max_bytes
+        self.max_page_bytes = max_page_bytes
+        self.size = 0
+        self._lock = threading.Lock()
+        # user id -> (version, html, bytes)
+        self._pages = OrderedDict()
+
+    def get(self, user_id, version):
+        """The page cached for this user at this version, or None"""
+        with self._lock:
+            entry = self._pages.get(user_id)
+            hit = entry is not None and entry[0] == version
+            if hit:
+                self._pages.move_to_end(user_id)
+        metrics.record_cache('dashboard', hit)
+        return entry[1] if hit else None
+
+    def put(self, user_id, version, html):
+        size = len(html.encode('utf-8'))
+        if size > self.max_page_bytes:
+            return
+        with self._lock:
+            old = self._pages.pop(user_id, None)
+            if old is not None:
+                self.size -= old[2]
+            self._pages[user_id] = (version, html, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, _, evicted) = self._pages.popitem(last=False)
+                self.size -= evicted
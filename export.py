@@ -0,0 +1,148 @@
+# export.py
+"""
+.pptx rendering for /api/export.
+
+Only the export path imports this module, so workers that never export
+don't pay for loading python-pptx and lxml.
+"""
+from pptx import Presentation
+from pptx.util import Inches, Pt
+from pptx.enum.text import PP_ALIGN, MSO_ANCHOR
+from pptx.dml.color import RGBColor
+
+import profiling
+from themes import THEMES, theme_rgb
+from layouts import LAYOUT_SCHEMAS, SLIDE_WIDTH, SLIDE_HEIGHT, normalize_content
+from textfit import fit_paragraphs, MIN_FONT_SIZE
+
+# Template definitions, as python-pptx colors
+TEMPLATES = {
+    template_id: {
+        'colors': {role: RGBColor(*rgb) for role, rgb in theme['colors'].items()},
+        'font': theme['font']
+    }
+    for template_id, theme in ((template_id, theme_rgb(template_id)) for template_id in THEMES)
+}
+
+def apply_template_to_slide(slide, template_id):
+    """Apply template styling to a slide"""
+    template = TEMPLATES.get(template_id, TEMPLATES['corporate'])
+    
+    # Set background color
+    slide.background.fill.solid()
+    slide.background.fill.fore_color.rgb = template['colors']['background']
+    
+    return template
+
+def apply_text_formatting(paragraph, font_size, color, font_name, bold=False, italic=False, alignment=PP_ALIGN.LEFT):
+    """Apply consistent text formatting to a paragraph"""
+    paragraph.font.size = Pt(font_size)
+    paragraph.font.color.rgb = color
+    paragraph.font.name = font_name
+    paragraph.font.bold = bold
+    paragraph.font.italic = italic
+    paragraph.alignment = alignment
+
+
+ALIGNMENTS = {'left': PP_ALIGN.LEFT, 'center': PP_ALIGN.CENTER, 'right': PP_ALIGN.RIGHT}
+
+# Level-0 bullet indent in the default template's body placeholder
+BULLET_INDENT = Inches(0.375)
+
+def format_element(paragraph, element, template, size):
+    """Apply an element's declared font settings to a paragraph"""
+    apply_text_formatting(
+        paragraph,
+        font_size=size,
+        color=template['colors'][element['color']],
+        font_name=template['font'],
+        bold=element.get('bold', False),
+        italic=element.get('italic', False),
+        alignment=ALIGNMENTS[element.get('align', 'left')]
+    )
+
+def element_text(element, value):
+    if 'format' in element:
+        value = element['format'].format(value)
+    return value
+
+def fit_element(text_frame, width, height, element, template, paragraphs):
+    """Line breaks and font size that fit the paragraphs inside the frame"""
+    width_pt = (width - text_frame.margin_left - text_frame.margin_right) / Pt(1)
+    height_pt = (height - text_frame.margin_top - text_frame.margin_bottom) / Pt(1)
+    return fit_paragraphs(
+        [element_text(element, text.strip()) for text in paragraphs],
+        template['font'], width_pt, height_pt,
+        max_size=element['size'],
+        min_size=element.get('min_size', MIN_FONT_SIZE),
+        bold=element.get('bold', False)
+    )
+
+def render_slide(presentation, layout, content, template_id):
+    """Create one slide from the layout's declared elements"""
+    schema = LAYOUT_SCHEMAS[layout]
+    content = normalize_content(content, layout)
+    
+    slide = presentation.slides.add_slide(presentation.slide_layouts[schema['slide_layout']])
+    template = apply_template_to_slide(slide, template_id)
+    
+    for element in schema['elements']:
+        if 'shape' in element:
+            # Image placeholder rectangle
+            shape = slide.shapes.add_shape(1, *(Inches(v) for v in element['box']))
+            shape.fill.solid()
+            shape.fill.fore_color.rgb = template['colors'][element['fill']]
+            shape.line.color.rgb = template['colors'][element['line']]
+            continue
+        
+        value = content[element['field']]
+        
+        if 'placeholder' in element:
+            placeholder = element['placeholder']
+            shape = slide.shapes.title if placeholder == 'title' else slide.placeholders[placeholder]
+        else:
+            shape = slide.shapes.add_textbox(*(Inches(v) for v in element['box']))
+        text_frame = shape.text_frame
+        text_frame.word_wrap = True
+        
+        if isinstance(value, list):
+            # One top-aligned paragraph per item, all at the same size
+            text_frame.clear()
+            text_frame.vertical_anchor = MSO_ANCHOR.TOP
+            size, wrapped = fit_element(text_frame, shape.width - BULLET_INDENT, shape.height,
+                                        element, template, value)
+            for i, lines in enumerate(wrapped):
+                p = text_frame.paragraphs[0] if i == 0 else text_frame.add_paragraph()
+                p.text = "\n".join(lines)
+                format_element(p, element, template, size)
+                p.level = 0
+        else:
+            size, (lines,) = fit_element(text_frame, shape.width, shape.height, element, template, [value])
+            p = text_frame.paragraphs[0]
+            p.text = "\n".join(lines)
+            format_element(p, element, template, size)
+    
+    return slide
+
+def create_presentation(filename, slides, template_id):
+    """Create a PowerPoint presentation with multiple slides"""
+    prs = Presentation()
+    
+    # Set the slide size to 16:9 aspect ratio
+    prs.slide_width = Inches(SLIDE_WIDTH)
+    prs.slide_height = Inches(SLIDE_HEIGHT)
+    
+    # Create slides based on their layout type
+    for slide_data in slides:
+        layout = slide_data.get('layout')
+        content = slide_data.get('content', {})
+        
+        if layout in LAYOUT_SCHEMAS:
+            with profiling.span('create_slide', layout=layout):
+                render_slide(prs, layout, content, template_id)
+    
+    # Save the presentation
+    with profiling.span('save_pptx'):
+        prs.save(filename)
+    
+    return filename
@@ -0,0 +1,329 @@
+# hedging.py
+"""
+Tail-latency protection for outbound Ollama calls.
+
+A call that hasn't answered by an adaptive deadline (a high percentile of
+recent latencies for the same model and layout) is duplicated to another
+backend, or to the same one when it is the only one, and the first good
+answer wins. A call that fails outright is retried once on another
+backend. Hedges are capped at a share of all calls so a slow model isn't
+flooded with duplicates, and take a slot of their own from the scheduler
+when one is given: a call is only hedged while a slot is free, and that
+slot is held until both copies have finished. Losing async requests are
+cancelled; a blocking request can't be interrupted, so a losing sync copy
+runs to the end on that slot rather than on capacity nobody counted. Each backend has a circuit breaker that
+stops sending to it after repeated failures or timeouts and lets one trial
+call through after a cool-down.
+"""
+import asyncio
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import requests
+
+import metrics
+
+# Hedge once a call is slower than this percentile of recent calls...
+HEDGE_PERCENTILE = 0.95
+# ...given at least this many samples, and never sooner than HEDGE_MIN_DELAY
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MIN_DELAY = 1.0
+LATENCY_SAMPLES = 200
+
+# At most this share of calls get a hedge
+HEDGE_BUDGET = 0.1
+
+# Consecutive failures that open a backend's breaker, and how long it stays open
+BREAKER_FAILURES = 5
+BREAKER_COOLDOWN_SECONDS = 30
+
+REQUEST_TIMEOUT_SECONDS = 300
+
+# Pooled keep-alive connections per worker for the async client
+ASYNC_MAX_CONNECTIONS = 64
+
+class BackendUnavailable(Exception):
+    """Raised when every backend's circuit breaker is open"""
+
+class CircuitBreaker:
+    """closed -> open after repeated failures -> half-open trial -> closed"""
+
+    def __init__(self, failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN_SECONDS):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.state = 'closed'
+        self._count = 0
+        self._opened = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a call may go to this backend now"""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self._opened >= self.cooldown:
+                # Let exactly one trial call through
+                self.state = 'half-open'
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.state = 'closed'
+            self._count = 0
+
+    def failure(self):
+        """Record a failure; returns True if this opened the breaker"""
+        with self._lock:
+            self._count += 1
+            if self.state == 'half-open' or (self.state == 'closed' and self._count >= self.failures):
+                self.state = 'open'
+                self._opened = time.monotonic()
+                return True
+            return False
+
+class HedgedClient:
+    """POSTs to a set of equivalent backends with hedging and circuit breaking"""
+
+    def __init__(self, urls, hedging=True, timeout=REQUEST_TIMEOUT_SECONDS, workers=32, scheduler=None):
+        self.urls = list(urls)
+        self.hedging = hedging
+        self.scheduler = scheduler
+        self.timeout = timeout
+        self.breakers = {url: CircuitBreaker() for url in self.urls}
+        self._latencies = {}
+        self._rotation = itertools.count()
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedges = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ollama-http')
+        self._aclient = None
+        self._aclient_loop = None
+
+    def hedge_delay(self, key):
+        """Seconds to wait before hedging calls of this kind, or None if unknown"""
+        with self._lock:
+            samples = sorted(self._latencies.get(key, ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        index = min(len(samples) - 1, int(HEDGE_PERCENTILE * len(samples)))
+        return max(HEDGE_MIN_DELAY, samples[index])
+
+    def _record_latency(self, key, seconds):
+        with self._lock:
+            samples = self._latencies.get(key)
+            if samples is None:
+                samples = self._latencies[key] = deque(maxlen=LATENCY_SAMPLES)
+            samples.append(seconds)
+
+    def _pick(self, exclude=None):
+        """Next backend, round robin, whose breaker lets a call through"""
+        offset = next(self._rotation)
+        for i in range(len(self.urls)):
+            url = self.urls[(offset + i) % len(self.urls)]
+            if url != exclude and self.breakers[url].allow():
+                return url
+        return None
+
+    def _hedge_allowed(self):
+        with self._lock:
+            if self.hedges + 1 > HEDGE_BUDGET * self.calls + 1:
+                return False
+            self.hedges += 1
+            return True
+
+    def _send(self, url, payload):
+        breaker = self.breakers[url]
+        try:
+            response = requests.post(url, json=payload, timeout=self.timeout)
+        except requests.RequestException:
+            if breaker.failure():
+                metrics.inc('ollama_breaker_open_total', backend=url)
+            raise
+        if response.status_code >= 500:
+            if breaker.failure():
+                metrics.inc('ollama_breaker_open_total', backend=url)
+        else:
+            breaker.success()
+        return response
+
+    def post(self, payload, key):
+        """
+        Send `payload` and return the first good response. `key` groups
+        calls with comparable latency (e.g. model and layout) for the
+        hedging deadline.
+        """
+        primary = self._primary()
+        started = {}
+        first = self._submit(primary, payload, started)
+
+        delay = self.hedge_delay(key) if self.hedging else None
+        if delay is not None:
+            done, _ = wait([first], timeout=delay)
+            backup = None if done else self._hedge_target(primary)
+            if backup is not None:
+                self._hold_slot(first, self._submit(backup, payload, started))
+
+        pending = set(started)
+        error = None
+        last_response = None
+        failed_over = False
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for finished in done:
+                url, submitted = started[finished]
+                try:
+                    response = finished.result()
+                except Exception as e:
+                    error = e
+                    response = None
+                if response is None or response.status_code >= 500:
+                    last_response = response or last_response
+                    # Nothing else in flight: give one other backend a chance
+                    backup = None if pending or failed_over else self._pick(exclude=url)
+                    if backup is not None:
+                        failed_over = True
+                        pending.add(self._submit(backup, payload, started))
+                    continue
+                return self._won(response, key, submitted, finished is first, len(started), failed_over)
+
+        if last_response is not None:
+            return last_response
+        raise error
+
+    async def apost(self, payload, key):
+        """post() for coroutines, over a pooled async HTTP client; losing requests are cancelled"""
+        primary = self._primary()
+        started = {}
+        first = self._asubmit(primary, payload, started)
+        try:
+            delay = self.hedge_delay(key) if self.hedging else None
+            if delay is not None:
+                done, _ = await asyncio.wait([first], timeout=delay)
+                backup = None if done else self._hedge_target(primary)
+                if backup is not None:
+                    self._hold_slot(first, self._asubmit(backup, payload, started))
+
+            pending = set(started)
+            error = None
+            last_response = None
+            failed_over = False
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for finished in done:
+                    url, submitted = started[finished]
+                    try:
+                        response = finished.result()
+                    except Exception as e:
+                        error = e
+                        response = None
+                    if response is None or response.status_code >= 500:
+                        last_response = response or last_response
+                        backup = None if pending or failed_over else self._pick(exclude=url)
+                        if backup is not None:
+                            failed_over = True
+                            pending.add(self._asubmit(backup, payload, started))
+                        continue
+                    return self._won(response, key, submitted, finished is first, len(started), failed_over)
+
+            if last_response is not None:
+                return last_response
+            raise error
+        finally:
+            for task in started:
+                task.cancel()
+
+    def _primary(self):
+        primary = self._pick()
+        if primary is None:
+            raise BackendUnavailable("No Ollama backend available (all circuit breakers open)")
+        with self._lock:
+            self.calls += 1
+        return primary
+
+    def _hedge_target(self, primary):
+        """
+        Where to send a hedge of a call to `primary`, or None if over budget
+        or the scheduler has no free slot for it (it is then held: see _hold_slot)
+        """
+        if self.scheduler is not None and not self.scheduler.try_acquire():
+            return None
+        if not self._hedge_allowed():
+            if self.scheduler is not None:
+                self.scheduler.release()
+            return None
+        # Prefer another backend; a lone backend may serve it from another slot
+        return self._pick(exclude=primary) or primary
+
+    def _hold_slot(self, *attempts):
+        """Give the hedge's scheduler slot back once every attempt (future or task) is done"""
+        if self.scheduler is None:
+            return
+        remaining = [len(attempts)]
+        lock = threading.Lock()
+
+        def finished(_):
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self.scheduler.release()
+
+        for attempt in attempts:
+            attempt.add_done_callback(finished)
+
+    def _won(self, response, key, submitted, primary_won, requests_sent, failed_over):
+        if response.status_code == 200:
+            self._record_latency(key, time.perf_counter() - submitted)
+        if not primary_won:
+            metrics.inc('ollama_hedged_requests_total', winner='failover' if failed_over else 'hedge')
+        elif requests_sent > 1:
+            metrics.inc('ollama_hedged_requests_total', winner='primary')
+        return response
+
+    def _submit(self, url, payload, started):
+        future = self._executor.submit(self._send, url, payload)
+        started[future] = (url, time.perf_counter())
+        return future
+
+    def _asubmit(self, url, payload, started):
+        task = asyncio.ensure_future(self._asend(url, payload))
+        started[task] = (url, time.perf_counter())
+        return task
+
+    def _async_client(self):
+        """Pooled async HTTP client, bound to the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._aclient is None or self._aclient_loop is not loop:
+            # Imported on first use: only the ASGI app's async client needs httpx
+            try:
+                import httpx
+            except ImportError:
+                raise RuntimeError("The async Ollama client needs httpx (pip install httpx)")
+            self._aclient = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=ASYNC_MAX_CONNECTIONS,
+                                    max_keepalive_connections=ASYNC_MAX_CONNECTIONS)
+            )
+            self._aclient_loop = loop
+        return self._aclient
+
+    async def _asend(self, url, payload):
+        client = self._async_client()
+        import httpx
+        breaker = self.breakers[url]
+        try:
+            response = await client.post(url, json=payload)
+        except httpx.HTTPError:
+            if breaker.failure():
+                metrics.inc('ollama_breaker_open_total', backend=url)
+            raise
+        if response.status_code >= 500:
+            if breaker.failure():
+                metrics.inc('ollama_breaker_open_total', backend=url)
+        else:
+            breaker.success()
+        return response
@@ -0,0 +1,291 @@
+# layouts.py
+"""
+Declarative registry of slide layouts.
+
+Each layout declares what it is good for, its LLM prompt, its content
+fields (type, length limit, default and plain-text fallback), which fields
+a plain-text reply is parsed into, and the elements drawn on export
+(geometry in inches, font size and the smallest size it may shrink to,
+template color, alignment). Placeholders are positioned by the default
+.pptx template; their `box` repeats that geometry for thumbnails.
+The registry is compiled once at import into a generated truncation
+function and a normalization plan per layout, so post-processing and
+rendering are single table-driven passes. Adding a layout means adding one
+entry here.
+"""
+
+# python-pptx slide layouts used by the default template
+TITLE_SLIDE = 0
+TITLE_AND_CONTENT = 1
+BLANK = 6
+
+# Slide size used on export (16:9)
+SLIDE_WIDTH = 10
+SLIDE_HEIGHT = 5.625
+
+def text(max_length, default, fallback=None):
+    """A text field; `fallback` ({topic} filled in) stands in for it when a plain-text reply lacks it"""
+    field = {'type': 'text', 'max_length': max_length, 'default': default}
+    if fallback is not None:
+        field['fallback'] = fallback
+    return field
+
+def text_list(max_items, max_length, default):
+    return {'type': 'list', 'max_items': max_items, 'max_length': max_length, 'default': default}
+
+LAYOUT_SCHEMAS = {
+    'titleAndBullets': {
+        'description': "a title with 3-5 bullet points; lists, steps, key facts",
+        'prompt': "Create a slide with a title and 3-5 bullet points about '{topic}'. Format as JSON with 'title' and 'bullets' (array).",
+        'fields': {
+            'title': text(80, 'Title', fallback='About {topic}'),
+            'bullets': text_list(5, 100, [])
+        },
+        'fallback_fields': ('title', 'bullets'),
+        'slide_layout': TITLE_AND_CONTENT,
+        'elements': [
+            {'field': 'title', 'placeholder': 'title', 'box': (0.5, 0.3, 9, 1.25), 'size': 40, 'min_size': 24, 'color': 'primary', 'bold': True},
+            {'field': 'bullets', 'placeholder': 1, 'box': (0.5, 1.75, 9, 4.95), 'size': 24, 'color': 'text', 'min_size': 14}
+        ]
+    },
+    'quote': {
+        'description': "a single quote with its author; a memorable statement",
+        'prompt': "Create an inspirational quote about '{topic}'. Format as JSON with 'quote' and 'author'.",
+        'fields': {
+            'quote': text(150, 'Quote goes here'),
+            'author': text(50, 'Author', fallback='Unknown')
+        },
+        # Plain-text replies look like: "The quote" - Author
+        'fallback_fields': ('quote', 'author'),
+        'fallback_separator': ' - ',
+        'slide_layout': BLANK,
+        'elements': [
+            {'field': 'quote', 'box': (1, 2, 8, 2), 'size': 32, 'min_size': 18, 'color': 'primary', 'italic': True,
+             'align': 'center', 'format': '"{}"'},
+            {'field': 'author', 'box': (5, 4.5, 4, 1), 'size': 24, 'color': 'secondary',
+             'align': 'right', 'format': '— {}'}
+        ]
+    },
+    'imageAndParagraph': {
+        'description': "a title, a paragraph and an illustrative image; explaining one idea",
+        'prompt': "Create a slide about '{topic}' with an image description and a paragraph. Format as JSON with 'title', 'imageDescription', and 'paragraph'.",
+        'fields': {
+            'title': text(80, 'Title', fallback='About {topic}'),
+            'imageDescription': text(100, 'Image description', fallback='An image about {topic}'),
+            'paragraph': text(300, 'Paragraph text')
+        },
+        'fallback_fields': ('title', 'paragraph'),
+        'slide_layout': BLANK,
+        'elements': [
+            {'field': 'title', 'box': (0.5, 0.5, 9, 1), 'size': 40, 'min_size': 24, 'color': 'primary', 'bold': True},
+            {'field': 'paragraph', 'box': (0.5, 1.5, 4.5, 3.5), 'size': 20, 'color': 'text'},
+            {'shape': 'rectangle', 'box': (5.5, 1.5, 4, 3.5), 'fill': 'secondary', 'line': 'primary'},
+            {'field': 'imageDescription', 'box': (5.5, 3, 4, 0.75), 'size': 16, 'color': 'background',
+             'align': 'center', 'min_size': 10}
+        ]
+    },
+    'twoColumn': {
+        'description': "a title and two titled columns; comparisons, pros and cons, before and after",
+        'prompt': "Create a slide about '{topic}' with two columns of information. Format as JSON with 'title', 'column1Title', 'column1Content', 'column2Title', 'column2Content'.",
+        'fields': {
+            'title': text(80, 'Title', fallback='About {topic}'),
+            'column1Title': text(50, 'Column 1', fallback='Overview'),
+            'column1Content': text(200, 'Column 1 content', fallback='First part of the content'),
+            'column2Title': text(50, 'Column 2', fallback='Details'),
+            'column2Content': text(200, 'Column 2 content', fallback='Second part of the content')
+        },
+        # Free text can't be split into columns reliably
+        'fallback_fields': (),
+        'slide_layout': BLANK,
+        'elements': [
+            {'field': 'title', 'box': (0.5, 0.5, 9, 1), 'size': 40, 'min_size': 24, 'color': 'primary', 'bold': True},
+            {'field': 'column1Title', 'box': (0.5, 1.5, 4.5, 0.75), 'size': 28, 'min_size': 18, 'color': 'secondary', 'bold': True},
+            {'field': 'column1Content', 'box': (0.5, 2.25, 4.5, 3), 'size': 20, 'color': 'text'},
+            {'field': 'column2Title', 'box': (5.5, 1.5, 4.5, 0.75), 'size': 28, 'min_size': 18, 'color': 'secondary', 'bold': True},
+            {'field': 'column2Content', 'box': (5.5, 2.25, 4.5, 3), 'size': 20, 'color': 'text'}
+        ]
+    },
+    'titleOnly': {
+        'description': "a large title and subtitle; openings, section breaks and closings",
+        'prompt': "Create a compelling title slide about '{topic}'. Format as JSON with 'title' and 'subtitle'.",
+        'fields': {
+            'title': text(80, 'Title', fallback='{topic} Presentation'),
+            'subtitle': text(120, 'Subtitle', fallback='An overview of key concepts')
+        },
+        'fallback_fields': (),
+        'slide_layout': TITLE_SLIDE,
+        'elements': [
+            {'field': 'title', 'placeholder': 'title', 'box': (0.75, 2.33, 8.5, 1.61), 'size': 54, 'min_size': 32, 'color': 'primary', 'bold': True, 'align': 'center'},
+            {'field': 'subtitle', 'placeholder': 1, 'box': (1.5, 4.25, 7, 1.92), 'size': 32, 'color': 'secondary', 'align': 'center'}
+        ]
+    }
+}
+
+LAYOUTS = list(LAYOUT_SCHEMAS)
+
+def _truncate_text(name, max_length):
+    cut = max_length - 3
+    def truncate(processed):
+        value = processed.get(name)
+        if type(value) is str and len(value) > max_length:
+            processed[name] = value[:cut] + '...'
+    return truncate
+
+def _truncate_list(name, max_length, max_items):
+    cut = max_length - 3
+    def truncate(processed):
+        value = processed.get(name)
+        if isinstance(value, list):
+            processed[name] = [item[:cut] + '...' if type(item) is str and len(item) > max_length else item
+                               for item in value[:max_items]]
+    return truncate
+
+def _compile_truncate(fields):
+    """One layout's truncation: a closure per field, bound to its limits when the module loads"""
+    steps = tuple(
+        _truncate_list(name, field['max_length'], field['max_items']) if field['type'] == 'list'
+        else _truncate_text(name, field['max_length'])
+        for name, field in fields.items()
+    )
+    def truncate(processed):
+        for step in steps:
+            step(processed)
+        return processed
+    return truncate
+
+def _compile(layout, schema):
+    """Compile a schema into its truncation function and normalization plan"""
+    normalize = tuple(
+        (name, field['type'] == 'list', field['default'])
+        for name, field in schema['fields'].items()
+    )
+    return _compile_truncate(schema['fields']), normalize
+
+_PLANS = {layout: _compile(layout, schema) for layout, schema in LAYOUT_SCHEMAS.items()}
+
+# Sibling titles passed to the model when regenerating a single slide
+MAX_AVOID_TITLES = 10
+
+def build_prompt(layout, topic, avoid_titles=None, context=None):
+    """
+    The LLM prompt for a layout, or None for unknown layouts. `avoid_titles`
+    lists the other slides' titles so the model doesn't repeat them;
+    `context` (such as the deck outline) is appended after the instruction.
+    """
+    schema = LAYOUT_SCHEMAS.get(layout)
+    if schema is None:
+        return None
+    prompt = schema['prompt'].format(topic=topic)
+    if avoid_titles:
+        titles = ", ".join(f"'{title[:80]}'" for title in avoid_titles[:MAX_AVOID_TITLES])
+        prompt += f" The deck already has slides titled {titles}; do not repeat them."
+    if context:
+        prompt += "\n\n" + context
+    return prompt
+
+def slide_title(content, layout):
+    """The slide's headline: the layout's first declared field, as text"""
+    schema = LAYOUT_SCHEMAS.get(layout)
+    if schema is None:
+        return ''
+    return as_text(content.get(next(iter(schema['fields'])), ''))
+
+def truncate_content(content, layout):
+    """Trim over-long fields to the layout's limits; other keys pass through"""
+    plan = _PLANS.get(layout)
+    if plan is None:
+        return dict(content)
+    return plan[0](dict(content))
+
+def as_text(value):
+    """Coerce a field value (string, {'text': ...}, list, number) to a string"""
+    if type(value) is str:
+        return value
+    if isinstance(value, dict) and 'text' in value:
+        return str(value['text'])
+    if isinstance(value, list):
+        return "\n".join(str(item) for item in value)
+    return str(value)
+
+def as_text_list(value):
+    """Coerce a list field to a list of strings"""
+    if isinstance(value, list):
+        return [item['text'] if isinstance(item, dict) and 'text' in item else str(item) for item in value]
+    if isinstance(value, str):
+        return [value]
+    return ["No bullet points available"]
+
+def normalize_content(content, layout):
+    """Every declared field present and coerced to its type, ready to render"""
+    plan = _PLANS.get(layout)
+    if plan is None:
+        return None
+
+    normalized = {}
+    for name, is_list, default in plan[1]:
+        value = content.get(name, default)
+        normalized[name] = as_text_list(value) if is_list else as_text(value)
+    return normalized
+
+def is_complete(content, layout):
+    """Whether parsed model output has every declared field with the right type"""
+    schema = LAYOUT_SCHEMAS.get(layout)
+    if schema is None or not isinstance(content, dict):
+        return False
+    for name, field in schema['fields'].items():
+        value = content.get(name)
+        if field['type'] == 'list':
+            if not isinstance(value, list) or not value:
+                return False
+        elif not isinstance(value, str) or not value.strip():
+            return False
+    return True
+
+def fallback_content(layout, text, topic):
+    """
+    Content from a model reply that isn't JSON. The reply is split into
+    parts (lines, or the layout's fallback_separator) with bullet markers and
+    quotes removed; of the layout's fallback_fields, the first takes the first
+    part, list fields take the next parts and text fields the rest joined.
+    Fields left empty get their declared fallback, else their default.
+    """
+    schema = LAYOUT_SCHEMAS.get(layout)
+    if schema is None:
+        return {"error": "Could not format content"}
+
+    parts = [part.strip().lstrip('-* ').strip().strip('"').strip()
+             for part in text.split(schema.get('fallback_separator', '\n'))]
+    parts = [part for part in parts if part]
+    parsed = schema.get('fallback_fields', tuple(schema['fields']))
+    content = {}
+    for name, field in schema['fields'].items():
+        value = None
+        if name in parsed:
+            if name == parsed[0]:
+                value = parts[0] if parts else None
+            elif field['type'] == 'list':
+                value = parts[1:1 + field['max_items']]
+            else:
+                value = " ".join(parts[1:])
+        if not value and 'fallback' in field:
+            value = field['fallback'].format(topic=topic)
+            value = value[:1].upper() + value[1:]
+        content[name] = value or field['default']
+    return content
+
+def placeholder_content(layout, title, point=''):
+    """
+    Stand-in for a slide that couldn't be generated in time: the title in
+    the first field, the key point as the first list field's only item and
+    every other field at its default.
+    """
+    schema = LAYOUT_SCHEMAS[layout]
+    content = {}
+    for i, (name, field) in enumerate(schema['fields'].items()):
+        if i == 0:
+            content[name] = title or field['default']
+        elif field['type'] == 'list' and point and not any(isinstance(v, list) for v in content.values()):
+            content[name] = [point]
+        else:
+            content[name] = field['default']
+    return content
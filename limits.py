@@ -0,0 +1,267 @@
+# limits.py
+import asyncio
+import math
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager, asynccontextmanager
+from functools import wraps
+from flask import current_app, has_app_context, request, session, jsonify
+
+# Token buckets per endpoint: (requests, per seconds) for each user and each client IP
+DEFAULT_RATE_LIMITS = {
+    'generate': {'user': (5, 60), 'ip': (20, 60)},
+    'generate_slide': {'user': (20, 60), 'ip': (60, 60)},
+    'export': {'user': (20, 60), 'ip': (60, 60)},
+    'import': {'user': (10, 60), 'ip': (30, 60)}
+}
+
+# Global cap on concurrent Ollama calls shared by every worker process and
+# the bulk CLI; defaults to the model server's parallelism
+DEFAULT_LLM_MAX_CONCURRENCY = int(os.environ.get('OLLAMA_NUM_PARALLEL', 1))
+DEFAULT_LLM_MAX_QUEUE = 8
+DEFAULT_LLM_QUEUE_TIMEOUT = 30
+
+# Slots each priority class leaves to the classes above it, so decks and
+# batch work can't take every slot from interactive edits
+DEFAULT_LLM_RESERVED = {'interactive': 0, 'deck': 1, 'batch': 2}
+PRIORITY_ORDER = ['interactive', 'deck', 'batch']
+
+# Slots (and queue entries) not refreshed for this long belong to a dead worker
+SLOT_LEASE_SECONDS = 600
+WAITER_LEASE_SECONDS = 10
+
+# Retry-After sent when the LLM queue turns callers away
+OVERLOADED_RETRY_AFTER = 5
+
+POLL_INTERVAL = 0.05
+
+# Idle connections per limiter database, shared by this process's threads
+_idle = {}
+_idle_lock = threading.Lock()
+
+class Overloaded(Exception):
+    """Raised when the LLM wait queue is full or the wait timed out"""
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def _storage_path():
+    return current_app.config.get('LIMITS_DB') or os.path.join(current_app.instance_path, 'limits.db')
+
+def _connect(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # Buckets and slot leases are cheap to lose in a crash; don't fsync every call's slot
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS buckets ("
+        "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS llm_calls ("
+        "token TEXT PRIMARY KEY, priority TEXT NOT NULL, state TEXT NOT NULL, heartbeat REAL NOT NULL)"
+    )
+    return conn
+
+@contextmanager
+def _transaction():
+    """
+    A write transaction on the limiter database shared by all workers, on a
+    pooled connection: each Ollama call takes and frees a slot, often from a
+    short-lived deck thread, so connections outlive the threads using them
+    """
+    path = _storage_path()
+    with _idle_lock:
+        idle = _idle.setdefault(path, [])
+        conn = idle.pop() if idle else None
+    if conn is None:
+        conn = _connect(path)
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        with _idle_lock:
+            idle.append(conn)
+
+def take_tokens(buckets, now=None):
+    """
+    Atomically take one token from every (key, capacity, period) bucket.
+    Returns 0 if allowed, otherwise the seconds until all buckets can serve.
+    """
+    now = time.time() if now is None else now
+
+    with _transaction() as conn:
+        levels = []
+        retry_after = 0
+        for key, capacity, period in buckets:
+            rate = capacity / period
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = capacity if row is None else min(capacity, row[0] + (now - row[1]) * rate)
+            if tokens < 1:
+                retry_after = max(retry_after, (1 - tokens) / rate)
+            levels.append((key, tokens))
+
+        if retry_after:
+            return retry_after
+
+        conn.executemany(
+            "INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+            [(key, tokens - 1, now) for key, tokens in levels]
+        )
+        return 0
+
+def rate_limited(name):
+    """Apply the per-user and per-IP token buckets configured for `name`"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            limits = current_app.config.get('RATE_LIMITS', DEFAULT_RATE_LIMITS).get(name)
+            if not limits:
+                return f(*args, **kwargs)
+
+            buckets = []
+            user_id = session.get('user_id')
+            if user_id is not None and 'user' in limits:
+                buckets.append((f'{name}:user:{user_id}', *limits['user']))
+            if 'ip' in limits:
+                buckets.append((f'{name}:ip:{request.remote_addr}', *limits['ip']))
+
+            retry_after = take_tokens(buckets)
+            if retry_after:
+                response = jsonify({'error': 'Rate limit exceeded, please slow down'})
+                response.status_code = 429
+                response.headers['Retry-After'] = str(math.ceil(retry_after))
+                return response
+
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+def _expire_stale(conn, now):
+    conn.execute(
+        "DELETE FROM llm_calls WHERE (state = 'running' AND heartbeat < ?) "
+        "OR (state = 'waiting' AND heartbeat < ?)",
+        (now - SLOT_LEASE_SECONDS, now - WAITER_LEASE_SECONDS)
+    )
+
+def _rank(priority):
+    return PRIORITY_ORDER.index(priority) if priority in PRIORITY_ORDER else len(PRIORITY_ORDER)
+
+def llm_class_slots(priority, config=None):
+    """Global LLM slots calls of `priority` may hold at once"""
+    config = current_app.config if config is None else config
+    max_concurrency = config.get('LLM_MAX_CONCURRENCY', DEFAULT_LLM_MAX_CONCURRENCY)
+    reserved = config.get('LLM_RESERVED', DEFAULT_LLM_RESERVED).get(priority, 0)
+    return max(1, max_concurrency - reserved)
+
+@contextmanager
+def llm_slot(priority='deck', timeout=None):
+    """
+    Hold one of the global LLM slots for one Ollama call. Waiting calls are
+    served by priority class, then first come first served, and a class
+    only runs while fewer than llm_class_slots(priority) calls are. Raises
+    Overloaded when the queue is full or no slot frees up within
+    LLM_QUEUE_TIMEOUT, and TimeoutError if `timeout` runs out first.
+    Outside an app context (scripts calling ollama_client directly) there
+    is no shared cap.
+    """
+    if not has_app_context():
+        yield
+        return
+    token, state, deadline, config = _join_llm_queue(priority)
+    limit = None if timeout is None else time.time() + timeout
+    try:
+        # Wait for a slot; the first eligible waiter is promoted first
+        while state == 'waiting':
+            _check_wait(deadline, limit)
+            time.sleep(POLL_INTERVAL)
+            state = _poll_llm_queue(token, config)
+
+        yield
+    finally:
+        _leave_llm_queue(token)
+
+@asynccontextmanager
+async def async_llm_slot(priority='deck', timeout=None):
+    """llm_slot for coroutines: the queue is polled without holding a thread while waiting"""
+    if not has_app_context():
+        yield
+        return
+    token, state, deadline, config = await asyncio.to_thread(_join_llm_queue, priority)
+    limit = None if timeout is None else time.time() + timeout
+    try:
+        while state == 'waiting':
+            _check_wait(deadline, limit)
+            await asyncio.sleep(POLL_INTERVAL)
+            state = await asyncio.to_thread(_poll_llm_queue, token, config)
+
+        yield
+    finally:
+        await asyncio.to_thread(_leave_llm_queue, token)
+
+def _check_wait(deadline, limit):
+    now = time.time()
+    if limit is not None and now > limit and limit <= deadline:
+        raise TimeoutError("Timed out waiting for a global LLM slot")
+    if now > deadline:
+        raise Overloaded('Timed out waiting for a free generation slot', OVERLOADED_RETRY_AFTER)
+
+def _join_llm_queue(priority):
+    """Join the queue (or take a free slot straight away): (token, state, deadline, config)"""
+    config = current_app.config
+    max_queue = config.get('LLM_MAX_QUEUE', DEFAULT_LLM_MAX_QUEUE)
+    timeout = config.get('LLM_QUEUE_TIMEOUT', DEFAULT_LLM_QUEUE_TIMEOUT)
+
+    token = uuid.uuid4().hex
+    deadline = time.time() + timeout
+
+    with _transaction() as conn:
+        now = time.time()
+        _expire_stale(conn, now)
+        running = conn.execute("SELECT COUNT(*) FROM llm_calls WHERE state = 'running'").fetchone()[0]
+        waiting = [row[0] for row in conn.execute("SELECT priority FROM llm_calls WHERE state = 'waiting'")]
+
+        # Waiters of this class or above go first; their limits are no lower than ours
+        ahead = any(_rank(other) <= _rank(priority) for other in waiting)
+        if running < llm_class_slots(priority, config) and not ahead:
+            state = 'running'
+        elif len(waiting) < max_queue:
+            state = 'waiting'
+        else:
+            raise Overloaded('Generation queue is full, please try again shortly', OVERLOADED_RETRY_AFTER)
+
+        conn.execute("INSERT INTO llm_calls (token, priority, state, heartbeat) VALUES (?, ?, ?, ?)",
+                     (token, priority, state, now))
+    return token, state, deadline, config
+
+def _poll_llm_queue(token, config):
+    """Promote this waiter if it is the first one whose class has a slot free; returns its state"""
+    with _transaction() as conn:
+        now = time.time()
+        _expire_stale(conn, now)
+        running = conn.execute("SELECT COUNT(*) FROM llm_calls WHERE state = 'running'").fetchone()[0]
+        waiters = conn.execute(
+            "SELECT token, priority FROM llm_calls WHERE state = 'waiting' ORDER BY rowid"
+        ).fetchall()
+        waiters.sort(key=lambda row: _rank(row[1]))
+        first = next((waiter for waiter, priority in waiters if running < llm_class_slots(priority, config)), None)
+        if first == token:
+            conn.execute(
+                "UPDATE llm_calls SET state = 'running', heartbeat = ? WHERE token = ?", (now, token)
+            )
+            return 'running'
+        conn.execute("UPDATE llm_calls SET heartbeat = ? WHERE token = ?", (now, token))
+        return 'waiting'
+
+def _leave_llm_queue(token):
+    with _transaction() as conn:
+        conn.execute("DELETE FROM llm_calls WHERE token = ?", (token,))
@@ -0,0 +1,237 @@
+# metrics.py
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from fast DB-backed routes up to slow LLM calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+RATE_BUCKETS = (1, 5, 10, 20, 40, 80, 160, 320)
+TOKEN_BUCKETS = (8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+SIMILARITY_BUCKETS = (0.5, 0.6, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95, 0.99, 1.0)
+
+# name -> (type, help, buckets)
+METRICS = {
+    'http_request_duration_seconds': ('histogram', 'Request latency by route', LATENCY_BUCKETS),
+    'db_queries_per_request': ('histogram', 'SQL statements executed per request', COUNT_BUCKETS),
+    'ollama_request_duration_seconds': ('histogram', 'Ollama call latency by layout, model and outcome', LATENCY_BUCKETS),
+    'ollama_queue_wait_seconds': ('histogram', 'Time spent waiting for a scheduler slot', LATENCY_BUCKETS),
+    'ollama_tokens_per_second': ('histogram', 'Generation speed reported by Ollama', RATE_BUCKETS),
+    'ollama_eval_tokens_total': ('counter', 'Tokens generated by Ollama', None),
+    'ollama_eval_duration_seconds_total': ('counter', 'Time Ollama spent generating tokens', None),
+    'ollama_prompt_eval_tokens_total': ('counter', 'Prompt tokens evaluated by Ollama', None),
+    'ollama_prompt_eval_duration_seconds_total': ('counter', 'Time Ollama spent evaluating prompts', None),
+    'ollama_prompt_eval_tokens': ('histogram', 'Prompt tokens prefilled per call by deck session mode', TOKEN_BUCKETS),
+    'ollama_prompt_eval_seconds': ('histogram', 'Prefill time per call by deck session mode', LATENCY_BUCKETS),
+    'export_render_duration_seconds': ('histogram', 'Time to render a .pptx export', LATENCY_BUCKETS),
+    'deck_stage_duration_seconds': ('histogram', 'Deck generation time by pipeline stage', LATENCY_BUCKETS),
+    'deck_placeholder_slides_total': ('counter', 'Deck slides replaced by placeholders at the deck deadline', None),
+    'ollama_hedged_requests_total': ('counter', 'Hedged or failed-over Ollama calls by which request answered', None),
+    'ollama_breaker_open_total': ('counter', 'Times a backend circuit breaker opened', None),
+    'topic_cache_similarity': ('histogram', 'Similarity of the closest cached topic per lookup', SIMILARITY_BUCKETS),
+    'cache_requests_total': ('counter', 'Cache lookups by cache and result', None)
+}
+
+# How often a worker writes its snapshot for other workers to merge
+FLUSH_INTERVAL = 1.0
+
+_lock = threading.Lock()
+_values = {}
+_directory = None
+_last_flush = 0.0
+# Snapshot files this process has written, removed when it exits
+_written = set()
+
+def configure(directory):
+    """Share metrics between worker processes through snapshot files in `directory`"""
+    global _directory
+    # create_app may run more than once in a process; clean up once
+    if _directory is None:
+        atexit.register(_remove_snapshots)
+    _directory = directory
+
+def _remove_snapshots():
+    # An exited worker's counts would otherwise be merged into /metrics forever
+    for path in _written:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())))
+
+def inc(name, amount=1, **labels):
+    """Increment a counter"""
+    key = _key(name, labels)
+    with _lock:
+        _values[key] = _values.get(key, 0) + amount
+
+def observe(name, value, **labels):
+    """Record a histogram observation"""
+    buckets = METRICS[name][2]
+    key = _key(name, labels)
+    with _lock:
+        state = _values.get(key)
+        if state is None:
+            # One count per bucket, then +Inf, sum and count
+            state = _values[key] = [0] * (len(buckets) + 3)
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                state[i] += 1
+                break
+        else:
+            state[len(buckets)] += 1
+        state[-2] += value
+        state[-1] += 1
+
+@contextmanager
+def timer(name, **labels):
+    """Observe the duration of the block"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+def record_cache(cache, hit):
+    """Count a cache lookup so hit rates can be derived"""
+    inc('cache_requests_total', cache=cache, result='hit' if hit else 'miss')
+
+def _snapshot():
+    with _lock:
+        return [[name, list(labels), value] for (name, labels), value in _values.items()]
+
+def flush():
+    """Write this process's snapshot so /metrics in any worker can merge it"""
+    global _last_flush
+    if _directory is None:
+        return
+    path = os.path.join(_directory, f'{os.getpid()}.json')
+    if path not in _written:
+        os.makedirs(_directory, exist_ok=True)
+        _written.add(path)
+    # Per thread: concurrent requests of one worker may flush at once
+    temp_path = f'{path}.{threading.get_ident()}.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(_snapshot(), f)
+    os.replace(temp_path, path)
+    _last_flush = time.monotonic()
+
+def maybe_flush():
+    if _directory is not None and time.monotonic() - _last_flush >= FLUSH_INTERVAL:
+        flush()
+
+def collect():
+    """Merge the snapshots of every worker (or just this process)"""
+    if _directory is None:
+        snapshots = [_snapshot()]
+    else:
+        flush()
+        snapshots = []
+        for path in glob.glob(os.path.join(_directory, '*.json')):
+            if not _alive(path):
+                # Killed before it could remove its own snapshot
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+
+    merged = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot:
+            if name not in METRICS:
+                continue
+            key = (name, tuple(tuple(pair) for pair in labels))
+            if isinstance(value, list):
+                current = merged.setdefault(key, [0] * len(value))
+                merged[key] = [a + b for a, b in zip(current, value)]
+            else:
+                merged[key] = merged.get(key, 0) + value
+    return merged
+
+def _alive(path):
+    """Whether the worker that wrote a snapshot file is still running"""
+    try:
+        os.kill(int(os.path.basename(path).split('.')[0]), 0)
+    except ValueError:
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+def render():
+    """Prometheus text exposition format"""
+    merged = collect()
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        series = sorted((labels, value) for (metric, labels), value in merged.items() if metric == name)
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in series:
+            if kind == 'counter':
+                lines.append(f'{name}{_format_labels(labels)} {value}')
+                continue
+            cumulative = 0
+            for bound, count in zip(list(buckets) + ['+Inf'], value):
+                cumulative += count
+                lines.append(f'{name}_bucket{_format_labels(labels, ("le", bound))} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {value[-2]}')
+            lines.append(f'{name}_count{_format_labels(labels)} {value[-1]}')
+    return '\n'.join(lines) + '\n'
+
+def allowed(app, remote_addr):
+    """/metrics is served to METRICS_ALLOWED_IPS only (default: loopback)"""
+    return remote_addr in app.config['METRICS_ALLOWED_IPS']
+
+def init_app(app, db):
+    """Time every request and count its SQL statements"""
+    from flask import g, request, has_app_context
+    from sqlalchemy import event
+
+    configure(app.config.get('METRICS_DIR') or os.path.join(app.instance_path, 'metrics'))
+    app.config.setdefault('METRICS_ALLOWED_IPS', [
+        addr for addr in os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',') if addr
+    ])
+
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_start = time.perf_counter()
+        g.db_queries = 0
+
+    @app.after_request
+    def record_request_metrics(response):
+        start = g.get('metrics_start')
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            observe('http_request_duration_seconds', time.perf_counter() - start,
+                    route=route, method=request.method, status=str(response.status_code))
+            observe('db_queries_per_request', g.get('db_queries', 0), route=route)
+        maybe_flush()
+        return response
+
+    def count_query(*args, **kwargs):
+        if has_app_context() and 'db_queries' in g:
+            g.db_queries += 1
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', count_query)
@@ -2,10 +2,27 @@
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
-import json
+from sqlalchemy import inspect, text
+import slide_codec
 
 db = SQLAlchemy()
 
+def upgrade_schema():
+    """Add columns declared below but missing from tables an older version created (part of init-db)"""
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=db.engine.dialect)}"
+            if column.server_default is not None:
+                ddl += f" DEFAULT {column.server_default.arg}"
+            if not column.nullable:
+                ddl += " NOT NULL"
+            db.session.execute(text(ddl))
+    db.session.commit()
+
 class User(db.Model):
     __tablename__ = 'users'
     
@@ -13,6 +30,8 @@ class User(db.Model):
     username = db.Column(db.String(80), unique=True, nullable=False)
     password_hash = db.Column(db.String(256), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Bumped with every write to the user's decks; cached dashboards carry the version they show
+    dashboard_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     presentations = db.relationship('Presentation', backref='user', lazy=True, cascade="all, delete-orphan")
     
@@ -40,19 +59,26 @@ class Presentation(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Content hash of the first slide's thumbnail, and of the slide alone (see thumbnails)
+    thumbnail_hash = db.Column(db.String(64))
+    first_slide_hash = db.Column(db.String(64))
+    
     slides = db.relationship('Slide', backref='presentation', lazy=True, cascade="all, delete-orphan", order_by="Slide.slide_order")
     
-    def to_dict(self):
-        return {
+    def to_dict(self, slides=True):
+        data = {
             'id': self.id,
             'user_id': self.user_id,
             'topic': self.topic,
             'template_id': self.template_id,
             'slide_count': self.slide_count,
+            'thumbnail_hash': self.thumbnail_hash,
             'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat(),
-            'slides': [slide.to_dict() for slide in self.slides]
+            'updated_at': self.updated_at.isoformat()
         }
+        if slides:
+            data['slides'] = [slide.to_dict() for slide in self.slides]
+        return data
 
 class Slide(db.Model):
     __tablename__ = 'slides'
@@ -62,14 +88,17 @@ class Slide(db.Model):
     slide_order = db.Column(db.Integer, nullable=False)
     layout = db.Column(db.String(50), nullable=False)
     content_json = db.Column(db.Text, nullable=False)
+    # 0: JSON in content_json; 1: compressed, 2: packed and compressed, into content_blob (see slide_codec)
+    content_format = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    content_blob = db.Column(db.LargeBinary)
     
     @property
     def content(self):
-        return json.loads(self.content_json)
+        return slide_codec.decode(self.content_format, self.content_json, self.content_blob)
     
     @content.setter
     def content(self, content_dict):
-        self.content_json = json.dumps(content_dict)
+        self.content_format, self.content_json, self.content_blob = slide_codec.encode(content_dict)
     
     def to_dict(self):
         return {
@@ -78,4 +107,13 @@ class Slide(db.Model):
             'slide_order': self.slide_order,
             'layout': self.layout,
             'content': self.content
-        }
\ No newline at end of file
+        }
+
+class SlideDictionary(db.Model):
+    """A shared compression dictionary for slide content; never modified once stored"""
+    __tablename__ = 'slide_dictionaries'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    data = db.Column(db.LargeBinary, nullable=False)
+    sample_size = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -1,103 +1,383 @@
 
 # ollama_client.py
-import requests
 import json
+import os
+import time
+import metrics
+import profiling
+import tracing
+from scheduler import OllamaScheduler
+from limits import llm_slot, async_llm_slot, Overloaded
+from hedging import HedgedClient
+from topic_cache import TopicCache, LocalVectorizer, OllamaEmbedder, DEFAULT_THRESHOLD
+from layouts import build_prompt, fallback_content, is_complete
+from outline import build_outline_prompt, parse_outline, outline_summary, outline_context, slide_brief
 
-OLLAMA_API_URL = "http://localhost:11434/api/generate"
+OLLAMA_API_URL = os.environ.get('OLLAMA_API_URL', "http://localhost:11434/api/generate")
 
-def generate_content(layout, topic):
+# Equivalent Ollama servers to spread calls over and hedge slow calls to
+OLLAMA_API_URLS = [url.strip() for url in os.environ.get('OLLAMA_API_URLS', '').split(',') if url.strip()] \
+    or [OLLAMA_API_URL]
+
+# The scheduler is per worker process: split the model server's parallelism
+# (Ollama's OLLAMA_NUM_PARALLEL) between the WEB_CONCURRENCY workers, or set
+# OLLAMA_WORKER_PARALLEL directly
+scheduler = OllamaScheduler(max_concurrency=int(os.environ.get('OLLAMA_WORKER_PARALLEL') or max(
+    1, int(os.environ.get('OLLAMA_NUM_PARALLEL', 1)) // int(os.environ.get('WEB_CONCURRENCY', 1)))))
+
+# Hedging duplicates calls slower than the recent p95, while the scheduler
+# has a slot free for the duplicate; OLLAMA_HEDGING=0 turns it off
+client = HedgedClient(OLLAMA_API_URLS, hedging=os.environ.get('OLLAMA_HEDGING', '1') != '0', scheduler=scheduler)
+
+DEFAULT_MODEL = os.environ.get('OLLAMA_MODEL', "llama3.1:8b")
+
+def make_topic_cache():
     """
-    Generate slide content using Ollama based on layout and topic
+    Semantic cache of outlines and slides by topic. TOPIC_CACHE is 'local'
+    (word and trigram vectors), 'ollama' (OLLAMA_EMBED_MODEL embeddings) or
+    'off'; TOPIC_CACHE_THRESHOLD is the cosine similarity a cached topic
+    needs to be reused.
     """
-    prompts = {
-        "titleAndBullets": f"Create a slide with a title and 3-5 bullet points about '{topic}'. Format as JSON with 'title' and 'bullets' (array).",
-        "quote": f"Create an inspirational quote about '{topic}'. Format as JSON with 'quote' and 'author'.",
-        "imageAndParagraph": f"Create a slide about '{topic}' with an image description and a paragraph. Format as JSON with 'title', 'imageDescription', and 'paragraph'.",
-        "twoColumn": f"Create a slide about '{topic}' with two columns of information. Format as JSON with 'title', 'column1Title', 'column1Content', 'column2Title', 'column2Content'.",
-        "titleOnly": f"Create a compelling title slide about '{topic}'. Format as JSON with 'title' and 'subtitle'."
-    }
+    mode = os.environ.get('TOPIC_CACHE', 'local')
+    if mode == 'off':
+        return None
+    if mode == 'ollama':
+        url = os.environ.get('OLLAMA_EMBED_URL', OLLAMA_API_URLS[0].replace('/api/generate', '/api/embed'))
+        embedder = OllamaEmbedder(url, os.environ.get('OLLAMA_EMBED_MODEL', 'nomic-embed-text'))
+    else:
+        embedder = LocalVectorizer()
+    return TopicCache(embedder, float(os.environ.get('TOPIC_CACHE_THRESHOLD', DEFAULT_THRESHOLD)))
+
+topic_cache = make_topic_cache()
+
+def cache_kind(layout, models, session=None, index=None):
+    """Topic cache key for a slide: primary model, layout and the slide's place in its deck"""
+    kind = f"{models[0]}|{layout}"
+    if session is not None:
+        title = session.outline[index]['title'] if session.outline else ''
+        kind += f"|{title.lower() or f'#{index}'}"
+    return kind
+
+def load_model_routes():
+    """
+    Models to try, in order, per user tier and layout ('*' matches any
+    layout; 'outline' is the deck planning call). OLLAMA_MODEL_ROUTES holds
+    JSON, inline or as a file path, for example
+    {"default": {"*": ["llama3.1:8b"], "titleOnly": ["llama3.2:3b", "llama3.1:8b"]},
+     "premium": {"*": ["llama3.1:70b", "llama3.1:8b"]}}
+    """
+    routes = {'default': {'*': [DEFAULT_MODEL]}}
+    configured = os.environ.get('OLLAMA_MODEL_ROUTES', '').strip()
+    if configured:
+        if not configured.startswith('{'):
+            with open(configured) as f:
+                configured = f.read()
+        routes.update(json.loads(configured))
+    return routes
+
+MODEL_ROUTES = load_model_routes()
+
+def route_models(layout, tier=None):
+    """The fallback chain of models for a layout and user tier"""
+    for routes in (MODEL_ROUTES.get(tier), MODEL_ROUTES.get('default')):
+        if routes:
+            models = routes.get(layout) or routes.get('*')
+            if models:
+                return models
+    return [DEFAULT_MODEL]
+
+# How the calls of one deck share the topic and outline:
+#   'prefix'  - the same system preamble (topic + outline) on every slide, so
+#               Ollama's prompt cache reuses its KV state and only the
+#               slide's own instruction is prefilled
+#   'context' - slides continue from the `context` tokens the outline call returned
+#   'off'     - every prompt carries its own copy of the outline
+DECK_SESSION_MODE = os.environ.get('OLLAMA_DECK_SESSION', 'prefix')
+
+DECK_PREAMBLE = "You are writing the slides of one presentation about '{topic}'. Reply with JSON only."
+
+class DeckSession:
+    """Prompt state shared by the outline call and every slide of one deck"""
+    
+    def __init__(self, topic, mode=None, tier=None):
+        self.mode = mode or DECK_SESSION_MODE
+        self.tier = tier
+        self.preamble = DECK_PREAMBLE.format(topic=topic)
+        self.outline = None
+        self.context = None
+        self.context_model = None
     
-    prompt = prompts.get(layout)
+    def outline_fields(self):
+        """Extra request fields for the outline call"""
+        return {} if self.mode == 'off' else {'system': self.preamble}
     
+    def slide_request(self, index, model):
+        """(prompt context, extra request fields) for expanding slide `index` on `model`"""
+        brief = slide_brief(self.outline, index) if self.outline else None
+        # Context tokens only mean something to the model that produced them
+        if self.mode == 'context' and self.context and brief and model == self.context_model:
+            return brief, {'context': self.context}
+        if self.mode == 'off':
+            return outline_context(self.outline, index) if brief else None, {}
+        system = self.preamble
+        if self.outline and brief:
+            system += "\n\n" + outline_summary(self.outline)
+        return brief, {'system': system}
+
+def post_prompt(prompt, layout, priority='deck', user=None, fields=None, model=DEFAULT_MODEL, deadline=None):
+    """
+    Send one prompt to Ollama once the worker's scheduler and then the
+    global limits.llm_slot queue grant it a slot. `fields` are extra
+    request fields such as 'system' or 'context'; `deadline` is a
+    time.monotonic() value after which the call gives up waiting for a
+    slot. Returns the response and the time the call left the queue.
+    """
+    timeout = None if deadline is None else deadline - time.monotonic()
+    queued = time.perf_counter()
+    with scheduler.slot(priority, user, timeout), \
+            llm_slot(priority, None if deadline is None else deadline - time.monotonic()):
+        start = time.perf_counter()
+        metrics.observe('ollama_queue_wait_seconds', start - queued, priority=priority)
+        tracing.record('ollama.queue_wait', queued, start, priority=priority)
+        with profiling.span('ollama.request', layout=layout, model=model, queue_wait_ms=(start - queued) * 1000):
+            response = client.post(
+                {
+                    "model": model,
+                    "prompt": prompt,
+                    "stream": False,
+                    **(fields or {})
+                },
+                key=(model, layout)
+            )
+    return response, start
+
+async def apost_prompt(prompt, layout, priority='deck', user=None, fields=None, model=DEFAULT_MODEL, deadline=None):
+    """post_prompt for coroutines: waits for the slot and the reply without holding a thread"""
+    timeout = None if deadline is None else deadline - time.monotonic()
+    queued = time.perf_counter()
+    async with scheduler.aslot(priority, user, timeout), \
+            async_llm_slot(priority, None if deadline is None else deadline - time.monotonic()):
+        start = time.perf_counter()
+        metrics.observe('ollama_queue_wait_seconds', start - queued, priority=priority)
+        tracing.record('ollama.queue_wait', queued, start, priority=priority)
+        with profiling.span('ollama.request', layout=layout, model=model, queue_wait_ms=(start - queued) * 1000):
+            response = await client.apost(
+                {
+                    "model": model,
+                    "prompt": prompt,
+                    "stream": False,
+                    **(fields or {})
+                },
+                key=(model, layout)
+            )
+    return response, start
+
+# generate_content and generate_outline are written as generators that
+# yield the post_prompt arguments of each call and are sent its result (or
+# thrown its exception), so the blocking and the async versions share them.
+# Overloaded isn't thrown in: a call turned away by the global queue fails
+# the whole request with a 503 rather than degrading one slide.
+
+def _run(steps):
+    """Drive a generation with blocking post_prompt calls"""
+    try:
+        call = next(steps)
+        while True:
+            try:
+                reply = post_prompt(*call)
+            except Overloaded:
+                raise
+            except Exception as e:
+                call = steps.throw(e)
+            else:
+                call = steps.send(reply)
+    except StopIteration as finished:
+        return finished.value
+
+async def _arun(steps):
+    """Drive a generation with awaited apost_prompt calls"""
     try:
-        # Send request to Ollama
-        response = requests.post(
-            OLLAMA_API_URL,
-            json={
-                "model": "llama3.1:8b",  # or whatever model you have installed
-                "prompt": prompt,
-                "stream": False
-            }
-        )
+        call = next(steps)
+        while True:
+            try:
+                reply = await apost_prompt(*call)
+            except Overloaded:
+                raise
+            except Exception as e:
+                call = steps.throw(e)
+            else:
+                call = steps.send(reply)
+    except StopIteration as finished:
+        return finished.value
+
+def parse_json_object(text):
+    """The first-to-last-brace JSON object in a model reply, or None"""
+    json_start = text.find('{')
+    json_end = text.rfind('}') + 1
+    if json_start < 0 or json_end <= json_start:
+        return None
+    try:
+        return json.loads(text[json_start:json_end])
+    except json.JSONDecodeError:
+        return None
+
+def generate_content(layout, topic, priority='deck', user=None, avoid_titles=None, context=None,
+                     session=None, index=None, tier=None, deadline=None):
+    """
+    Generate slide content using Ollama based on layout and topic.
+    `priority` is the scheduler class ('interactive', 'deck' or 'batch') and
+    `user` identifies the caller for fair sharing within that class.
+    `avoid_titles` are sibling slide titles the new slide shouldn't repeat
+    and `context` is extra prompt context. Slides of a deck pass their
+    DeckSession and position instead, which supplies the outline.
+    `deadline` (time.monotonic()) bounds the wait for a scheduler slot.
+    
+    The layout's models (see route_models) are tried in order: a model that
+    errors or doesn't reply with JSON hands over to the next one, and the
+    last model's plain-text reply goes through layouts.fallback_content.
+    
+    Complete JSON replies are kept in the topic cache and served to similar
+    topics; calls with avoid_titles or extra context bypass it.
+    """
+    with profiling.span('generate_content', layout=layout, priority=priority):
+        return _run(_content_steps(layout, topic, priority, user, avoid_titles, context, session, index, tier,
+                                   deadline))
+
+async def agenerate_content(layout, topic, priority='deck', user=None, avoid_titles=None, context=None,
+                            session=None, index=None, tier=None, deadline=None):
+    """generate_content for coroutines"""
+    with profiling.span('generate_content', layout=layout, priority=priority):
+        return await _arun(_content_steps(layout, topic, priority, user, avoid_titles, context, session, index, tier,
+                                          deadline))
+
+def _content_steps(layout, topic, priority, user, avoid_titles, context, session, index, tier, deadline):
+    if session is not None:
+        tier = session.tier
+    models = route_models(layout, tier)
+    error = None
+    
+    kind = None
+    if topic_cache is not None and avoid_titles is None and (context is None or session is not None):
+        kind = cache_kind(layout, models, session, index)
+        cached = topic_cache.get(topic, kind)
+        if cached is not None:
+            return cached
+    
+    for position, model in enumerate(models):
+        last = position == len(models) - 1
+        fields = None
+        if session is not None:
+            context, fields = session.slide_request(index, model)
+        prompt = build_prompt(layout, topic, avoid_titles, context)
         
-        if response.status_code == 200:
-            # Extract the JSON content from the response
+        outcome = 'error'
+        start = time.perf_counter()
+        try:
+            response, start = yield (prompt, layout, priority, user, fields, model, deadline)
+            if response.status_code != 200:
+                error = {"error": f"Ollama API error: {response.status_code}"}
+                continue
+            
             result = response.json()
+            record_eval_stats(layout, result, session.mode if session else 'none', model)
             generated_text = result.get("response", "")
             
-            # Try to parse the JSON output from the LLM
-            try:
-                # Find the JSON part in the response
-                json_start = generated_text.find('{')
-                json_end = generated_text.rfind('}') + 1
-                if json_start >= 0 and json_end > json_start:
-                    json_str = generated_text[json_start:json_end]
-                    return json.loads(json_str)
-                else:
-                    # Fallback: structure the content manually
-                    return format_content_fallback(layout, generated_text, topic)
-            except json.JSONDecodeError:
-                return format_content_fallback(layout, generated_text, topic)
-        else:
-            return {"error": f"Ollama API error: {response.status_code}"}
-    except Exception as e:
-        return {"error": f"Error connecting to Ollama: {str(e)}"}
-
-def format_content_fallback(layout, text, topic):
-    """Fallback formatting if JSON parsing fails"""
-    if layout == "titleAndBullets":
-        lines = [line.strip() for line in text.split('\n') if line.strip()]
-        title = lines[0] if lines else f"About {topic}"
-        bullets = []
-        for line in lines[1:5]:
-            # Remove bullet markers if present
-            if line.startswith('- '):
-                bullets.append(line[2:])
-            elif line.startswith('* '):
-                bullets.append(line[2:])
-            else:
-                bullets.append(line)
-        return {"title": title, "bullets": bullets}
+            with profiling.span('extract_json', layout=layout, model=model):
+                content = parse_json_object(generated_text)
+            if content is not None:
+                outcome = 'json'
+                if kind is not None and is_complete(content, layout):
+                    topic_cache.put(topic, kind, content)
+                return content
+            if not last:
+                # Let a stronger model try before structuring text by hand
+                outcome = 'rerouted'
+                continue
+            outcome = 'fallback'
+            with profiling.span('format_fallback', layout=layout, model=model):
+                return fallback_content(layout, generated_text, topic)
+        except Exception as e:
+            error = {"error": f"Error connecting to Ollama: {str(e)}"}
+        finally:
+            metrics.observe('ollama_request_duration_seconds', time.perf_counter() - start,
+                            layout=layout, outcome=outcome, model=model)
     
-    elif layout == "quote":
-        parts = text.split(' - ')
-        quote = parts[0].strip('"')
-        author = parts[1] if len(parts) > 1 else "Unknown"
-        return {"quote": quote, "author": author}
+    return error or {"error": "Could not format content"}
+
+def generate_outline(topic, slide_count, priority='deck', user=None, session=None, deadline=None):
+    """
+    Plan a deck with one short call: a list of {'layout', 'title', 'point'}
+    per slide, or None if Ollama failed or the reply wasn't a usable outline.
+    The outline (and in 'context' mode Ollama's context) is kept on `session`.
+    Outlines are topic-cached like slides, so a repeated deck reuses its
+    slide titles and with them the cached slides.
+    """
+    return _run(_outline_steps(topic, slide_count, priority, user, session, deadline))
+
+async def agenerate_outline(topic, slide_count, priority='deck', user=None, session=None, deadline=None):
+    """generate_outline for coroutines"""
+    return await _arun(_outline_steps(topic, slide_count, priority, user, session, deadline))
+
+def _outline_steps(topic, slide_count, priority, user, session, deadline):
+    fields = session.outline_fields() if session else None
+    prompt = build_outline_prompt(topic, slide_count)
     
-    elif layout == "imageAndParagraph":
-        lines = [line.strip() for line in text.split('\n') if line.strip()]
-        title = lines[0] if lines else f"About {topic}"
-        paragraph = " ".join(lines[1:])
-        return {
-            "title": title,
-            "imageDescription": f"An image about {topic}",
-            "paragraph": paragraph
-        }
+    models = route_models('outline', session.tier if session else None)
+    kind = f"{models[0]}|outline|{slide_count}"
+    outline = topic_cache.get(topic, kind) if topic_cache is not None else None
+    if outline is not None:
+        if session is not None:
+            session.outline = outline
+        return outline
     
-    elif layout == "twoColumn":
-        return {
-            "title": f"About {topic}",
-            "column1Title": "Overview",
-            "column1Content": "First part of the content",
-            "column2Title": "Details",
-            "column2Content": "Second part of the content"
-        }
+    for position, model in enumerate(models):
+        outcome = 'error'
+        start = time.perf_counter()
+        try:
+            response, start = yield (prompt, 'outline', priority, user, fields, model, deadline)
+            if response.status_code != 200:
+                continue
+            
+            result = response.json()
+            record_eval_stats('outline', result, session.mode if session else 'none', model)
+            outline = parse_outline(result.get("response", ""), slide_count)
+            if outline is None:
+                outcome = 'rerouted' if position < len(models) - 1 else 'fallback'
+                continue
+            outcome = 'json'
+            if topic_cache is not None:
+                topic_cache.put(topic, kind, outline)
+            if session is not None:
+                session.outline = outline
+                session.context = result.get('context')
+                session.context_model = model
+            return outline
+        except Exception:
+            continue
+        finally:
+            metrics.observe('ollama_request_duration_seconds', time.perf_counter() - start,
+                            layout='outline', outcome=outcome, model=model)
+    return None
+
+def record_eval_stats(layout, result, session='none', model=DEFAULT_MODEL):
+    """Export the token counts and timings (in nanoseconds) Ollama reports"""
+    eval_count = result.get('eval_count')
+    eval_duration = result.get('eval_duration')
     
-    elif layout == "titleOnly":
-        return {
-            "title": f"{topic.capitalize()} Presentation",
-            "subtitle": "An overview of key concepts"
-        }
+    # Per-call prefill cost, to compare deck session modes
+    if result.get('prompt_eval_count') is not None:
+        metrics.observe('ollama_prompt_eval_tokens', result['prompt_eval_count'], layout=layout, session=session)
+        metrics.observe('ollama_prompt_eval_seconds', result.get('prompt_eval_duration', 0) / 1e9,
+                        layout=layout, session=session)
     
-    return {"error": "Could not format content"}
\ No newline at end of file
+    if eval_count is not None:
+        metrics.inc('ollama_eval_tokens_total', eval_count, layout=layout)
+    if eval_duration:
+        metrics.inc('ollama_eval_duration_seconds_total', eval_duration / 1e9, layout=layout)
+        if eval_count:
+            metrics.observe('ollama_tokens_per_second', eval_count / (eval_duration / 1e9),
+                            layout=layout, model=model)
+    if result.get('prompt_eval_count') is not None:
+        metrics.inc('ollama_prompt_eval_tokens_total', result['prompt_eval_count'], layout=layout)
+    if result.get('prompt_eval_duration'):
+        metrics.inc('ollama_prompt_eval_duration_seconds_total', result['prompt_eval_duration'] / 1e9, layout=layout)
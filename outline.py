@@ -0,0 +1,91 @@
+# outline.py
+"""
+Deck outlines for outline-first generation.
+
+A short first call plans the deck: one layout, title and key point per
+slide, with layouts picked to suit each slide's content. Every slide is
+then expanded with the whole outline as compact shared context, so slides
+stay coherent and don't repeat each other while still being generated in
+parallel.
+"""
+import json
+import random
+
+from layouts import LAYOUTS, LAYOUT_SCHEMAS
+
+# Limits that keep the outline context short in every slide prompt
+MAX_TITLE_LENGTH = 80
+MAX_POINT_LENGTH = 160
+
+def build_outline_prompt(topic, slide_count):
+    layouts = "\n".join(f"- {name}: {schema['description']}" for name, schema in LAYOUT_SCHEMAS.items())
+    return (
+        f"Plan a {slide_count}-slide presentation about '{topic}'. "
+        f"For each slide pick the layout that best suits its content from:\n{layouts}\n"
+        f"Give every slide a distinct title and one key point. "
+        f"Format as a JSON array of {slide_count} objects with 'layout', 'title' and 'point'."
+    )
+
+def _text(value, limit):
+    return ' '.join(str(value or '').split())[:limit]
+
+def parse_outline(text, slide_count):
+    """
+    Outline entries ({'layout', 'title', 'point'}) from the model's reply,
+    or None if it holds no usable array. Unknown layouts fall back to
+    titleAndBullets; a short outline is padded with untitled slides.
+    """
+    start = text.find('[')
+    end = text.rfind(']') + 1
+    if start < 0 or end <= start:
+        return None
+    try:
+        items = json.loads(text[start:end])
+    except json.JSONDecodeError:
+        return None
+
+    outline = []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        layout = item.get('layout')
+        outline.append({
+            'layout': layout if layout in LAYOUT_SCHEMAS else 'titleAndBullets',
+            'title': _text(item.get('title'), MAX_TITLE_LENGTH),
+            'point': _text(item.get('point'), MAX_POINT_LENGTH)
+        })
+    if not outline:
+        return None
+
+    outline = outline[:slide_count]
+    outline += random_outline(slide_count - len(outline))
+    return outline
+
+def random_outline(slide_count):
+    """Untitled entries with random layouts, as generated before outlines"""
+    return [{'layout': random.choice(LAYOUTS), 'title': '', 'point': ''} for _ in range(slide_count)]
+
+def outline_summary(outline):
+    """The outline as numbered titles, identical for every slide of the deck"""
+    lines = ["Deck outline:"]
+    for i, item in enumerate(outline):
+        if item['title']:
+            lines.append(f"{i + 1}. {item['title']}")
+    return "\n".join(lines)
+
+def slide_brief(outline, index):
+    """What slide `index` should cover; None for untitled slides"""
+    entry = outline[index]
+    if not entry['title']:
+        return None
+    return (
+        f"Write slide {index + 1} of {len(outline)}, '{entry['title']}', about: {entry['point']}\n"
+        f"Stay consistent with the outline and don't repeat other slides."
+    )
+
+def outline_context(outline, index):
+    """Compact context for expanding slide `index`; None for untitled slides"""
+    brief = slide_brief(outline, index)
+    if brief is None:
+        return None
+    return outline_summary(outline) + "\n" + brief
@@ -0,0 +1,297 @@
+# pptx_import.py
+"""
+Streaming .pptx import.
+
+A .pptx is a zip of XML parts. Slides are read one part at a time, in deck
+order, with an incremental XML parser that drops each shape once its text
+is taken. Images and other media are never read, so memory stays flat
+however large the file is. Each slide's text frames are mapped onto the
+closest of the app's layouts and stored in batches of rows.
+
+Used by POST /api/import and by the import-pptx command, which parses a
+whole directory in a process pool:
+
+    flask --app app import-pptx DIR --user alice [--workers 4]
+"""
+import os
+import posixpath
+import time
+import zipfile
+import xml.etree.ElementTree as ET
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import click
+from flask.cli import with_appcontext
+
+from layouts import truncate_content
+
+P = '{http://schemas.openxmlformats.org/presentationml/2006/main}'
+A = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+R = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+REL = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+# Slide XML parts bigger than this (uncompressed) are refused; real slides are a few KB
+MAX_PART_BYTES = 16 * 1024 * 1024
+MAX_SLIDES = 1000
+
+# Slide rows inserted per statement
+INSERT_BATCH = 200
+
+# Placeholders that repeat on every slide and aren't content
+CHROME_PLACEHOLDERS = {'dt', 'ftr', 'hdr', 'sldNum', 'sldImg'}
+
+QUOTE_MARKS = '"“”«»‘’\''
+DASHES = '-–— '
+
+# What a damaged archive raises while its members are opened or read: a bad
+# CRC, a corrupt or truncated deflate stream, an encrypted or unsupported member
+DAMAGED = (zipfile.BadZipFile, zlib.error, EOFError, RuntimeError)
+
+class ImportFailed(ValueError):
+    """The upload isn't a readable .pptx (or is too big to be one)"""
+
+def _part(zf, name):
+    try:
+        info = zf.getinfo(name)
+    except KeyError:
+        raise ImportFailed(f'Missing part {name}')
+    if info.file_size > MAX_PART_BYTES:
+        raise ImportFailed(f'Part {name} is too large')
+    return zf.open(info)
+
+def slide_parts(zf):
+    """Slide part names in deck order, from presentation.xml and its relationships"""
+    targets = {}
+    for _, elem in ET.iterparse(_part(zf, 'ppt/_rels/presentation.xml.rels')):
+        if elem.tag == REL + 'Relationship':
+            targets[elem.get('Id')] = posixpath.normpath(posixpath.join('ppt', elem.get('Target')))
+    names = []
+    for _, elem in ET.iterparse(_part(zf, 'ppt/presentation.xml')):
+        if elem.tag == P + 'sldId':
+            names.append(targets[elem.get(R + 'id')])
+        elif elem.tag == P + 'notesMasterIdLst':
+            elem.clear()
+    if len(names) > MAX_SLIDES:
+        raise ImportFailed(f'More than {MAX_SLIDES} slides')
+    return names
+
+def _paragraphs(tx_body):
+    """Non-empty paragraphs of a text body; soft line breaks become spaces"""
+    paragraphs = []
+    for p in tx_body.iter(A + 'p'):
+        parts = []
+        for node in p.iter():
+            if node.tag == A + 't' and node.text:
+                parts.append(node.text)
+            elif node.tag == A + 'br':
+                parts.append(' ')
+        text = ' '.join(''.join(parts).split())
+        if text:
+            paragraphs.append(text)
+    return paragraphs
+
+def _offset(shape):
+    off = shape.find(f'.//{A}xfrm/{A}off')
+    if off is None:
+        return 0, 0
+    return int(off.get('x', 0)), int(off.get('y', 0))
+
+def read_slide(stream):
+    """
+    One slide's text: {'title', 'centered', 'subtitle', 'frames', 'pictures'}
+    where frames are (x, y, paragraphs) for the other text shapes in order
+    and pictures are their descriptions.
+    """
+    slide = {'title': None, 'centered': False, 'subtitle': None, 'frames': [], 'pictures': []}
+    for _, elem in ET.iterparse(stream):
+        if elem.tag == P + 'sp':
+            ph = elem.find(f'{P}nvSpPr/{P}nvPr/{P}ph')
+            kind = ph.get('type', 'body') if ph is not None else None
+            body = elem.find(P + 'txBody')
+            paragraphs = _paragraphs(body) if body is not None else []
+            if kind in CHROME_PLACEHOLDERS or not paragraphs:
+                pass
+            elif kind in ('title', 'ctrTitle') and slide['title'] is None:
+                slide['title'] = ' '.join(paragraphs)
+                slide['centered'] = kind == 'ctrTitle'
+            elif kind == 'subTitle' and slide['subtitle'] is None:
+                slide['subtitle'] = ' '.join(paragraphs)
+            else:
+                slide['frames'].append((*_offset(elem), paragraphs))
+            elem.clear()
+        elif elem.tag == P + 'graphicFrame':
+            # Tables: one paragraph per row
+            rows = [' | '.join(' '.join(_paragraphs(cell)) for cell in row.iter(A + 'tc'))
+                    for row in elem.iter(A + 'tr')]
+            rows = [row for row in rows if row.strip(' |')]
+            if rows:
+                slide['frames'].append((*_offset(elem), rows))
+            elem.clear()
+        elif elem.tag == P + 'pic':
+            props = elem.find(f'{P}nvPicPr/{P}cNvPr')
+            slide['pictures'].append((props.get('descr') or props.get('name') or '') if props is not None else '')
+            elem.clear()
+    return slide
+
+def _text(paragraphs):
+    return '\n'.join(paragraphs)
+
+def _column(frames):
+    """(title, content) for a column's frames: the first frame or paragraph is its title"""
+    if len(frames) > 1:
+        return _text(frames[0][2]), _text([p for frame in frames[1:] for p in frame[2]])
+    paragraphs = frames[0][2]
+    if len(paragraphs) > 1:
+        return paragraphs[0], _text(paragraphs[1:])
+    return '', paragraphs[0]
+
+def to_layout(slide, slide_width):
+    """(layout, content) for the closest layout to a slide's text"""
+    frames = sorted(slide['frames'], key=lambda frame: (frame[1], frame[0]))
+    title = slide['title']
+
+    # A short text opening with a quote mark, perhaps followed by its attribution
+    if title is None and frames and frames[0][2][0][:1] in QUOTE_MARKS and len(frames) <= 2:
+        quote = _text(frames[0][2]).strip(QUOTE_MARKS + ' ')
+        author = _text(frames[1][2]).lstrip(DASHES) if len(frames) == 2 else ''
+        return 'quote', {'quote': quote, 'author': author}
+
+    if title is None and frames:
+        title = _text(frames.pop(0)[2])
+    title = title or ''
+
+    if slide['centered'] or not frames:
+        subtitle = slide['subtitle'] or _text([p for frame in frames for p in frame[2]])
+        return 'titleOnly', {'title': title, 'subtitle': subtitle}
+
+    if not slide['pictures'] and (len(frames) >= 4 or (len(frames) == 2 and all(len(f[2]) > 1 for f in frames))):
+        left = [frame for frame in frames if frame[0] < slide_width / 2]
+        right = [frame for frame in frames if frame[0] >= slide_width / 2]
+        if not left or not right:
+            half = len(frames) // 2
+            left, right = frames[:half], frames[half:]
+        (column1_title, column1), (column2_title, column2) = _column(left), _column(right)
+        return 'twoColumn', {'title': title, 'column1Title': column1_title, 'column1Content': column1,
+                             'column2Title': column2_title, 'column2Content': column2}
+
+    if slide['pictures'] or len(frames) == 2:
+        texts = sorted((_text(frame[2]) for frame in frames), key=len, reverse=True)
+        description = next((d for d in slide['pictures'] if d), '') or (texts[1] if len(texts) > 1 else '')
+        return 'imageAndParagraph', {'title': title, 'imageDescription': description, 'paragraph': texts[0]}
+
+    bullets = [p for frame in frames for p in frame[2]]
+    return 'titleAndBullets', {'title': title, 'bullets': bullets}
+
+def iter_slides(source):
+    """
+    {'layout', 'content'} per slide of a .pptx (a path or a seekable binary
+    file), in deck order, one slide part in memory at a time.
+    """
+    try:
+        zf = zipfile.ZipFile(source)
+    except (OSError, ValueError, *DAMAGED):
+        raise ImportFailed('Not a .pptx file')
+    with zf:
+        try:
+            slide_width = 9144000
+            for _, elem in ET.iterparse(_part(zf, 'ppt/presentation.xml')):
+                if elem.tag == P + 'sldSz':
+                    slide_width = int(elem.get('cx', slide_width))
+            for name in slide_parts(zf):
+                layout, content = to_layout(read_slide(_part(zf, name)), slide_width)
+                yield {'layout': layout, 'content': truncate_content(content, layout)}
+        except (ET.ParseError, KeyError, ValueError, *DAMAGED) as e:
+            if isinstance(e, ImportFailed):
+                raise
+            raise ImportFailed(f'Unreadable .pptx: {e}')
+
+def read_file(path):
+    """All slides of a file; the process pool's unit of work"""
+    return list(iter_slides(path))
+
+def store_import(user_id, topic, template_id, slides):
+    """Save imported slides (any iterable) as a new presentation in batches; returns it"""
+    from models import db, Presentation, Slide
+    from search import index_text, slide_text
+    from dashboard_cache import invalidate
+    from slide_codec import row_values
+    import thumbnails
+
+    presentation = Presentation(user_id=user_id, topic=topic, template_id=template_id, slide_count=0)
+    db.session.add(presentation)
+    db.session.flush()  # To get the presentation ID
+
+    count, batch, texts = 0, [], []
+    for slide in slides:
+        if count == 0:
+            thumbnails.refresh(presentation, slide)
+        batch.append({'presentation_id': presentation.id, 'slide_order': count,
+                      'layout': slide['layout'], **row_values(slide['content'])})
+        texts.append(slide_text(slide['content']))
+        count += 1
+        if len(batch) >= INSERT_BATCH:
+            db.session.execute(Slide.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(Slide.__table__.insert(), batch)
+
+    presentation.slide_count = count
+    index_text(presentation.id, topic, ' '.join(texts))
+    invalidate(user_id)
+    db.session.commit()
+    return presentation
+
+def deck_topic(first_slide, filename):
+    """A topic for an imported deck: its first slide's title, else the file name"""
+    if first_slide is not None:
+        title = first_slide['content'].get('title') or first_slide['content'].get('quote')
+        if title:
+            return title[:200]
+    return os.path.splitext(os.path.basename(filename or 'Imported presentation'))[0][:200]
+
+@click.command('import-pptx')
+@click.argument('directory', type=click.Path(exists=True, file_okay=False))
+@click.option('--user', 'username', required=True, help='owner of the imported decks')
+@click.option('--workers', default=os.cpu_count() or 2, show_default=True, help='parsing processes')
+@click.option('--template', default='corporate', show_default=True)
+@with_appcontext
+def import_pptx_command(directory, username, workers, template):
+    """Import every .pptx under a directory for a user"""
+    from models import User
+
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        raise click.ClickException(f"No user named {username!r}")
+    user_id = user.id
+
+    paths = sorted(os.path.join(root, name) for root, _, names in os.walk(directory)
+                   for name in names if name.lower().endswith('.pptx') and not name.startswith('~$'))
+    click.echo(f"{len(paths)} .pptx files")
+
+    # Workers only parse; this process does every insert, so SQLite sees one writer
+    started = time.perf_counter()
+    imported = failed = skipped = slide_total = 0
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(read_file, path): path for path in paths}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                slides = future.result()
+            except ImportFailed as e:
+                failed += 1
+                click.echo(f"failed   {path}: {e}")
+                continue
+            if not slides:
+                # As POST /api/import does, a deck without slides is not stored
+                skipped += 1
+                click.echo(f"skipped  {path}: The presentation has no slides")
+                continue
+            store_import(user_id, deck_topic(slides[0], path), template, slides)
+            imported += 1
+            slide_total += len(slides)
+            click.echo(f"imported {path} ({len(slides)} slides)")
+
+    elapsed = time.perf_counter() - started
+    click.echo(f"Imported {imported} decks ({slide_total} slides), {skipped} skipped, {failed} failed, "
+               f"in {elapsed:.1f}s ({imported / elapsed if elapsed else 0:.1f} decks/s)")
@@ -0,0 +1,206 @@
+# profiling.py
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from functools import partial
+from flask import g, request, session
+
+import tracing
+
+# Sampling interval for the stack sampler (seconds)
+SAMPLE_INTERVAL = 0.005
+
+class StackSampler:
+    """Periodically samples one thread's stack into folded (flamegraph) form"""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            # Prefix with the innermost active span so cost is attributed by name
+            spans = _active_spans.get(self.thread_id)
+            if spans:
+                names.append(spans[-1])
+            self.stacks[';'.join(reversed(names))] += 1
+
+    def folded(self):
+        return '\n'.join(f'{stack} {count}' for stack, count in self.stacks.most_common()) + '\n'
+
+# Thread id -> stack of open span names, read by the sampler thread
+_active_spans = {}
+
+# The profile being recorded for the current request, if any; a context
+# variable because it is read on every span and query, where g costs a
+# microsecond a lookup
+_current = ContextVar('profile', default=None)
+
+def recording():
+    """Whether a span opened here would be kept by the profiler or the tracer"""
+    return _current.get() is not None or tracing.recording()
+
+def wrap(fn):
+    """
+    `fn` bound to the caller's context, for handing to a pool thread (wrap
+    once per submit): its profile and trace, and the Flask app the global
+    LLM slots are configured on
+    """
+    return partial(copy_context().run, fn)
+
+def span(name, **attributes):
+    """Named sub-span for the profiler and the tracer; free when neither is recording"""
+    profile = _current.get()
+    if profile is None:
+        return tracing.span(name, **attributes)
+    return _profiled_span(profile, name, attributes)
+
+@contextmanager
+def _profiled_span(profile, name, attributes):
+    with tracing.span(name, **attributes):
+        thread_id = threading.get_ident()
+        _active_spans.setdefault(thread_id, []).append(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            _active_spans[thread_id].pop()
+            profile['spans'].append({
+                'name': name,
+                'start_ms': (start - profile['start']) * 1000,
+                'duration_ms': duration * 1000,
+                **attributes
+            })
+
+def _allowed(app):
+    """Profiling is limited to allowlisted users or client addresses"""
+    if session.get('username') in app.config.get('PROFILE_USERS', ()):
+        return True
+    return request.remote_addr in app.config.get('PROFILE_ALLOWED_IPS', ())
+
+def _requested():
+    return request.headers.get('X-Profile') == '1' or request.args.get('profile') == '1'
+
+def _summary(profile, total):
+    queries = profile['queries']
+    ollama_calls = [s for s in profile['spans'] if s['name'] == 'ollama.request']
+    by_span = {}
+    for s in profile['spans']:
+        entry = by_span.setdefault(s['name'], {'count': 0, 'total_ms': 0.0})
+        entry['count'] += 1
+        entry['total_ms'] += s['duration_ms']
+
+    return {
+        'path': request.path,
+        'method': request.method,
+        'total_ms': total * 1000,
+        'sql': {
+            'count': len(queries),
+            'total_ms': sum(q['duration_ms'] for q in queries),
+            'slowest': sorted(queries, key=lambda q: q['duration_ms'], reverse=True)[:20]
+        },
+        'ollama': {
+            'count': len(ollama_calls),
+            'total_ms': sum(s['duration_ms'] for s in ollama_calls),
+            'calls': ollama_calls
+        },
+        'spans_by_name': by_span,
+        'spans': profile['spans']
+    }
+
+def init_app(app, db):
+    """Register the opt-in profiling hook (?profile=1 or X-Profile: 1)"""
+    from sqlalchemy import event
+
+    app.config.setdefault('PROFILE_DIR', os.path.join(app.instance_path, 'profiles'))
+    app.config.setdefault('PROFILE_USERS', [
+        name for name in os.environ.get('PROFILE_USERS', '').split(',') if name
+    ])
+    app.config.setdefault('PROFILE_ALLOWED_IPS', [
+        addr for addr in os.environ.get('PROFILE_ALLOWED_IPS', '').split(',') if addr
+    ])
+
+    @app.before_request
+    def start_profile():
+        if not _requested() or not _allowed(app):
+            return
+        sampler = StackSampler(threading.get_ident())
+        g.profile = {
+            'start': time.perf_counter(),
+            'sampler': sampler,
+            'spans': [],
+            'queries': []
+        }
+        g.profile_token = _current.set(g.profile)
+        sampler.start()
+
+    @app.after_request
+    def finish_profile(response):
+        profile = g.pop('profile', None)
+        if profile is None:
+            return response
+
+        _current.reset(g.pop('profile_token'))
+        profile['sampler'].stop()
+        total = time.perf_counter() - profile['start']
+
+        directory = app.config['PROFILE_DIR']
+        os.makedirs(directory, exist_ok=True)
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{request.endpoint or 'unmatched'}-{os.getpid()}-{threading.get_ident()}"
+
+        with open(os.path.join(directory, profile_id + '.folded'), 'w') as f:
+            f.write(profile['sampler'].folded())
+        with open(os.path.join(directory, profile_id + '.json'), 'w') as f:
+            json.dump(_summary(profile, total), f, indent=2)
+
+        response.headers['X-Profile-Id'] = profile_id
+        return response
+
+    @app.teardown_request
+    def abandon_profile(error):
+        # after_request is skipped when a view raises; don't leak the profile into the thread's next request
+        profile = g.pop('profile', None)
+        if profile is not None:
+            _current.reset(g.pop('profile_token'))
+            profile['sampler'].stop()
+
+    def before_query(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None:
+            context._profile_start = time.perf_counter()
+
+    def after_query(conn, cursor, statement, parameters, context, executemany):
+        profile = _current.get()
+        start = getattr(context, '_profile_start', None)
+        if profile is not None and start is not None:
+            profile['queries'].append({
+                'statement': statement,
+                'duration_ms': (time.perf_counter() - start) * 1000
+            })
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', before_query)
+        event.listen(db.engine, 'after_cursor_execute', after_query)
@@ -0,0 +1,204 @@
+# scheduler.py
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+
+# Priority classes and their share of the model when all are busy
+CLASS_WEIGHTS = {
+    'interactive': 8,
+    'deck': 2,
+    'batch': 1
+}
+
+DEFAULT_PRIORITY = 'deck'
+
+# Queue-wait samples kept per class for percentile reporting
+WAIT_SAMPLES = 1000
+
+class OllamaScheduler:
+    """
+    Dispatches outbound Ollama calls with at most `max_concurrency` in flight.
+
+    Waiting calls are ordered by weighted fair queuing: each (class, user)
+    pair is a flow, and a flow's next call is tagged with a virtual finish
+    time that advances by 1/weight per call. Higher-weight classes therefore
+    get a proportionally larger share, and users within a class share
+    equally, so a single-slide edit never waits behind someone else's deck.
+
+    Each worker process has its own scheduler, so up to workers x
+    `max_concurrency` calls are in flight overall, and the ordering above
+    holds among the calls of one worker only. Size `max_concurrency` to the
+    worker's share of the model server (see ollama_client); each granted
+    call then also takes a cross-worker limits.llm_slot, which bounds the
+    calls in flight across all workers and keeps slots for interactive calls.
+    """
+
+    def __init__(self, max_concurrency=1, weights=None):
+        self.max_concurrency = max_concurrency
+        self.weights = dict(weights or CLASS_WEIGHTS)
+        self._cond = threading.Condition()
+        self._queue = []
+        # Coroutine waiters' callbacks, keyed by ticket
+        self._wakers = {}
+        self._seq = itertools.count()
+        self._finish = {}
+        self._virtual_time = 0.0
+        self._active = 0
+        self._waits = {name: deque(maxlen=WAIT_SAMPLES) for name in self.weights}
+        self._counts = {name: 0 for name in self.weights}
+
+    @contextmanager
+    def slot(self, priority=DEFAULT_PRIORITY, user=None, timeout=None):
+        """
+        Block until this call may run, then hold a slot for the block.
+        Raises TimeoutError if no slot is granted within `timeout` seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self._cond:
+            ticket = self._enqueue(priority, user)
+            while not self._runnable(ticket):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._cancel(ticket)
+                    raise TimeoutError("Timed out waiting for an Ollama slot")
+                self._cond.wait(remaining)
+            self._grant(ticket)
+
+        try:
+            yield
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def aslot(self, priority=DEFAULT_PRIORITY, user=None, timeout=None):
+        """slot() for coroutines: waits on the event loop instead of blocking a thread"""
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        ready = asyncio.Event()
+
+        with self._cond:
+            ticket = self._enqueue(priority, user)
+            self._wakers[ticket] = lambda: loop.call_soon_threadsafe(ready.set)
+        try:
+            while True:
+                with self._cond:
+                    if self._runnable(ticket):
+                        self._grant(ticket)
+                        break
+                    ready.clear()
+                remaining = None if deadline is None else deadline - time.monotonic()
+                try:
+                    await asyncio.wait_for(ready.wait(), remaining)
+                except asyncio.TimeoutError:
+                    with self._cond:
+                        if not self._runnable(ticket):
+                            self._cancel(ticket)
+                            raise TimeoutError("Timed out waiting for an Ollama slot")
+        except BaseException:
+            with self._cond:
+                if ticket in self._queue:
+                    self._cancel(ticket)
+            raise
+        finally:
+            with self._cond:
+                self._wakers.pop(ticket, None)
+
+        try:
+            yield
+        finally:
+            self._release()
+
+    def try_acquire(self):
+        """
+        Take a slot only if one is free and nobody is waiting for it, for
+        extra work such as a hedged duplicate call; pair with release()
+        """
+        with self._cond:
+            if self._queue or self._active >= self.max_concurrency:
+                return False
+            self._active += 1
+            return True
+
+    def release(self):
+        """Return a slot taken with try_acquire()"""
+        self._release()
+
+    def _enqueue(self, priority, user):
+        """Tag a call with its flow's virtual finish time and queue it (holding the lock)"""
+        if priority not in self.weights:
+            priority = DEFAULT_PRIORITY
+        flow = (priority, user)
+        start = max(self._virtual_time, self._finish.get(flow, 0.0))
+        finish = start + 1.0 / self.weights[priority]
+        self._finish[flow] = finish
+        ticket = (finish, next(self._seq), start, priority, time.perf_counter())
+        heapq.heappush(self._queue, ticket)
+        return ticket
+
+    def _runnable(self, ticket):
+        return self._active < self.max_concurrency and self._queue[0] == ticket
+
+    def _grant(self, ticket):
+        _, _, start, priority, enqueued = heapq.heappop(self._queue)
+        self._virtual_time = start
+        self._active += 1
+        self._prune_flows()
+
+        self._waits[priority].append(time.perf_counter() - enqueued)
+        self._counts[priority] += 1
+
+        # The next ticket may be runnable too
+        self._wake()
+
+    def _cancel(self, ticket):
+        self._queue.remove(ticket)
+        heapq.heapify(self._queue)
+        self._wake()
+
+    def _release(self):
+        with self._cond:
+            self._active -= 1
+            self._wake()
+
+    def _wake(self):
+        """Let every waiter, thread or coroutine, re-check whether it may run"""
+        self._cond.notify_all()
+        for waker in self._wakers.values():
+            waker()
+
+    def _prune_flows(self):
+        """Forget idle flows whose tags have fallen behind virtual time"""
+        if len(self._finish) > 1000:
+            self._finish = {
+                flow: finish for flow, finish in self._finish.items()
+                if finish > self._virtual_time
+            }
+
+    def stats(self):
+        """Queue-wait percentiles (milliseconds) per priority class"""
+        with self._cond:
+            classes = {}
+            for name, samples in self._waits.items():
+                ordered = sorted(samples)
+                classes[name] = {
+                    'count': self._counts[name],
+                    'p50_ms': _percentile(ordered, 0.50) * 1000,
+                    'p95_ms': _percentile(ordered, 0.95) * 1000,
+                    'max_ms': (ordered[-1] if ordered else 0.0) * 1000
+                }
+            return {
+                'classes': classes,
+                'active': self._active,
+                'queued': len(self._queue)
+            }
+
+def _percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
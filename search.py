@@ -0,0 +1,188 @@
+# search.py
+import re
+from sqlalchemy import text
+from models import db, Presentation
+import slide_codec
+
+# FTS5 table holding one row per presentation (rowid = presentations.id)
+SEARCH_TABLE = 'presentation_search'
+
+# Slide content fields that are worth indexing
+TEXT_FIELDS = [
+    'title',
+    'subtitle',
+    'bullets',
+    'paragraph',
+    'imageDescription',
+    'quote',
+    'author',
+    'column1Title',
+    'column1Content',
+    'column2Title',
+    'column2Content'
+]
+
+def search_enabled():
+    """Full-text search relies on SQLite FTS5"""
+    return db.engine.dialect.name == 'sqlite'
+
+def create_search_index():
+    """Create the FTS table, backfilling it from existing presentations the first time"""
+    if not search_enabled():
+        return
+
+    exists = db.session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {'name': SEARCH_TABLE}
+    ).first()
+
+    if exists:
+        return
+
+    db.session.execute(text(
+        f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+        "topic, body, tokenize = 'porter unicode61')"
+    ))
+    rebuild_search_index()
+
+def rebuild_search_index():
+    """Re-index every presentation from the slides table"""
+    if not search_enabled():
+        return
+
+    db.session.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+
+    presentations = db.session.execute(text("SELECT id, topic FROM presentations")).all()
+    slides = db.session.execute(text(
+        "SELECT presentation_id, content_format, content_json, content_blob FROM slides "
+        "ORDER BY presentation_id, slide_order"
+    )).all()
+
+    bodies = {}
+    for presentation_id, *stored in slides:
+        bodies.setdefault(presentation_id, []).append(slide_codec.decode(*stored))
+
+    rows = []
+    for presentation_id, topic in presentations:
+        body = ' '.join(slide_text(content) for content in bodies.get(presentation_id, []))
+        rows.append({'id': presentation_id, 'topic': topic, 'body': body})
+
+    if rows:
+        db.session.execute(
+            text(f"INSERT INTO {SEARCH_TABLE} (rowid, topic, body) VALUES (:id, :topic, :body)"),
+            rows
+        )
+    db.session.commit()
+
+def field_text(value):
+    """Flatten a content field (string, {'text': ...} or list) into plain text"""
+    if isinstance(value, dict):
+        return str(value.get('text', ''))
+    if isinstance(value, list):
+        return ' '.join(field_text(item) for item in value)
+    if value is None:
+        return ''
+    return str(value)
+
+def slide_text(content):
+    """Extract the searchable text of a single slide's content"""
+    if not isinstance(content, dict):
+        return ''
+    return ' '.join(field_text(content[field]) for field in TEXT_FIELDS if field in content)
+
+def index_presentation(presentation_id, topic, slides):
+    """Add or replace a presentation in the index (caller commits)"""
+    if not search_enabled():
+        return
+
+    body = ' '.join(slide_text(slide_data.get('content', {})) for slide_data in slides)
+    index_text(presentation_id, topic, body)
+
+def index_text(presentation_id, topic, body):
+    """Add or replace a presentation in the index from its already extracted text (caller commits)"""
+    if not search_enabled():
+        return
+
+    db.session.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :id"), {'id': presentation_id})
+    db.session.execute(
+        text(f"INSERT INTO {SEARCH_TABLE} (rowid, topic, body) VALUES (:id, :topic, :body)"),
+        {'id': presentation_id, 'topic': topic, 'body': body}
+    )
+
+def copy_index_entry(source_id, presentation_id, topic):
+    """Index a copied presentation from the original's entry, inside the database (caller commits)"""
+    if not search_enabled():
+        return
+
+    db.session.execute(
+        text(f"INSERT INTO {SEARCH_TABLE} (rowid, topic, body) "
+             f"SELECT :id, :topic, body FROM {SEARCH_TABLE} WHERE rowid = :source_id"),
+        {'id': presentation_id, 'topic': topic, 'source_id': source_id}
+    )
+
+def remove_presentation(presentation_id):
+    """Drop a presentation from the index (caller commits)"""
+    if not search_enabled():
+        return
+
+    db.session.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :id"), {'id': presentation_id})
+
+def build_match_query(query):
+    """Turn free text into a safe FTS5 query: every word must match as a prefix"""
+    terms = re.findall(r'\w+', query.lower())
+    return ' '.join(f'"{term}"*' for term in terms)
+
+def search_presentations(user_id, query, page=1, per_page=20):
+    """Ranked, paginated search over a user's presentations"""
+    offset = (page - 1) * per_page
+
+    if not search_enabled():
+        # Fall back to a plain topic scan on databases without FTS5
+        matches = Presentation.query.filter(
+            Presentation.user_id == user_id,
+            Presentation.topic.ilike(f'%{query}%')
+        ).order_by(Presentation.updated_at.desc())
+        total = matches.count()
+        results = [{
+            'id': p.id,
+            'topic': p.topic,
+            'template_id': p.template_id,
+            'slide_count': p.slide_count,
+            'updated_at': p.updated_at.isoformat(),
+            'snippet': ''
+        } for p in matches.offset(offset).limit(per_page)]
+        return total, results
+
+    match = build_match_query(query)
+    if not match:
+        return 0, []
+
+    params = {'match': match, 'user_id': user_id, 'limit': per_page, 'offset': offset}
+
+    total = db.session.execute(text(
+        f"SELECT COUNT(*) FROM {SEARCH_TABLE} "
+        f"JOIN presentations p ON p.id = {SEARCH_TABLE}.rowid "
+        f"WHERE {SEARCH_TABLE} MATCH :match AND p.user_id = :user_id"
+    ), params).scalar()
+
+    # Topic matches weigh more than body matches
+    rows = db.session.execute(text(
+        f"SELECT p.id, p.topic, p.template_id, p.slide_count, p.updated_at, "
+        f"snippet({SEARCH_TABLE}, 1, '', '', '...', 16) "
+        f"FROM {SEARCH_TABLE} "
+        f"JOIN presentations p ON p.id = {SEARCH_TABLE}.rowid "
+        f"WHERE {SEARCH_TABLE} MATCH :match AND p.user_id = :user_id "
+        f"ORDER BY bm25({SEARCH_TABLE}, 10.0, 1.0) "
+        f"LIMIT :limit OFFSET :offset"
+    ), params).all()
+
+    results = [{
+        'id': row[0],
+        'topic': row[1],
+        'template_id': row[2],
+        'slide_count': row[3],
+        'updated_at': str(row[4]).replace(' ', 'T', 1),
+        'snippet': row[5]
+    } for row in rows]
+
+    return total, results
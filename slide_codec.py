@@ -0,0 +1,326 @@
+# slide_codec.py
+"""
+Storage codec for slide content.
+
+Slides are stored in one of three formats, recorded per row in
+slides.content_format:
+
+  0  JSON text in content_json (the original format)
+  1  content_blob: a 2-byte dictionary id, then compact UTF-8 JSON
+     compressed with raw deflate primed with that shared dictionary
+  2  content_blob: as 1, but the content is packed before deflating:
+     per field a varint tag (0 then the name for keys outside
+     FIELD_NAMES), a kind byte, then varint-length-prefixed UTF-8 text,
+     a varint count of such strings, or compact JSON for anything else
+
+A slide is a few hundred bytes, too little for deflate to find repeats
+within it; the dictionary supplies the keys and vocabulary common to all
+slides. Dictionaries are trained from stored slides and kept in the
+slide_dictionaries table; they are never changed, so rows written with an
+older one stay readable. Slide.content reads every format, and writes use
+SLIDE_STORAGE ('json', 'compressed' or 'packed').
+
+    flask --app app slide-storage train      # build a dictionary from stored slides
+    flask --app app slide-storage migrate    # convert rows to SLIDE_STORAGE in batches
+    flask --app app slide-storage stats
+"""
+import json
+import re
+import struct
+import threading
+import time
+import zlib
+from collections import Counter
+
+import click
+from flask import current_app, has_app_context
+from flask.cli import with_appcontext
+
+FORMAT_JSON = 0
+FORMAT_DEFLATE = 1
+FORMAT_PACKED = 2
+
+# SLIDE_STORAGE mode -> format it writes
+MODE_FORMATS = {'json': FORMAT_JSON, 'compressed': FORMAT_DEFLATE, 'packed': FORMAT_PACKED}
+
+# Packed field tags, from 1; append only, since stored rows refer to them by position
+FIELD_NAMES = ('title', 'subtitle', 'bullets', 'quote', 'author', 'imageDescription', 'paragraph',
+               'column1Title', 'column1Content', 'column2Title', 'column2Content')
+_FIELD_TAGS = {name: tag for tag, name in enumerate(FIELD_NAMES, 1)}
+
+# Packed value kinds
+KIND_TEXT = 0
+KIND_TEXT_LIST = 1
+KIND_JSON = 2
+
+# Dictionary id 0 means plain deflate, for when none has been trained yet
+NO_DICTIONARY = 0
+
+# Deflate looks back 32 KB, shared between the dictionary and the slide itself
+DICTIONARY_SIZE = 16 * 1024
+
+COMPRESSION_LEVEL = 6
+
+_HEADER = struct.Struct('>H')
+
+_lock = threading.Lock()
+# Dictionaries by id (immutable once stored) and the newest one, per process
+_dictionaries = {NO_DICTIONARY: b''}
+_latest = None
+
+def _load_dictionary(dictionary_id):
+    from models import db, SlideDictionary
+    dictionary = _dictionaries.get(dictionary_id)
+    if dictionary is None:
+        # Called from Slide.content, possibly while the session has half-built rows
+        with db.session.no_autoflush:
+            row = db.session.get(SlideDictionary, dictionary_id)
+        if row is None:
+            raise LookupError(f'Unknown slide dictionary {dictionary_id}')
+        dictionary = _dictionaries[dictionary_id] = row.data
+    return dictionary
+
+def latest_dictionary():
+    """(id, data) of the newest dictionary; loaded once per process, so workers pick up a new one on restart"""
+    global _latest
+    if _latest is None:
+        from models import db, SlideDictionary
+        with db.session.no_autoflush:
+            row = SlideDictionary.query.order_by(SlideDictionary.id.desc()).first()
+        with _lock:
+            _latest = (row.id, row.data) if row is not None else (NO_DICTIONARY, b'')
+            _dictionaries[_latest[0]] = _latest[1]
+    return _latest
+
+def storage_mode():
+    if has_app_context():
+        return current_app.config.get('SLIDE_STORAGE', 'json')
+    return 'json'
+
+def compact_json(content):
+    return json.dumps(content, separators=(',', ':'), ensure_ascii=False)
+
+def _put_varint(out, n):
+    while n > 0x7f:
+        out.append(n & 0x7f | 0x80)
+        n >>= 7
+    out.append(n)
+
+def _get_varint(data, pos):
+    n = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        n |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return n, pos
+        shift += 7
+
+def _put_bytes(out, data):
+    _put_varint(out, len(data))
+    out += data
+
+def _get_text(data, pos):
+    length, pos = _get_varint(data, pos)
+    return data[pos:pos + length].decode('utf-8'), pos + length
+
+def pack(content):
+    """Field-tag/varint encoding of a content dict (format 2, before deflate)"""
+    out = bytearray()
+    for name, value in content.items():
+        tag = _FIELD_TAGS.get(name)
+        if tag is None:
+            out.append(0)
+            _put_bytes(out, name.encode('utf-8'))
+        else:
+            _put_varint(out, tag)
+        if type(value) is str:
+            out.append(KIND_TEXT)
+            _put_bytes(out, value.encode('utf-8'))
+        elif type(value) is list and all(type(item) is str for item in value):
+            out.append(KIND_TEXT_LIST)
+            _put_varint(out, len(value))
+            for item in value:
+                _put_bytes(out, item.encode('utf-8'))
+        else:
+            out.append(KIND_JSON)
+            _put_bytes(out, compact_json(value).encode('utf-8'))
+    return bytes(out)
+
+def unpack(data):
+    content = {}
+    pos, end = 0, len(data)
+    while pos < end:
+        tag, pos = _get_varint(data, pos)
+        if tag:
+            name = FIELD_NAMES[tag - 1]
+        else:
+            name, pos = _get_text(data, pos)
+        kind = data[pos]
+        pos += 1
+        if kind == KIND_TEXT_LIST:
+            count, pos = _get_varint(data, pos)
+            value = []
+            for _ in range(count):
+                item, pos = _get_text(data, pos)
+                value.append(item)
+        else:
+            value, pos = _get_text(data, pos)
+            if kind == KIND_JSON:
+                value = json.loads(value)
+        content[name] = value
+    return content
+
+def compress(content, dictionary_id, dictionary, packed=False):
+    compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, -15, zdict=dictionary) if dictionary \
+        else zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, -15)
+    data = pack(content) if packed else compact_json(content).encode('utf-8')
+    return _HEADER.pack(dictionary_id) + compressor.compress(data) + compressor.flush()
+
+def decompress(blob, packed=False):
+    (dictionary_id,) = _HEADER.unpack_from(blob)
+    dictionary = _load_dictionary(dictionary_id)
+    decompressor = zlib.decompressobj(-15, zdict=dictionary) if dictionary else zlib.decompressobj(-15)
+    data = decompressor.decompress(blob[_HEADER.size:]) + decompressor.flush()
+    return unpack(data) if packed else json.loads(data)
+
+def encode(content, mode=None):
+    """(content_format, content_json, content_blob) column values for a slide's content"""
+    mode = mode or storage_mode()
+    # Packing takes a field dict; anything else is deflated as JSON
+    if mode == 'packed' and isinstance(content, dict):
+        return FORMAT_PACKED, '', compress(content, *latest_dictionary(), packed=True)
+    if mode in ('compressed', 'packed'):
+        return FORMAT_DEFLATE, '', compress(content, *latest_dictionary())
+    return FORMAT_JSON, json.dumps(content), None
+
+def decode(content_format, content_json, content_blob):
+    if content_format == FORMAT_DEFLATE:
+        return decompress(content_blob)
+    if content_format == FORMAT_PACKED:
+        return decompress(content_blob, packed=True)
+    return json.loads(content_json)
+
+def row_values(content):
+    """Column values for inserting a slide row directly"""
+    content_format, content_json, content_blob = encode(content)
+    return {'content_format': content_format, 'content_json': content_json, 'content_blob': content_blob}
+
+def train_dictionary(samples, size=DICTIONARY_SIZE):
+    """
+    A deflate dictionary from sample slide JSON: the fragments (runs of up to
+    four word/punctuation tokens) found in the most samples, weighted by
+    length, with the most valuable last where back-references are shortest.
+    """
+    counts = Counter()
+    for sample in samples:
+        tokens = re.findall(r'\w+|\W+', sample)
+        fragments = set()
+        for n in range(1, 5):
+            for i in range(len(tokens) - n + 1):
+                fragments.add(''.join(tokens[i:i + n]))
+        counts.update(fragments)
+
+    chosen, total = [], 0
+    # Fragments seen in a single sample don't generalise
+    for fragment, seen in sorted(counts.items(), key=lambda item: item[1] * len(item[0]), reverse=True):
+        if seen < 2 or len(fragment) < 3:
+            continue
+        encoded = fragment.encode('utf-8')
+        if total + len(encoded) > size:
+            break
+        if any(fragment in longer for longer in chosen[-64:]):
+            continue
+        chosen.append(fragment)
+        total += len(encoded)
+    return ''.join(reversed(chosen)).encode('utf-8')
+
+@click.group('slide-storage')
+def slide_storage_cli():
+    """Compressed or packed slide storage: train a dictionary, migrate rows, show sizes"""
+
+@slide_storage_cli.command('train')
+@click.option('--sample', default=5000, show_default=True, help='slides to train on')
+@click.option('--size', default=DICTIONARY_SIZE, show_default=True, help='dictionary bytes')
+@with_appcontext
+def train_command(sample, size):
+    """Train a new dictionary from a random sample of stored slides"""
+    global _latest
+    from sqlalchemy import text
+    from models import db, SlideDictionary
+
+    rows = db.session.execute(text(
+        "SELECT content_format, content_json, content_blob FROM slides ORDER BY RANDOM() LIMIT :n"
+    ), {'n': sample}).all()
+    if len(rows) < 2:
+        raise click.ClickException('Need stored slides to train on')
+
+    samples = [compact_json(decode(*row)) for row in rows]
+    dictionary = SlideDictionary(data=train_dictionary(samples, size), sample_size=len(samples))
+    db.session.add(dictionary)
+    db.session.commit()
+    with _lock:
+        _latest = (dictionary.id, dictionary.data)
+        _dictionaries[dictionary.id] = dictionary.data
+    click.echo(f"Trained dictionary {dictionary.id} ({len(dictionary.data)} bytes) on {len(samples)} slides")
+
+@slide_storage_cli.command('migrate')
+@click.option('--to', 'target', type=click.Choice(list(MODE_FORMATS)), help='format (default: SLIDE_STORAGE)')
+@click.option('--batch', default=500, show_default=True, help='rows per transaction')
+@click.option('--vacuum/--no-vacuum', default=True, show_default=True, help='reclaim freed pages afterwards (SQLite)')
+@with_appcontext
+def migrate_command(target, batch, vacuum):
+    """Re-encode slides not yet in the target format (or dictionary), a batch per transaction"""
+    from sqlalchemy import text
+    from models import db
+
+    target = target or storage_mode()
+    dictionary_id = latest_dictionary()[0]
+    started = time.perf_counter()
+    last_id = converted = 0
+    while True:
+        rows = db.session.execute(text(
+            "SELECT id, content_format, content_json, content_blob FROM slides "
+            "WHERE id > :last_id ORDER BY id LIMIT :batch"
+        ), {'last_id': last_id, 'batch': batch}).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        updates = []
+        for row_id, content_format, content_json, content_blob in rows:
+            if content_format == MODE_FORMATS[target] and (
+                    content_format == FORMAT_JSON or _HEADER.unpack_from(content_blob)[0] == dictionary_id):
+                continue
+            new_format, new_json, new_blob = encode(decode(content_format, content_json, content_blob), target)
+            updates.append({'id': row_id, 'format': new_format, 'json': new_json, 'blob': new_blob})
+        if updates:
+            db.session.execute(text(
+                "UPDATE slides SET content_format = :format, content_json = :json, content_blob = :blob "
+                "WHERE id = :id"
+            ), updates)
+        db.session.commit()
+        converted += len(updates)
+        click.echo(f"converted {converted} slides (through id {last_id})")
+
+    if vacuum and db.engine.dialect.name == 'sqlite':
+        with db.engine.connect() as conn:
+            conn.exec_driver_sql('VACUUM')
+    click.echo(f"Converted {converted} slides to {target} in {time.perf_counter() - started:.1f}s")
+
+@slide_storage_cli.command('stats')
+@with_appcontext
+def stats_command():
+    """Slides and stored content bytes per format"""
+    from sqlalchemy import text
+    from models import db
+
+    rows = db.session.execute(text(
+        "SELECT content_format, COUNT(*), SUM(LENGTH(content_json)), SUM(COALESCE(LENGTH(content_blob), 0)) "
+        "FROM slides GROUP BY content_format ORDER BY content_format"
+    )).all()
+    names = {content_format: mode for mode, content_format in MODE_FORMATS.items()}
+    for content_format, count, json_bytes, blob_bytes in rows:
+        size = (json_bytes or 0) + (blob_bytes or 0)
+        click.echo(f"{names.get(content_format, content_format):<11}{count:>9} slides{size:>12} bytes"
+                   f"{size / count:>9.0f} per slide")
@@ -0,0 +1,180 @@
+# textfit.py
+"""
+Text fitting for PPTX export.
+
+Strings are measured with per-font glyph-width tables (advance widths in
+1/1000 em for printable ASCII) instead of character counts, so line breaks
+and font sizes follow the template font. Tables are expanded into lookup
+dicts once per font and word widths are memoized, which keeps fitting cheap
+enough to run on every text box of a large export.
+"""
+import unicodedata
+from functools import lru_cache
+
+# Advance widths for ' ' (32) through '~' (126). Arial and Helvetica share
+# metrics; the others are derived from the closest standard face and are
+# close enough for line breaking.
+HELVETICA_WIDTHS = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584
+)
+
+TIMES_WIDTHS = (
+    250, 333, 408, 500, 500, 833, 778, 180, 333, 333, 500, 564, 250, 333, 250, 278,
+    500, 500, 500, 500, 500, 500, 500, 500, 500, 500, 278, 278, 564, 564, 564, 444,
+    921, 722, 667, 667, 722, 611, 556, 722, 722, 333, 389, 722, 611, 889, 722, 722,
+    556, 722, 667, 556, 611, 722, 722, 944, 722, 722, 611, 333, 278, 333, 469, 500,
+    333, 444, 500, 444, 500, 444, 333, 500, 500, 278, 278, 500, 278, 778, 500, 500,
+    500, 500, 333, 389, 278, 500, 500, 722, 500, 500, 444, 480, 200, 480, 541
+)
+
+# font name -> (base table, scale)
+FONT_METRICS = {
+    'Arial': (HELVETICA_WIDTHS, 1.0),
+    'Helvetica': (HELVETICA_WIDTHS, 1.0),
+    'Georgia': (TIMES_WIDTHS, 1.12),
+    'Roboto': (HELVETICA_WIDTHS, 0.98)
+}
+DEFAULT_FONT = 'Arial'
+
+# Bold faces run about 8% wider than regular across these families
+BOLD_SCALE = 1.08
+
+# Single line spacing as a multiple of the font size
+LINE_SPACING = 1.2
+
+MIN_FONT_SIZE = 12
+ELLIPSIS = '...'
+
+@lru_cache(maxsize=None)
+def glyph_widths(font, bold=False):
+    """Character -> advance width in em for a font, built once per font"""
+    table, scale = FONT_METRICS.get(font, FONT_METRICS[DEFAULT_FONT])
+    if bold:
+        scale *= BOLD_SCALE
+    widths = {chr(32 + i): width * scale / 1000 for i, width in enumerate(table)}
+    widths['average'] = sum(table[65 - 32:91 - 32] + table[97 - 32:123 - 32]) * scale / 52000
+    return widths
+
+def char_width(char, widths):
+    """Width of a character outside the ASCII table"""
+    if unicodedata.east_asian_width(char) in ('W', 'F'):
+        width = 1.0
+    else:
+        # Accented letters measure like their base letter
+        base = unicodedata.normalize('NFD', char)[0]
+        width = widths.get(base, widths['average'])
+    widths[char] = width
+    return width
+
+@lru_cache(maxsize=65536)
+def word_width(word, font, bold=False):
+    """Width of a word in em"""
+    widths = glyph_widths(font, bold)
+    total = 0.0
+    for char in word:
+        width = widths.get(char)
+        total += width if width is not None else char_width(char, widths)
+    return total
+
+def wrap_line(text, font, bold, max_em):
+    """Greedy line breaking of one hard line to a width in em"""
+    space = glyph_widths(font, bold)[' ']
+    lines = []
+    current = []
+    current_width = 0.0
+    for word in text.split():
+        width = word_width(word, font, bold)
+        if current and current_width + space + width <= max_em:
+            current.append(word)
+            current_width += space + width
+            continue
+        if current:
+            lines.append(' '.join(current))
+        if width <= max_em:
+            current, current_width = [word], width
+            continue
+        # A word wider than the box is broken between characters
+        chunk = ''
+        for char in word:
+            if chunk and word_width(chunk + char, font, bold) > max_em:
+                lines.append(chunk)
+                chunk = ''
+            chunk += char
+        current, current_width = [chunk], word_width(chunk, font, bold)
+    if current:
+        lines.append(' '.join(current))
+    return lines or ['']
+
+def wrap_text(text, font, size, width_pt, bold=False):
+    """Break text into lines no wider than width_pt at the given size"""
+    max_em = width_pt / size
+    lines = []
+    for hard_line in text.split('\n'):
+        lines += wrap_line(hard_line, font, bold, max_em)
+    return lines
+
+def fit_paragraphs(paragraphs, font, width_pt, height_pt, max_size, min_size=MIN_FONT_SIZE, bold=False):
+    """
+    Largest whole-point size (between min_size and max_size) at which all
+    paragraphs, wrapped to width_pt, fit in height_pt. Returns (size, lines
+    per paragraph). If nothing fits at min_size the text is cut at the last
+    line that fits and ends with an ellipsis.
+    """
+    min_size = min(min_size, max_size)
+
+    def layout(size):
+        wrapped = [wrap_text(text, font, size, width_pt, bold) for text in paragraphs]
+        return wrapped, sum(len(lines) for lines in wrapped) * size * LINE_SPACING <= height_pt
+
+    wrapped, fits = layout(max_size)
+    if fits:
+        return max_size, wrapped
+
+    # Binary search for the largest size that fits
+    best = None
+    low, high = min_size, max_size - 1
+    while low <= high:
+        size = (low + high) // 2
+        candidate, fits = layout(size)
+        if fits:
+            best = (size, candidate)
+            low = size + 1
+        else:
+            high = size - 1
+    if best:
+        return best
+
+    wrapped, _ = layout(min_size)
+    return min_size, clip_lines(wrapped, int(height_pt // (min_size * LINE_SPACING)), font, min_size, width_pt, bold)
+
+def clip_lines(wrapped, max_lines, font, size, width_pt, bold):
+    """Keep the first max_lines lines across paragraphs, ending in an ellipsis"""
+    max_lines = max(1, max_lines)
+    if sum(len(lines) for lines in wrapped) <= max_lines:
+        return wrapped
+
+    clipped = []
+    remaining = max_lines
+    for lines in wrapped:
+        if remaining <= 0:
+            break
+        clipped.append(lines[:remaining])
+        remaining -= len(lines)
+
+    last = clipped[-1][-1]
+    max_em = width_pt / size
+    while last and word_width(last + ELLIPSIS, font, bold) > max_em:
+        # Drop whole words first, then characters
+        last = last.rsplit(' ', 1)[0] if ' ' in last else last[:-1]
+    clipped[-1][-1] = last.rstrip() + ELLIPSIS
+    return clipped
+
+def fit_text(text, font, width_pt, height_pt, max_size, min_size=MIN_FONT_SIZE, bold=False):
+    """fit_paragraphs for a single paragraph; returns (size, lines)"""
+    size, wrapped = fit_paragraphs([text], font, width_pt, height_pt, max_size, min_size, bold)
+    return size, wrapped[0]
@@ -0,0 +1,64 @@
+# themes.py
+"""
+Template colors and fonts, shared by .pptx export and thumbnail rendering.
+Kept free of python-pptx and Pillow so either can use it without loading
+the other. Mirrors static/js/templates.js.
+"""
+
+THEMES = {
+    'corporate': {
+        'colors': {
+            'primary': '#0f4c81',
+            'secondary': '#6e9cc4',
+            'accent': '#f2b138',
+            'background': '#ffffff',
+            'text': '#333333'
+        },
+        'font': 'Arial'
+    },
+    'creative': {
+        'colors': {
+            'primary': '#ff6b6b',
+            'secondary': '#4ecdc4',
+            'accent': '#ffd166',
+            'background': '#f9f1e6',
+            'text': '#5a3921'
+        },
+        'font': 'Georgia'
+    },
+    'minimal': {
+        'colors': {
+            'primary': '#2c3e50',
+            'secondary': '#95a5a6',
+            'accent': '#e74c3c',
+            'background': '#f8f8f8',
+            'text': '#222222'
+        },
+        'font': 'Helvetica'
+    },
+    'dark': {
+        'colors': {
+            'primary': '#bb86fc',
+            'secondary': '#03dac6',
+            'accent': '#cf6679',
+            'background': '#1a1a1a',
+            'text': '#f5f5f5'
+        },
+        'font': 'Roboto'
+    }
+}
+
+DEFAULT_THEME = 'corporate'
+
+def hex_to_rgb(hex_color):
+    """Convert hex color to RGB tuple"""
+    hex_color = hex_color.lstrip('#')
+    return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
+
+def theme_rgb(template_id):
+    """A theme with its colors as RGB tuples; unknown templates get the default"""
+    theme = THEMES.get(template_id, THEMES[DEFAULT_THEME])
+    return {
+        'colors': {role: hex_to_rgb(value) for role, value in theme['colors'].items()},
+        'font': theme['font']
+    }
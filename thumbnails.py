@@ -0,0 +1,291 @@
+# thumbnails.py
+"""
+Dashboard thumbnails: a small PNG of each deck's first slide.
+
+Slides are drawn with Pillow from the same layout elements, template
+colors and text fitting as .pptx export, so a thumbnail breaks lines where
+the exported slide does. Files are addressed by a hash of what they show,
+which makes them immutable: identical first slides share one file, a
+changed deck gets a new hash and URL, and browsers may cache them
+indefinitely. The hash is built in two steps, the first slide's layout and
+content (kept on the deck as first_slide_hash) and then the template and
+size, so a clone is rehashed for another template without loading a slide.
+
+Saving a deck doesn't hash anything: once the save commits, a background
+thread hashes the first slide it was handed, renders the file and points
+the deck at it, and the deck shows its previous thumbnail until then. A
+request for a file that isn't rendered yet renders it inline.
+
+    flask --app app thumbnails backfill   # decks saved before thumbnails existed
+    flask --app app thumbnails prune      # files no deck points at any more
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from layouts import LAYOUT_SCHEMAS, SLIDE_WIDTH, SLIDE_HEIGHT, normalize_content
+from textfit import fit_paragraphs, LINE_SPACING, MIN_FONT_SIZE
+from themes import theme_rgb
+
+# Bump when drawing changes, so every thumbnail gets a new hash
+RENDER_VERSION = 1
+
+THUMBNAIL_WIDTH = 320
+
+# Drawn at this multiple of the final size, then downsampled for smooth edges
+SUPERSAMPLE = 2
+
+# Five template colors blended into antialiased edges fit a small palette; about a third the bytes of RGB
+PALETTE_COLORS = 64
+
+# python-pptx's default text frame insets and bullet indent, in inches
+MARGIN_X = 0.1
+MARGIN_Y = 0.05
+BULLET_INDENT = 0.375
+
+KEY_PATTERN = re.compile(r'[0-9a-f]{64}')
+
+# first_slide_hash of a deck whose refresh hasn't landed yet
+PENDING_PREFIX = 'pending-'
+
+# Pillow's built-in font has no glyphs for these
+PUNCTUATION = str.maketrans({'—': '-', '–': '-', '“': '"', '”': '"', '‘': "'", '’': "'", '…': '...'})
+
+# One background renderer per worker; thumbnails are small and a deck saves rarely
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='thumbnails')
+
+def slide_hash(layout, content):
+    """Hash of a slide's layout and content, whatever the template"""
+    payload = json.dumps([layout, content], sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def thumbnail_key(first_slide_hash, template_id, width=THUMBNAIL_WIDTH):
+    """Hash naming a thumbnail: the slide_hash of what it shows, drawn in a template at a size"""
+    payload = json.dumps([RENDER_VERSION, first_slide_hash, template_id, width])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def cache_dir():
+    return current_app.config.get('THUMBNAIL_DIR') or os.path.join(current_app.instance_path, 'thumbnails')
+
+def cache_path(directory, key):
+    # Fanned out by prefix so no directory holds every file
+    return os.path.join(directory, key[:2], key + '.png')
+
+@lru_cache(maxsize=None)
+def _font(pixels):
+    from PIL import ImageFont
+    return ImageFont.load_default(size=max(1, pixels))
+
+def _draw_text(draw, element, value, box, theme, scale):
+    x, y, width, height = box
+    paragraphs = value if isinstance(value, list) else [value]
+    if 'format' in element:
+        paragraphs = [element['format'].format(text) for text in paragraphs]
+    indent = BULLET_INDENT if isinstance(value, list) else 0
+
+    width_pt = (width - 2 * MARGIN_X - indent) * 72
+    height_pt = (min(height, SLIDE_HEIGHT - y) - 2 * MARGIN_Y) * 72
+    size, wrapped = fit_paragraphs([text.strip() for text in paragraphs], theme['font'], width_pt, height_pt,
+                                   max_size=element['size'], min_size=element.get('min_size', MIN_FONT_SIZE),
+                                   bold=element.get('bold', False))
+
+    wrapped = [[line.translate(PUNCTUATION) for line in lines] for lines in wrapped]
+    font = _font(round(size * scale / 72))
+    # The built-in font runs wider than the template font the lines were broken for
+    widest = max((draw.textlength(line, font=font) for lines in wrapped for line in lines), default=0)
+    available = (width - 2 * MARGIN_X - indent) * scale
+    if widest > available:
+        font = _font(int(font.size * available / widest))
+    line_height = size * LINE_SPACING * scale / 72
+    top = (y + MARGIN_Y) * scale
+    if element.get('placeholder') == 'title':
+        # The default template centers titles vertically in their placeholder
+        lines = sum(len(lines) for lines in wrapped)
+        top = y * scale + max(0, (height * scale - lines * line_height) / 2)
+
+    color = theme['colors'][element['color']]
+    left = (x + MARGIN_X + indent) * scale
+    right = (x + width - MARGIN_X) * scale
+    for lines in wrapped:
+        if indent:
+            radius = font.size / 8
+            center_x, center_y = (x + MARGIN_X) * scale + radius, top + font.size * 0.6
+            draw.ellipse([center_x - radius, center_y - radius, center_x + radius, center_y + radius], fill=color)
+        for line in lines:
+            align = element.get('align', 'left')
+            if align == 'left':
+                text_x = left
+            else:
+                text_width = draw.textlength(line, font=font)
+                text_x = (left + right - text_width) / 2 if align == 'center' else right - text_width
+            draw.text((text_x, top), line, font=font, fill=color)
+            top += line_height
+
+def render_thumbnail(layout, content, template_id, width=THUMBNAIL_WIDTH):
+    """PNG bytes of one slide; unknown layouts get a blank slide in the template's background"""
+    from io import BytesIO
+    from PIL import Image, ImageDraw
+
+    theme = theme_rgb(template_id)
+    scale = width * SUPERSAMPLE / SLIDE_WIDTH  # pixels per inch
+    image = Image.new('RGB', (round(SLIDE_WIDTH * scale), round(SLIDE_HEIGHT * scale)), theme['colors']['background'])
+    draw = ImageDraw.Draw(image)
+
+    schema = LAYOUT_SCHEMAS.get(layout)
+    if schema is not None:
+        content = normalize_content(content or {}, layout)
+        for element in schema['elements']:
+            x, y, w, h = element['box']
+            if 'shape' in element:
+                draw.rectangle([x * scale, y * scale, (x + w) * scale, (y + h) * scale],
+                               fill=theme['colors'][element['fill']], outline=theme['colors'][element['line']],
+                               width=SUPERSAMPLE)
+            else:
+                _draw_text(draw, element, content[element['field']], element['box'], theme, scale)
+
+    image = image.resize((width, round(width * SLIDE_HEIGHT / SLIDE_WIDTH)), Image.LANCZOS).quantize(PALETTE_COLORS)
+    out = BytesIO()
+    image.save(out, 'PNG', optimize=True)
+    return out.getvalue()
+
+def store(directory, key, layout, content, template_id):
+    """Render a thumbnail into the cache unless it's already there; returns its path"""
+    path = cache_path(directory, key)
+    if not os.path.exists(path):
+        png = render_thumbnail(layout, content, template_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Concurrent renders of the same key write identical bytes; the rename keeps readers from a partial file
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(png)
+        os.replace(temp_path, path)
+    return path
+
+def refresh(presentation, first_slide):
+    """
+    Have a deck's thumbnail hashed and rendered in the background once the
+    caller commits; the deck must have an id. `first_slide` is {'layout',
+    'content'}, or None for a deck without slides.
+    """
+    if first_slide is None:
+        presentation.thumbnail_hash = presentation.first_slide_hash = None
+        return
+    _queue(presentation, first_slide.get('layout'), first_slide.get('content', {}))
+
+def clone(source, presentation):
+    """Give a clone its source's thumbnail in its own template, without loading slides (before the commit)"""
+    if source.first_slide_hash and not source.first_slide_hash.startswith(PENDING_PREFIX):
+        presentation.first_slide_hash = source.first_slide_hash
+        presentation.thumbnail_hash = thumbnail_key(source.first_slide_hash, presentation.template_id)
+    elif source.slide_count:
+        # Saved before slide hashes were kept, or its own refresh hasn't landed: use the copied rows
+        _queue(presentation, None, None)
+    else:
+        presentation.thumbnail_hash = presentation.first_slide_hash = None
+
+def _queue(presentation, layout, content):
+    # The token lets only the latest refresh of a deck land
+    token = PENDING_PREFIX + uuid.uuid4().hex
+    presentation.first_slide_hash = token
+    db_session = Session.object_session(presentation)
+    db_session.info.setdefault('thumbnail_refreshes', []).append(
+        (current_app._get_current_object(), presentation.id, token, layout, content))
+
+@event.listens_for(Session, 'after_commit')
+def _start_refreshes(db_session):
+    for refresh_args in db_session.info.pop('thumbnail_refreshes', ()):
+        _executor.submit(_refresh, *refresh_args)
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_refreshes(db_session):
+    db_session.info.pop('thumbnail_refreshes', None)
+
+def _refresh(app, presentation_id, token, layout, content):
+    from models import db, Presentation, Slide
+    from dashboard_cache import invalidate
+
+    with app.app_context():
+        presentation = db.session.get(Presentation, presentation_id)
+        if presentation is None or presentation.first_slide_hash != token:
+            return
+        if layout is None:
+            slide = Slide.query.filter_by(presentation_id=presentation_id, slide_order=0).first()
+            if slide is None:
+                return
+            layout, content = slide.layout, slide.content
+        first_slide_hash = slide_hash(layout, content)
+        key = thumbnail_key(first_slide_hash, presentation.template_id)
+        store(cache_dir(), key, layout, content, presentation.template_id)
+        # Unless a later save has queued a newer refresh
+        updated = db.session.execute(
+            Presentation.__table__.update().where(
+                (Presentation.id == presentation_id) & (Presentation.first_slide_hash == token)
+            ).values(thumbnail_hash=key, first_slide_hash=first_slide_hash))
+        if updated.rowcount:
+            invalidate(presentation.user_id)
+        db.session.commit()
+
+@click.group('thumbnails')
+def thumbnails_cli():
+    """Dashboard thumbnail cache"""
+
+@thumbnails_cli.command('backfill')
+@click.option('--batch', default=200, show_default=True, help='decks per transaction')
+@with_appcontext
+def backfill_command(batch):
+    """Render thumbnails for decks that have none"""
+    from models import db, Presentation, Slide
+
+    directory = cache_dir()
+    started = time.perf_counter()
+    done = 0
+    while True:
+        rows = db.session.query(Presentation, Slide).join(
+            Slide, (Slide.presentation_id == Presentation.id) & (Slide.slide_order == 0)
+        ).filter(Presentation.thumbnail_hash.is_(None)).limit(batch).all()
+        if not rows:
+            break
+        for presentation, slide in rows:
+            content = slide.content
+            first_slide_hash = slide_hash(slide.layout, content)
+            key = thumbnail_key(first_slide_hash, presentation.template_id)
+            store(directory, key, slide.layout, content, presentation.template_id)
+            presentation.thumbnail_hash, presentation.first_slide_hash = key, first_slide_hash
+        db.session.commit()
+        done += len(rows)
+        click.echo(f"rendered {done} thumbnails")
+    click.echo(f"Backfilled {done} decks in {time.perf_counter() - started:.1f}s")
+
+@thumbnails_cli.command('prune')
+@click.option('--min-age', default=86400, show_default=True, help='only delete files older than this many seconds')
+@with_appcontext
+def prune_command(min_age):
+    """Delete cached thumbnails no deck refers to"""
+    from models import db, Presentation
+
+    directory = cache_dir()
+    referenced = {key for (key,) in db.session.query(Presentation.thumbnail_hash).filter(
+        Presentation.thumbnail_hash.isnot(None))}
+    # The age guard spares files rendered for a save that hasn't committed yet
+    cutoff = time.time() - min_age
+    removed = 0
+    for root, _, names in os.walk(directory):
+        for name in names:
+            key, extension = os.path.splitext(name)
+            path = os.path.join(root, name)
+            if extension == '.png' and key not in referenced and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+    click.echo(f"Removed {removed} thumbnails")
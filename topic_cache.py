@@ -0,0 +1,354 @@
+# topic_cache.py
+"""
+Semantic cache of generated content keyed by topic.
+
+Topics are embedded (by a local word and trigram vectorizer, or Ollama's
+/api/embed) and a lookup returns the content stored for the most similar
+cached topic above a similarity threshold, so "Intro to Machine Learning"
+and "introduction to ML" share their slides. Content is stored per kind
+(e.g. model, layout and slide title) under each topic.
+
+The cache lives in memory per worker and is persisted as an append-only
+JSON lines log that every worker writes to and re-reads new lines from,
+so content generated by one worker is served by all of them. Appends and
+compaction hold a lock file, so no worker's lines are lost to another's
+rewrite, and a worker that finds the log replaced re-reads it from the
+start.
+"""
+import json
+import math
+import operator
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import requests
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory locks (Windows): fine for the single-process dev server
+    fcntl = None
+
+import metrics
+
+# Similarity a cached topic needs to be served for a new one
+DEFAULT_THRESHOLD = 0.9
+
+# Topics kept per worker; the oldest is dropped beyond this
+MAX_TOPICS = 5000
+
+# Cached content older than this is regenerated
+TTL_SECONDS = 7 * 24 * 3600
+
+# The log is rewritten with only live entries once it has this many lines
+COMPACT_LINES = 4 * MAX_TOPICS
+
+# Common abbreviations expanded before vectorizing
+ABBREVIATIONS = {
+    'ai': 'artificial intelligence',
+    'ml': 'machine learning',
+    'dl': 'deep learning',
+    'nlp': 'natural language processing',
+    'llm': 'large language model',
+    'llms': 'large language models',
+    'intro': 'introduction',
+    'mgmt': 'management',
+    'dev': 'development',
+    'hr': 'human resources',
+    'ux': 'user experience',
+    'ui': 'user interface',
+    'db': 'database',
+    'js': 'javascript',
+    'k8s': 'kubernetes',
+    'q1': 'first quarter',
+    'q2': 'second quarter',
+    'q3': 'third quarter',
+    'q4': 'fourth quarter'
+}
+
+STOPWORDS = frozenset(
+    'a an and the of to in on for with about into from by at is are how what why our your its vs'.split()
+)
+
+TRIGRAM_WEIGHT = 0.3
+
+def normalize_topic(topic):
+    """Lowercased words without punctuation; the exact-match key"""
+    return ' '.join(re.sub(r'[^\w&]+', ' ', str(topic).lower()).split())
+
+def topic_words(topic):
+    """Content words with abbreviations expanded and plurals folded"""
+    words = []
+    for word in normalize_topic(topic).split():
+        for part in ABBREVIATIONS.get(word, word).split():
+            if part in STOPWORDS:
+                continue
+            if part.endswith(('sses', 'xes', 'ches', 'shes')):
+                part = part[:-2]
+            elif len(part) > 3 and part.endswith('s') and not part.endswith(('ss', 'us', 'is')):
+                part = part[:-1]
+            words.append(part)
+    return words
+
+def _unit(vector):
+    norm = math.sqrt(sum(value * value for value in (vector.values() if isinstance(vector, dict) else vector)))
+    if not norm:
+        return vector
+    if isinstance(vector, dict):
+        return {key: value / norm for key, value in vector.items()}
+    return [value / norm for value in vector]
+
+class LocalVectorizer:
+    """Sparse vectors of content words plus character trigrams, for typos and word forms"""
+    name = 'local'
+
+    def embed(self, topic):
+        vector = {}
+        for word in topic_words(topic):
+            vector['w:' + word] = vector.get('w:' + word, 0.0) + 1.0
+            padded = f' {word} '
+            for i in range(len(padded) - 2):
+                key = 'g:' + padded[i:i + 3]
+                vector[key] = vector.get(key, 0.0) + TRIGRAM_WEIGHT
+        return _unit(vector)
+
+class OllamaEmbedder:
+    """Dense vectors from an Ollama embedding model"""
+
+    def __init__(self, url, model, timeout=10):
+        self.url = url
+        self.model = model
+        self.timeout = timeout
+        self.name = f'ollama:{model}'
+
+    def embed(self, topic):
+        response = requests.post(self.url, json={'model': self.model, 'input': normalize_topic(topic)},
+                                 timeout=self.timeout)
+        response.raise_for_status()
+        return _unit(response.json()['embeddings'][0])
+
+def similarity(a, b):
+    """Cosine similarity of two unit vectors of the same kind"""
+    if isinstance(a, dict):
+        if len(b) < len(a):
+            a, b = b, a
+        return sum(value * b.get(key, 0.0) for key, value in a.items())
+    return math.fsum(map(operator.mul, a, b))
+
+class TopicCache:
+    """Per-kind content under embedded topics, served to similar topics"""
+
+    def __init__(self, embedder, threshold=DEFAULT_THRESHOLD, max_topics=MAX_TOPICS, ttl=TTL_SECONDS):
+        self.embedder = embedder
+        self.threshold = threshold
+        self.max_topics = max_topics
+        self.ttl = ttl
+        self.path = None
+        self._lock = threading.Lock()
+        # normalized topic -> {'vector': ..., 'kinds': {kind: (created, content)}}
+        self._topics = OrderedDict()
+        # word feature -> normalized topics, to narrow lookups with sparse vectors
+        self._postings = {}
+        self._vectors = OrderedDict()
+        # Position in, and inode of, the log file read so far
+        self._offset = 0
+        self._inode = None
+        self._loaded = False
+
+    def configure(self, path):
+        """Persist to (and load from) the JSON lines log at `path`; it is read on first use"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._lock:
+            self.path = path
+            self._offset = 0
+            self._inode = None
+            self._loaded = False
+
+    @contextmanager
+    def _locked(self):
+        """Hold the log's lock file, excluding other workers' appends and compactions"""
+        if fcntl is None:
+            yield
+            return
+        # A separate file, since compaction replaces the log itself
+        with open(self.path + '.lock', 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _sync(self):
+        """Apply new log lines; the first call loads the whole log and compacts it if it is long"""
+        lines = self._read_new()
+        if not self._loaded:
+            self._loaded = True
+            if lines > COMPACT_LINES:
+                self._compact()
+
+    def _vector(self, topic, key):
+        """Embedding of a topic, memoized for the topics of recent requests"""
+        with self._lock:
+            vector = self._vectors.get(key)
+            if vector is not None:
+                self._vectors.move_to_end(key)
+                return vector
+        vector = self.embedder.embed(topic)
+        with self._lock:
+            self._vectors[key] = vector
+            while len(self._vectors) > 256:
+                self._vectors.popitem(last=False)
+        return vector
+
+    def get(self, topic, kind):
+        """Content of `kind` for the most similar cached topic above the threshold, or None"""
+        key = normalize_topic(topic)
+        now = time.time()
+        best, best_similarity = None, 0.0
+        try:
+            with self._lock:
+                self._sync()
+                entry = self._topics.get(key)
+                if entry is not None and self._fresh(entry, kind, now):
+                    best, best_similarity = entry, 1.0
+            if best is None:
+                vector = self._vector(topic, key)
+                with self._lock:
+                    for candidate in self._candidates(vector):
+                        entry = self._topics[candidate]
+                        score = similarity(vector, entry['vector'])
+                        if score > best_similarity and self._fresh(entry, kind, now):
+                            best, best_similarity = entry, score
+        except Exception:
+            # An unreachable embedding model just means a miss
+            best = None
+
+        metrics.observe('topic_cache_similarity', best_similarity)
+        hit = best is not None and best_similarity >= self.threshold
+        metrics.record_cache('topic', hit)
+        if not hit:
+            return None
+        return json.loads(json.dumps(best['kinds'][kind][1]))
+
+    def put(self, topic, kind, content):
+        """Store content of `kind` for `topic`"""
+        key = normalize_topic(topic)
+        try:
+            vector = self._vector(topic, key)
+        except Exception:
+            return
+        record = {'topic': key, 'embedder': self.embedder.name, 'kind': kind,
+                  'created': time.time(), 'content': content}
+        with self._lock:
+            self._sync()
+            # Only a topic's first line carries its vector
+            if key not in self._topics:
+                record['vector'] = vector
+            self._add(record)
+            if self.path is not None:
+                line = json.dumps(record, separators=(',', ':')) + '\n'
+                with self._locked(), open(self.path, 'a') as f:
+                    f.write(line)
+
+    def _fresh(self, entry, kind, now):
+        stored = entry['kinds'].get(kind)
+        return stored is not None and now - stored[0] < self.ttl
+
+    def _candidates(self, vector):
+        if not isinstance(vector, dict):
+            return list(self._topics)
+        found = set()
+        for feature in vector:
+            if feature.startswith('w:'):
+                found.update(self._postings.get(feature, ()))
+        return found
+
+    def _add(self, record):
+        key = record['topic']
+        entry = self._topics.get(key)
+        if entry is None:
+            if 'vector' not in record:
+                return
+            entry = self._topics[key] = {'vector': record['vector'], 'kinds': {}}
+            if isinstance(record['vector'], dict):
+                for feature in record['vector']:
+                    if feature.startswith('w:'):
+                        self._postings.setdefault(feature, set()).add(key)
+        entry['kinds'][record['kind']] = (record['created'], record['content'])
+        self._topics.move_to_end(key)
+        while len(self._topics) > self.max_topics:
+            self._evict()
+
+    def _evict(self):
+        key, entry = self._topics.popitem(last=False)
+        if isinstance(entry['vector'], dict):
+            for feature in entry['vector']:
+                topics = self._postings.get(feature)
+                if topics is not None:
+                    topics.discard(key)
+                    if not topics:
+                        del self._postings[feature]
+
+    def _read_new(self):
+        """Apply lines other workers appended since the last read; returns lines in the log"""
+        if self.path is None:
+            return 0
+        try:
+            stat = os.stat(self.path)
+            if stat.st_ino == self._inode and stat.st_size == self._offset:
+                return 0
+            with open(self.path, 'rb') as f:
+                # fstat, not the stat above: the file read must be the one measured
+                stat = os.fstat(f.fileno())
+                if stat.st_ino != self._inode or stat.st_size < self._offset:
+                    # Replaced by another worker's compaction: offsets into the old file mean nothing here
+                    self._inode, self._offset = stat.st_ino, 0
+                if stat.st_size <= self._offset:
+                    return 0
+                f.seek(self._offset)
+                data = f.read()
+        except OSError:
+            return 0
+
+        # A line still being written has no newline yet
+        complete = data[:data.rfind(b'\n') + 1]
+        self._offset += len(complete)
+        lines = complete.splitlines()
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            # Vectors from another embedder aren't comparable
+            if record.get('embedder') == self.embedder.name:
+                self._add(record)
+        return len(lines)
+
+    def _compact(self):
+        """Rewrite the log with live entries only"""
+        with self._locked():
+            inode = self._inode
+            # Lines appended since the last read would be lost otherwise; appends wait on the lock
+            self._read_new()
+            if self._inode != inode:
+                # Another worker compacted it first
+                return
+            now = time.time()
+            temp_path = f'{self.path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(temp_path, 'w') as f:
+                for key, entry in self._topics.items():
+                    live = [(kind, created, content) for kind, (created, content) in entry['kinds'].items()
+                            if now - created < self.ttl]
+                    for i, (kind, created, content) in enumerate(live):
+                        record = {'topic': key, 'embedder': self.embedder.name, 'kind': kind,
+                                  'created': created, 'content': content}
+                        if i == 0:
+                            record['vector'] = entry['vector']
+                        f.write(json.dumps(record, separators=(',', ':')) + '\n')
+            os.replace(temp_path, self.path)
+            stat = os.stat(self.path)
+            self._inode, self._offset = stat.st_ino, stat.st_size
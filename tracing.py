@@ -0,0 +1,223 @@
+# tracing.py
+"""
+Request tracing.
+
+A sampled request gets a trace id and a root span. Spans opened while it
+runs (model calls, SQL statements, export steps) nest under it through a
+context variable, which follows the request into coroutines and, through
+profiling.wrap, into pool threads. Finished spans are written in the Chrome trace
+event format (a JSON array, one event per line) to a per-process file in
+TRACE_DIR that rotates at TRACE_MAX_BYTES. Open the files in Perfetto
+(ui.perfetto.dev) or chrome://tracing; every event carries its trace, span
+and parent ids in args.
+
+TRACE_SAMPLE_RATE (0 to 1, default 0) samples requests at random, and a
+request with a W3C traceparent header follows the caller's sampled flag.
+At 0 tracing is off: no SQL hooks are installed and a span costs one
+context variable lookup.
+"""
+import asyncio
+import atexit
+import json
+import os
+import random
+import re
+import threading
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+
+from flask import g, request
+
+# (trace id, span id) of the innermost open span; None outside sampled requests
+_current = ContextVar('trace_span', default=None)
+
+# perf_counter() + this = wall clock, for event timestamps
+_EPOCH_OFFSET = time.time() - time.perf_counter()
+
+TRACEPARENT = re.compile(r'00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})')
+
+# SQL text kept per statement span
+MAX_STATEMENT_LENGTH = 300
+
+class Exporter:
+    """Buffers finished spans and appends them to a rotating per-process trace file"""
+
+    def __init__(self, directory, max_bytes, backups):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lock = threading.Lock()
+        self._buffer = []
+
+    def path(self, generation=0):
+        suffix = f'.{generation}' if generation else ''
+        return os.path.join(self.directory, f'traces-{os.getpid()}{suffix}.json')
+
+    def export(self, event):
+        line = json.dumps(event, separators=(',', ':'))
+        with self._lock:
+            self._buffer.append(line)
+
+    def flush(self):
+        with self._lock:
+            if not self._buffer:
+                return
+            lines, self._buffer = self._buffer, []
+            os.makedirs(self.directory, exist_ok=True)
+            path = self.path()
+            new = not os.path.exists(path)
+            with open(path, 'a', encoding='utf-8') as f:
+                # The closing bracket is optional in this format, so the file stays appendable
+                if new:
+                    f.write('[\n')
+                f.write(',\n'.join(lines) + ',\n')
+                size = f.tell()
+            if size > self.max_bytes:
+                self._rotate()
+
+    def _rotate(self):
+        for generation in range(self.backups, 0, -1):
+            source = self.path(generation - 1)
+            if os.path.exists(source):
+                os.replace(source, self.path(generation))
+
+_exporter = None
+
+def _new_id(bits):
+    return f'{random.getrandbits(bits):0{bits // 4}x}'
+
+def _track():
+    """Timeline row for a span: its asyncio task, else its thread"""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    return id(task) & 0x7fffffff if task is not None else threading.get_native_id()
+
+def _emit(name, trace_id, span_id, parent_id, start, end, attributes):
+    if _exporter is None:
+        return
+    _exporter.export({
+        'name': name,
+        'cat': name.split('.', 1)[0],
+        'ph': 'X',
+        'ts': round((start + _EPOCH_OFFSET) * 1e6),
+        'dur': round((end - start) * 1e6),
+        'pid': os.getpid(),
+        'tid': _track(),
+        'args': {'trace_id': trace_id, 'span_id': span_id, 'parent_id': parent_id, **attributes}
+    })
+
+class _Span:
+    def __init__(self, name, attributes, trace_id, parent_id):
+        self.name = name
+        self.attributes = attributes
+        self.trace_id = trace_id
+        self.parent_id = parent_id
+
+    def __enter__(self):
+        self.span_id = _new_id(64)
+        self.token = _current.set((self.trace_id, self.span_id))
+        self.start = time.perf_counter()
+
+    def __exit__(self, exc_type, exc, tb):
+        _current.reset(self.token)
+        if exc_type is not None:
+            self.attributes['error'] = exc_type.__name__
+        _emit(self.name, self.trace_id, self.span_id, self.parent_id, self.start, time.perf_counter(),
+              self.attributes)
+
+_NOT_RECORDING = nullcontext()
+
+def span(name, **attributes):
+    """A child of the current span; does nothing outside a sampled request"""
+    parent = _current.get()
+    if parent is None:
+        return _NOT_RECORDING
+    return _Span(name, attributes, *parent)
+
+def recording():
+    """Whether spans opened here are kept, for skipping span setup on hot paths"""
+    return _current.get() is not None
+
+def record(name, start, end, **attributes):
+    """A finished child span of the current span, from perf_counter() times"""
+    parent = _current.get()
+    if parent is not None:
+        _emit(name, parent[0], _new_id(64), parent[1], start, end, attributes)
+
+def _sampled(rate):
+    """(trace id, parent span id) for a request to trace, or None"""
+    match = TRACEPARENT.fullmatch(request.headers.get('traceparent', '').strip())
+    if match:
+        trace_id, parent_id, flags = match.groups()
+        return (trace_id, parent_id) if int(flags, 16) & 1 else None
+    if random.random() < rate:
+        return _new_id(128), None
+    return None
+
+def init_app(app, db):
+    """Trace a sample of requests (TRACE_SAMPLE_RATE) into TRACE_DIR"""
+    global _exporter
+    from sqlalchemy import event
+
+    app.config.setdefault('TRACE_SAMPLE_RATE', float(os.environ.get('TRACE_SAMPLE_RATE', 0)))
+    app.config.setdefault('TRACE_DIR', os.environ.get('TRACE_DIR') or os.path.join(app.instance_path, 'traces'))
+    app.config.setdefault('TRACE_MAX_BYTES', int(os.environ.get('TRACE_MAX_BYTES', 64 * 1024 * 1024)))
+    app.config.setdefault('TRACE_BACKUPS', int(os.environ.get('TRACE_BACKUPS', 5)))
+
+    rate = app.config['TRACE_SAMPLE_RATE']
+    if rate <= 0:
+        return
+
+    _exporter = Exporter(app.config['TRACE_DIR'], app.config['TRACE_MAX_BYTES'], app.config['TRACE_BACKUPS'])
+    atexit.register(_exporter.flush)
+
+    @app.before_request
+    def start_trace():
+        sampled = _sampled(rate)
+        if sampled is None:
+            return
+        trace_id, parent_id = sampled
+        span_id = _new_id(64)
+        g.trace = {
+            'trace_id': trace_id,
+            'span_id': span_id,
+            'parent_id': parent_id,
+            'start': time.perf_counter(),
+            'token': _current.set((trace_id, span_id))
+        }
+
+    @app.after_request
+    def tag_response(response):
+        trace = g.get('trace')
+        if trace is not None:
+            trace['status'] = response.status_code
+            response.headers['traceparent'] = f"00-{trace['trace_id']}-{trace['span_id']}-01"
+        return response
+
+    @app.teardown_request
+    def finish_trace(error):
+        trace = g.pop('trace', None)
+        if trace is None:
+            return
+        _current.reset(trace['token'])
+        attributes = {'method': request.method, 'path': request.path, 'endpoint': request.endpoint,
+                      'status': trace.get('status', 500)}
+        _emit('request', trace['trace_id'], trace['span_id'], trace['parent_id'],
+              trace['start'], time.perf_counter(), attributes)
+        _exporter.flush()
+
+    def before_query(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None:
+            context._trace_start = time.perf_counter()
+
+    def after_query(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, '_trace_start', None)
+        if start is not None:
+            record('sql', start, time.perf_counter(), statement=statement[:MAX_STATEMENT_LENGTH])
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', before_query)
+        event.listen(db.engine, 'after_cursor_execute', after_query)